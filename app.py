@@ -9,11 +9,9 @@ from pathlib import Path
 import json
 from datetime import datetime
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import docx
-from io import BytesIO
-import PyPDF2
 import re
+import hashlib
+from concurrent.futures import as_completed
 from tilena_api import (
     TilenaAPI,
     SEARCH_FIELDS,
@@ -23,6 +21,24 @@ from tilena_api import (
     format_ticket_for_display,
     format_task_for_display
 )
+from workitem_store import WorkItemStore, CacheComentarios
+import docx_markdown
+from docx_markdown import docx_a_markdown
+from document_cache import DocumentCache
+from chunker import Chunker, contador_tokens_modelo, max_tokens_modelo
+from embedding_cache import EmbeddingCache, codificar_por_longitud
+from encoding_pool import EncodingPool, medir_escalado, textos_distintos
+import pdf_extraction
+from pdf_extraction import PDFExtractor
+import embedding_backend
+from indexing_worker import IndexingJob, IndexingWorker
+from lexical_index import BM25Index, busqueda_hibrida
+from vector_index import (
+    VectorIndex, INDICES_APROXIMADOS, agrupar_por_padre, evaluar_indice, normalizar_filas, recortar_carpeta_indices
+)
+from devops_client import AzureDevOpsClient, formatear_comentarios
+import devops_async
+from devops_async import AsyncRunner, con_limite
 
 # ==================================================
 # USUARIOS FIJOS
@@ -91,16 +107,25 @@ defaults = {
     # Estado para DevOps
     "devops_incidencias": [],
     "devops_embeddings": None,
+    "devops_lexico": None,  # Índice BM25 de los work items (búsqueda híbrida)
+    "devops_lexico_claves": None,  # (id del work item, hash del texto) de cada fila del índice BM25
+    "devops_chunks_padres": None,  # work item de cada fila (chunk) del índice; None = una fila por item
     "devops_indexed": False,
-    "embedding_model": None,
     "devops_org": "",
     "devops_project": "",
     "devops_pat": "",
     "devops_top_k": 5,
+    "devops_comments_workers": 8,  # Peticiones de comentarios en paralelo durante la sincronización
+    "devops_sync_clave": "",  # Conjunto de filtros de la última sincronización indexada
+    "devops_indexacion_clave": None,  # Trabajo de indexación en segundo plano que alimenta el índice de la sesión
+    "devops_indexacion_version": -1,
+    "devops_indexacion_firma": None,  # Firma del corpus de la sesión (el trabajo debe coincidir)
+    "devops_store_revisado": False,  # Ya se intentó recuperar la última sincronización del almacén local
     # Estado para Documentos
     "doc_content": "",
-    "doc_chunks": [],
+    "doc_chunks": [],  # dict por chunk: texto, inicio/fin en doc_content y tokens (ver chunker)
     "doc_embeddings": None,
+    "doc_lexico": None,
     "doc_indexed": False,
     "doc_filename": "",
     "doc_top_k": 3,
@@ -110,6 +135,7 @@ defaults = {
     # Estado para Wiki
     "wiki_paginas_contenido": [],
     "wiki_embeddings": None,
+    "wiki_lexico": None,
     "wiki_referencias": [],
     "wiki_chunks": [],
     "wiki_indexed": False,
@@ -139,6 +165,10 @@ defaults = {
     "tilena_indexed": False,
     "tilena_top_k": 5,
     "tilena_messages": [],
+    # Informe recall/latencia de los índices vectoriales aproximados por corpus
+    "indices_vectoriales_informe": {},
+    "embedding_backends_benchmark": [],
+    "embedding_pool_benchmark": [],
 }
 
 for k, v in defaults.items():
@@ -146,6 +176,64 @@ for k, v in defaults.items():
         st.session_state[k] = v
 
 CHUNK_SIZE = 10000  # caracteres por fragmento para archivos grandes
+DATA_DIR = Path(os.getenv("HELPTASK_DATA_DIR", ".helptask_data"))  # caché local persistente
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# Backend de inferencia del modelo de embeddings: "torch", "onnx" o "int8" (ver embedding_backend)
+EMBEDDING_BACKEND = os.getenv("HELPTASK_EMBEDDING_BACKEND", "torch")
+# Pool multiproceso de codificación (opt-in): número de procesos, 0 = desactivado
+EMBEDDING_PROCESOS = int(os.getenv("HELPTASK_EMBEDDING_PROCESOS", "0"))
+EMBEDDING_POOL_MIN_TEXTOS = 2000  # por debajo no compensa repartir entre procesos
+# Extracción de PDF: backend ("pypdf2" o "pypdf"), procesos (vacío = automático, 0 = en el
+# propio proceso) y segundos máximos por página
+PDF_BACKEND = os.getenv("HELPTASK_PDF_BACKEND", "pypdf2")
+PDF_PROCESOS = int(os.getenv("HELPTASK_PDF_PROCESOS")) if os.getenv("HELPTASK_PDF_PROCESOS") else None
+PDF_TIMEOUT_PAGINA = 30.0
+PDF_LOTE_CHUNKS = 64  # chunks de PDF que se codifican juntos mientras se extraen las páginas siguientes
+# Caché de documentos procesados (Markdown, imágenes, chunks y embeddings) por hash del fichero
+DOCUMENTOS_CACHE_MAX_MB = int(os.getenv("HELPTASK_DOCUMENTOS_CACHE_MB", "512"))
+CHUNKER_VERSION = "3"  # cambiarla si cambia el troceado (invalida los chunks cacheados)
+# Troceado de documentos y wikis, en tokens del modelo de embeddings (ver chunker)
+CHUNK_TOKENS = 200
+CHUNK_SOLAPE_TOKENS = int(os.getenv("HELPTASK_CHUNK_SOLAPE_TOKENS", "32"))  # tokens repetidos entre chunks consecutivos
+WIQL_VENTANA_IDS = 10000  # IDs por query WIQL (Azure DevOps rechaza más de 20.000)
+COMENTARIOS_TTL = 900  # segundos de validez de los comentarios cargados bajo demanda
+ANN_MIN_FILAS = 20000  # a partir de este tamaño "auto" usa un índice aproximado
+# Índice vectorial por corpus: "exacto", "ivf", "hnsw" (requiere hnswlib) o "auto" (ivf).
+# HNSW guarda además una copia float32 de los vectores (memoria y disco): con int8 o
+# float16 anula el ahorro de EMBEDDINGS_PRECISION; IVF puntúa sobre la forma compacta.
+INDICE_VECTORIAL_CORPUS = {
+    "devops": "auto",
+    "wiki": "auto",
+    "doc": "auto",
+    "tilena": "auto",
+}
+EMBEDDINGS_PRECISION = "int8"  # almacenamiento de los vectores en sesión: "float32", "float16" o "int8"
+EMBEDDINGS_REORDENAR = True  # reordenar el top-k final con los float32 guardados en disco (memmap)
+# Tamaño máximo en disco de DATA_DIR/indices (float32 de reordenación e índices aproximados,
+# incluidos los .hnsw, que ocupan como los vectores en float32)
+INDICES_DISCO_MAX_MB = int(os.getenv("HELPTASK_INDICES_DISCO_MB", "2048"))
+# Work items multi-vector: un vector por sección de la descripción y por comentario
+CHUNK_INCIDENCIA_TOKENS = 192  # deja sitio al título y la cabecera dentro del límite de 256 de MiniLM
+MAX_CHUNKS_INCIDENCIA = 8  # vectores como máximo por work item (índice compacto)
+MAX_COMENTARIOS_INDEXADOS = 5
+MIN_CARACTERES_COMENTARIO = 20  # comentarios más cortos ("ok", "+1") no se indexan
+AGREGACION_CHUNKS = "max"  # puntuación de un work item a partir de sus chunks: "max" o "sum"
+CANDIDATOS_POR_ITEM = 4  # chunks candidatos por work item pedido (top_k * factor)
+
+# Campos de Azure DevOps que se sincronizan: clave del dict de work item -> (campo, valor por defecto).
+# Es la única lista de campos: de ella salen la proyección de workitemsbatch y el mapeo a dict.
+WORKITEM_CAMPOS_SYNC = {
+    "tipo": ("System.WorkItemType", ""),
+    "titulo": ("System.Title", "Sin título"),
+    "descripcion": ("System.Description", "Sin descripción"),
+    "estado": ("System.State", ""),
+    "area": ("System.AreaPath", ""),
+    "tags": ("System.Tags", ""),
+    "resolucion": ("Microsoft.VSTS.Common.ResolvedReason", ""),
+    "fecha_creacion": ("System.CreatedDate", ""),
+    "fecha_cambio": ("System.ChangedDate", ""),
+    "assigned_to": ("System.AssignedTo", ""),
+}
 
 # ==================================================
 # SISTEMA DE LOGS CENTRALIZADO
@@ -352,29 +440,232 @@ def resumir_conversacion(messages):
 # ==================================================
 
 @st.cache_resource
-def cargar_modelo_embeddings():
-    """Carga el modelo de embeddings una sola vez"""
-    return SentenceTransformer('all-MiniLM-L6-v2')
+def obtener_registro_modelos():
+    """Registro de modelos de embeddings compartido por todas las sesiones del proceso"""
+    return embedding_backend.ModelRegistry()
 
-def obtener_incidencias_devops(organization, project, pat, area_path=None, work_item_types=None, max_items=400, states=None, fecha_inicio=None, fecha_fin=None, assigned_to=None, fecha_tipo='ChangedDate'):
+def cargar_modelo_embeddings(nombre=EMBEDDING_MODEL_NAME):
     """
-    Obtiene work items de Azure DevOps con filtros configurables
+    Devuelve el modelo de embeddings del registro del proceso (se carga una sola vez) con
+    el backend EMBEDDING_BACKEND; si ese backend no está disponible se usa PyTorch.
+    Todas las rutas de indexación y consulta obtienen el modelo por aquí.
+    """
+    registro = obtener_registro_modelos()
+    backend = EMBEDDING_BACKEND
+    try:
+        modelo = registro.obtener(nombre, backend)
+    except (ImportError, TypeError, ValueError) as e:
+        add_log(f"⚠️ Backend de embeddings '{backend}' no disponible, se usa PyTorch: {e}", "warning")
+        backend = "torch"
+        modelo = registro.obtener(nombre, backend)
+    modelo.backend_embeddings = backend
+
+    info = registro.info(nombre, backend)
+    if info and info["usos"] == 1:
+        add_log(
+            f"🧠 Modelo {nombre} ({backend}) cargado en {info['carga_s']}s "
+            f"(parámetros: {info['parametros_mb']} MB, RSS +{info['rss_delta_mb']} MB)",
+            "info"
+        )
+    return modelo
+
+def id_modelo_embeddings(modelo):
+    """
+    Identificador del modelo para las cachés de embeddings: los backends no PyTorch
+    producen vectores ligeramente distintos y se guardan aparte
+    """
+    backend = getattr(modelo, "backend_embeddings", "torch")
+    return EMBEDDING_MODEL_NAME if backend == "torch" else f"{EMBEDDING_MODEL_NAME}@{backend}"
+
+@st.cache_resource
+def obtener_cache_documentos():
+    """Caché persistente de documentos procesados compartida por todas las pestañas y sesiones"""
+    return DocumentCache(DATA_DIR / "documentos.sqlite3", max_bytes=DOCUMENTOS_CACHE_MAX_MB * 1024 * 1024)
+
+@st.cache_resource
+def obtener_cliente_devops(pat):
+    """Cliente HTTP de Azure DevOps (pool de conexiones keep-alive y reintentos) compartido por PAT"""
+    return AzureDevOpsClient(pat)
+
+@st.cache_resource
+def obtener_cache_embeddings():
+    """Caché persistente de embeddings por (modelo, hash del texto) compartida por todas las sesiones"""
+    return EmbeddingCache(DATA_DIR / "embeddings.sqlite3")
+
+@st.cache_resource
+def obtener_pool_codificacion(backend):
+    """Pool multiproceso de codificación compartido por el proceso (None si está desactivado)"""
+    if EMBEDDING_PROCESOS <= 0:
+        return None
+    return EncodingPool(EMBEDDING_MODEL_NAME, backend, procesos=EMBEDDING_PROCESOS)
+
+def codificador_embeddings(modelo):
+    """
+    Función de codificación para los textos que no están en caché: reparte entre los
+    procesos del pool los lotes grandes y codifica en este proceso los pequeños (o todo,
+    si el pool está desactivado o falla). No usa Streamlit: vale en hilos de fondo.
+
+    Returns:
+        Función lista de textos -> np.ndarray, o None para usar la codificación por defecto
+    """
+    pool = obtener_pool_codificacion(getattr(modelo, "backend_embeddings", "torch"))
+    if pool is None:
+        return None
+
+    def codificar(textos):
+        if len(textos) >= EMBEDDING_POOL_MIN_TEXTOS:
+            try:
+                return pool.codificar(textos)
+            except Exception as e:
+                pool.error = str(e)
+        return codificar_por_longitud(modelo, textos)
+
+    return codificar
+
+def codificar_textos(textos, modelo, show_progress_bar=True):
+    """
+    Genera los embeddings de una lista de textos pasando por la caché por contenido:
+    solo los textos nuevos o editados llegan a modelo.encode (o al pool multiproceso)
+
+    Returns:
+        np.array float32 alineado con textos
+    """
+    embeddings, codificados = obtener_cache_embeddings().codificar(
+        id_modelo_embeddings(modelo), modelo, textos,
+        codificador=codificador_embeddings(modelo), show_progress_bar=show_progress_bar
+    )
+    add_log(f"🧠 Embeddings: {len(textos)} textos, {codificados} codificados y el resto de caché", "info")
+    return embeddings
+
+def crear_indice_vectorial(corpus, embeddings, metadatos=None):
+    """
+    Crea el índice de búsqueda de un corpus según INDICE_VECTORIAL_CORPUS
+
+    Los vectores se guardan en sesión con EMBEDDINGS_PRECISION; los float32 para la
+    reordenación exacta quedan en disco. Los índices aproximados se guardan en disco por
+    hash de los embeddings, de modo que el mismo corpus no se vuelve a entrenar, y al
+    crearlos se mide su recall/latencia frente a la búsqueda exacta (ver Monitor Log).
+    La carpeta de índices se recorta a INDICES_DISCO_MAX_MB antes de escribir, borrando
+    primero los de corpus usados hace más tiempo. En el informe, la memoria de un índice
+    HNSW incluye la copia float32 de los vectores que guarda hnswlib (grafo_kb).
 
     Args:
-        organization: Organización de Azure DevOps
-        project: Proyecto
-        pat: Personal Access Token
-        area_path: Ruta del área (opcional)
-        work_item_types: Lista de tipos de work items (opcional)
-        max_items: Máximo de items a retornar
-        states: Lista de estados a filtrar (opcional, ej: ['New', 'Active', 'Resolved'])
-        fecha_inicio: Fecha inicio para filtrado (formato: YYYY-MM-DD)
-        fecha_fin: Fecha fin para filtrado (formato: YYYY-MM-DD)
-        assigned_to: Usuario asignado para filtrar (opcional)
-        fecha_tipo: Tipo de fecha para filtrar ('CreatedDate' o 'ChangedDate')
+        corpus: "devops", "wiki", "doc" o "tilena"
+        embeddings: Matriz de embeddings del corpus
+        metadatos: Dict opcional por fila para los filtros
+
+    Returns:
+        VectorIndex (exacto o aproximado)
     """
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/wiql?api-version=7.1"
+    if len(embeddings) == 0:
+        return VectorIndex(embeddings, metadatos)
+
+    matriz = normalizar_filas(embeddings)
+    huella = hashlib.sha256(matriz.tobytes()).hexdigest()[:16]
+    liberados = recortar_carpeta_indices(DATA_DIR / "indices", INDICES_DISCO_MAX_MB * 1024 * 1024, conservar=huella)
+    if liberados:
+        add_log(f"🧹 Índices en disco: liberados {liberados / (1024 * 1024):.0f} MB de corpus antiguos", "info")
+    opciones = {
+        "precision": EMBEDDINGS_PRECISION,
+        "reordenar": EMBEDDINGS_REORDENAR,
+        "ruta_respaldo": DATA_DIR / "indices" / f"{corpus}-{huella}-f32.npy",
+    }
 
+    backend = INDICE_VECTORIAL_CORPUS.get(corpus, "auto")
+    if backend == "auto":
+        backend = "ivf" if len(matriz) >= ANN_MIN_FILAS else "exacto"
+    if backend == "exacto":
+        indice = VectorIndex(matriz, metadatos, **opciones)
+        add_log(
+            f"🗜️ Índice de '{corpus}': {len(indice)} vectores {indice.precision} "
+            f"({indice.bytes_memoria / 1024:.0f} KB en memoria)",
+            "info"
+        )
+        return indice
+
+    clase = INDICES_APROXIMADOS[backend]
+    ruta = DATA_DIR / "indices" / f"{corpus}-{backend}-{EMBEDDINGS_PRECISION}-{huella}.npz"
+    try:
+        if ruta.exists():
+            indice = clase.cargar(ruta, metadatos)
+            add_log(f"📂 Índice {backend} de '{corpus}' cargado de disco ({len(indice)} vectores)", "info")
+            return indice
+
+        inicio = datetime.now()
+        indice = clase(matriz, metadatos, **opciones)
+        indice.guardar(ruta)
+        segundos = (datetime.now() - inicio).total_seconds()
+    except (ImportError, OSError, ValueError) as e:
+        add_log(f"⚠️ Índice {backend} de '{corpus}' no disponible, se usa búsqueda exacta: {e}", "warning")
+        return VectorIndex(matriz, metadatos, **opciones)
+
+    exacto = VectorIndex(matriz)
+
+    # Recall/latencia frente a la búsqueda exacta usando filas del propio corpus como queries
+    rng = np.random.default_rng(0)
+    consultas = exacto.matriz[rng.choice(len(exacto), min(50, len(exacto)), replace=False)]
+    informe = evaluar_indice(exacto, indice, consultas, top_k=10)
+    informe.update({
+        "corpus": corpus,
+        "backend": backend,
+        "precision": indice.precision,
+        "vectores": len(indice),
+        "memoria_kb": round(indice.bytes_memoria / 1024),
+        "grafo_kb": round(getattr(indice, "bytes_grafo", 0) / 1024),
+        "construccion_s": round(segundos, 2),
+    })
+    st.session_state.indices_vectoriales_informe[corpus] = informe
+    add_log(
+        f"🧭 Índice {backend} de '{corpus}': {len(indice)} vectores en {segundos:.1f}s, "
+        f"recall@10 {informe['recall']:.3f}, {informe['latencia_aproximada_ms']} ms vs "
+        f"{informe['latencia_exacta_ms']} ms exacto",
+        "info"
+    )
+    if informe["grafo_kb"] and indice.precision != "float32":
+        add_log(
+            f"⚠️ Índice hnsw de '{corpus}': el grafo guarda los vectores en float32 "
+            f"({informe['grafo_kb']} KB), sin el ahorro de {indice.precision}; ivf puntúa sobre {indice.precision}",
+            "warning"
+        )
+    return indice
+
+def construir_indice_lexico(textos):
+    """Índice BM25 de un corpus (alineado por filas con su índice vectorial)"""
+    lexico = BM25Index()
+    lexico.agregar(textos)
+    return lexico
+
+@st.cache_resource
+def obtener_runner_devops():
+    """Event loop asíncrono en segundo plano para las peticiones fan-out a Azure DevOps"""
+    return AsyncRunner()
+
+def obtener_cliente_async_devops(pat):
+    """Cliente asíncrono de Azure DevOps; comparte el control de rate limit con el síncrono"""
+    return obtener_runner_devops().cliente(pat, scheduler=obtener_cliente_devops(pat).scheduler)
+
+@st.cache_resource
+def obtener_cache_comentarios():
+    """Caché TTL de comentarios por (work item, revisión) compartida por todas las sesiones"""
+    return CacheComentarios(ttl=COMENTARIOS_TTL)
+
+@st.cache_resource
+def obtener_workitem_store():
+    """Almacén SQLite de work items y comentarios compartido por todas las sesiones"""
+    return WorkItemStore(DATA_DIR / "workitems.sqlite3")
+
+def construir_wiql_workitems(area_path=None, work_item_types=None, states=None, fecha_inicio=None, fecha_fin=None, assigned_to=None, fecha_tipo='ChangedDate', cambiados_desde=None, id_menor_que=None):
+    """
+    Construye la query WIQL de work items con los filtros configurables
+
+    Args:
+        cambiados_desde: Marca de agua System.ChangedDate (ISO con hora). Si se indica,
+            solo se devuelven los items modificados desde ese instante (sincronización incremental)
+        id_menor_que: Si se indica, solo items con System.Id menor (paginación por ventanas)
+
+    Returns:
+        dict con la query WIQL lista para enviar a Azure DevOps
+    """
     # Construir filtro de tipos
     if not work_item_types or len(work_item_types) == 0:
         work_item_types = ['Bug']
@@ -417,143 +708,326 @@ def obtener_incidencias_devops(organization, project, pat, area_path=None, work_
     if assigned_to:
         assigned_filter = f"AND [System.AssignedTo] = '{assigned_to}'"
 
-    wiql = {
+    # Filtro incremental (requiere timePrecision=true en la llamada)
+    delta_filter = ""
+    if cambiados_desde:
+        delta_filter = f"AND [System.ChangedDate] >= '{cambiados_desde}'"
+
+    # Filtro de ventana (los IDs ya recorridos quedan fuera)
+    ventana_filter = ""
+    if id_menor_que:
+        ventana_filter = f"AND [System.Id] < {int(id_menor_que)}"
+
+    # La WIQL solo devuelve IDs: los campos se piden después con workitemsbatch
+    return {
         "query": f"""
-            SELECT [System.Id], [System.Title], [System.State],
-                   [System.Description], [System.Tags],
-                   [System.WorkItemType], [System.AreaPath],
-                   [Microsoft.VSTS.Common.ResolvedReason],
-                   [System.CreatedDate], [System.ChangedDate],
-                   [System.AssignedTo]
+            SELECT [System.Id]
             FROM WorkItems
             WHERE {type_filter}
             {state_filter}
             {area_filter}
             {fecha_filter}
             {assigned_filter}
+            {delta_filter}
+            {ventana_filter}
             ORDER BY [System.Id] DESC
         """
     }
-    
-    # Encoding del PAT
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
-    
+
+def consultar_ids_workitems(organization, project, pat, wiql, time_precision=False, top=None):
+    """
+    Ejecuta una query WIQL y devuelve la lista de IDs en el orden de la query
+
+    Args:
+        top: Máximo de IDs a devolver ($top). Sin él, Azure DevOps rechaza las
+            queries de más de 20.000 resultados
+
+    Returns:
+        Lista de IDs, o None si Azure DevOps devolvió un error
+        (las excepciones de red se propagan al llamador)
+    """
+    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/wiql?api-version=7.1"
+    if time_precision:
+        url += "&timePrecision=true"
+    if top:
+        url += f"&$top={int(top)}"
+
+    cliente = obtener_cliente_devops(pat)
+
     headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
+        "Content-Type": "application/json"
     }
-    
+
+    # Log del JSON REQUEST
+    add_log("📤 REQUEST JSON a Azure DevOps:", "debug")
+    add_log(json.dumps(wiql, indent=2, ensure_ascii=False), "debug")
+
+    response = cliente.post(url, json=wiql, headers=headers, timeout=30, idempotente=True)
+    add_log(f"Status Code: {response.status_code}", "debug")
+
+    # Log del JSON RESPONSE
+    add_log("📥 RESPONSE JSON de Azure DevOps:", "debug")
+
+    if response.status_code != 200:
+        add_log(f"❌ Error HTTP {response.status_code}", "error")
+        add_log(f"Response: {response.text[:500]}", "error")
+        return None
+
     try:
-        # Debug
-        add_log(f"🔍 Consultando: {organization}/{project}", "info")
-        add_log(f"📋 Tipos: {', '.join(work_item_types)}", "info")
-        if area_path:
-            add_log(f"📁 Área: {area_path}", "info")
-        if states:
-            add_log(f"📊 Estados: {', '.join(states)}", "info")
-        if fecha_inicio or fecha_fin:
-            add_log(f"📅 Rango de fechas ({fecha_tipo}): {fecha_inicio or 'inicio'} → {fecha_fin or 'ahora'}", "info")
-        if assigned_to:
-            add_log(f"👤 Asignado a: {assigned_to}", "info")
-        add_log(f"🔢 Límite: {max_items} items", "info")
+        response_json = response.json()
+        # Log del contenido de la respuesta
+        add_log(json.dumps(response_json, indent=2, ensure_ascii=False), "debug")
+    except json.JSONDecodeError as e:
+        st.error(f"❌ Error al parsear JSON: {str(e)}")
+        st.code(response.text[:500])
+        return None
 
-        # Log del JSON REQUEST
-        add_log("📤 REQUEST JSON a Azure DevOps:", "debug")
-        add_log(json.dumps(wiql, indent=2, ensure_ascii=False), "debug")
+    return [item["id"] for item in response_json.get("workItems", [])]
 
-        response = requests.post(url, json=wiql, headers=headers, timeout=30)
-        add_log(f"Status Code: {response.status_code}", "debug")
+def iterar_ids_workitems(organization, project, pat, area_path=None, work_item_types=None, states=None, fecha_inicio=None, fecha_fin=None, assigned_to=None, fecha_tipo='ChangedDate', cambiados_desde=None, max_items=None, ventana=WIQL_VENTANA_IDS):
+    """
+    Recorre todos los IDs que cumplen los filtros en ventanas de System.Id descendente
 
-        # Log del JSON RESPONSE
-        add_log("📥 RESPONSE JSON de Azure DevOps:", "debug")
+    Cada ventana es una WIQL con $top=ventana y [System.Id] < (menor ID de la ventana
+    anterior), de modo que ninguna query alcanza el límite de resultados de Azure DevOps.
+    Los IDs se entregan en cuanto llega cada ventana para que la descarga de detalles
+    empiece sin esperar al recorrido completo.
 
-        if response.status_code != 200:
-            add_log(f"❌ Error HTTP {response.status_code}", "error")
-            add_log(f"Response: {response.text[:500]}", "error")
-            return []
+    Args:
+        max_items: Máximo total de IDs (None o 0 para recorrer el proyecto entero)
+        ventana: IDs por query WIQL
 
-        response.raise_for_status()
+    Yields:
+        Listas de IDs (una por ventana), en orden de ID descendente
+    """
+    pendientes = max_items or None
+    id_menor_que = None
+    num_ventana = 0
+
+    while pendientes is None or pendientes > 0:
+        top = ventana if pendientes is None else min(ventana, pendientes)
+        wiql = construir_wiql_workitems(
+            area_path, work_item_types, states, fecha_inicio, fecha_fin, assigned_to,
+            fecha_tipo, cambiados_desde=cambiados_desde, id_menor_que=id_menor_que
+        )
+        ids = consultar_ids_workitems(organization, project, pat, wiql, time_precision=bool(cambiados_desde), top=top)
+        if ids is None:
+            raise requests.exceptions.RequestException("Azure DevOps devolvió un error en la query WIQL")
 
-        try:
-            response_json = response.json()
-            # Log del contenido de la respuesta
-            add_log(json.dumps(response_json, indent=2, ensure_ascii=False), "debug")
-        except json.JSONDecodeError as e:
-            st.error(f"❌ Error al parsear JSON: {str(e)}")
-            st.code(response.text[:500])
-            return []
+        num_ventana += 1
+        add_log(f"🪟 Ventana WIQL {num_ventana}: {len(ids)} IDs" + (f" (Id < {id_menor_que})" if id_menor_que else ""), "info")
+        if ids:
+            yield ids
+
+        if len(ids) < top:
+            break
+        id_menor_que = ids[-1]
+        if pendientes is not None:
+            pendientes -= len(ids)
+
+def listar_ids_workitems(organization, project, pat, **filtros):
+    """Devuelve en una lista todos los IDs de iterar_ids_workitems (mismos argumentos)"""
+    return [wid for ids in iterar_ids_workitems(organization, project, pat, **filtros) for wid in ids]
+
+def _lotes_ids(work_item_ids, tamano):
+    """Agrupa un iterable de IDs en listas de como máximo `tamano` elementos"""
+    lote = []
+    for work_item_id in work_item_ids:
+        lote.append(work_item_id)
+        if len(lote) == tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def obtener_detalles_workitems(organization, project, pat, work_item_ids, comments_workers=8, comentarios_lazy=False):
+    """
+    Descarga los detalles y comentarios de una lista de work items
 
-        work_item_ids = [item["id"] for item in response_json.get("workItems", [])]
+    Args:
+        work_item_ids: IDs a descargar (se respeta su orden en el resultado). Puede ser
+            un iterable perezoso: los lotes de detalles se piden según van llegando IDs
+        comments_workers: Número máximo de peticiones de comentarios simultáneas
+        comentarios_lazy: Si es True no se piden comentarios; los items sin comentarios
+            guardados quedan con comentarios=None y se cargan al consultarlos
 
-        # Log de los IDs obtenidos
-        add_log(f"🔢 Total de Work Items IDs obtenidos: {len(work_item_ids)}", "info")
-        if work_item_ids:
-            add_log(f"📋 Primeros 10 IDs: {work_item_ids[:10]}", "debug")
-            add_log(f"📋 Últimos 10 IDs: {work_item_ids[-10:]}", "debug")
-        
-        if not work_item_ids:
-            st.warning("⚠️ La query no devolvió ningún Work Item")
-            st.info("Verifica que existan items del tipo seleccionado")
-            return []
+    Los comentarios guardados en el almacén local para la misma revisión del work item
+    se reutilizan sin volver a pedirlos.
 
-        # Log antes de limitar
-        add_log(f"📊 Total de IDs antes de limitar: {len(work_item_ids)}", "info")
+    Returns:
+        Lista de dicts de work item (las excepciones de red se propagan al llamador)
+    """
+    store = obtener_workitem_store()
 
-        # Limitar al máximo configurado
-        work_item_ids = work_item_ids[:max_items]
-        add_log(f"✂️ IDs después de limitar a {max_items}: {len(work_item_ids)}", "info")
-        if len(work_item_ids) > 0:
-            add_log(f"🔝 Primeros IDs después de limitar: {work_item_ids[:10]}", "debug")
-            add_log(f"🔽 Últimos IDs después de limitar: {work_item_ids[-10:]}", "debug")
+    cliente = obtener_cliente_devops(pat)
 
-        st.success(f"✅ Se encontraron {len(work_item_ids)} work items")
-        
-        # Obtener detalles en lotes de 200
-        all_items = []
-        batch_size = 200
+    headers = {
+        "Content-Type": "application/json"
+    }
 
-        # Crear placeholder para progreso de comentarios
-        comments_progress = st.empty()
+    # Obtener detalles en lotes de 200 (máximo de workitemsbatch)
+    all_items = []
+    batch_size = 200
+    details_url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitemsbatch?api-version=7.1"
+    campos_proyeccion = [campo for campo, _ in WORKITEM_CAMPOS_SYNC.values()]
 
-        for i in range(0, len(work_item_ids), batch_size):
-            batch_ids = work_item_ids[i:i+batch_size]
-            ids_str = ",".join(map(str, batch_ids))
-            details_url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems?ids={ids_str}&api-version=7.1"
+    # Crear placeholder para progreso de comentarios
+    comments_progress = st.empty()
 
-            details_response = requests.get(details_url, headers=headers, timeout=30)
+    # Los comentarios se piden en el event loop asíncrono compartido, con como mucho
+    # comments_workers peticiones en vuelo y sin un hilo por petición: mientras se descargan
+    # los detalles del siguiente lote, los comentarios de los anteriores ya están en vuelo.
+    # Cada future guarda la posición de su item en all_items para conservar el orden.
+    comentarios_futures = {}
+    runner = obtener_runner_devops()
+    cliente_async = obtener_cliente_async_devops(pat)
+    limite_comentarios = runner.limitar(comments_workers)
+
+    try:
+        for batch_ids in _lotes_ids(work_item_ids, batch_size):
+            # POST workitemsbatch con proyección: solo los campos que se mapean al dict
+            details_body = {
+                "ids": batch_ids,
+                "fields": campos_proyeccion,
+                "errorPolicy": "omit"  # Los IDs borrados entre la WIQL y este lote se omiten
+            }
+            details_response = cliente.post(details_url, json=details_body, headers=headers, timeout=30, idempotente=True)
             details_response.raise_for_status()
 
-            for item in details_response.json().get("value", []):
+            batch_items = [item for item in details_response.json().get("value", []) if item]
+            comentarios_guardados = store.comentarios_vigentes(
+                organization, project, {item["id"]: item.get("rev", 0) for item in batch_items}
+            )
+
+            for item in batch_items:
                 fields = item.get("fields", {})
                 work_item_id = item["id"]
 
-                # Obtener comentarios del work item
-                comments_progress.info(f"📝 Obteniendo comentarios de work item {work_item_id}... ({len(all_items)+1}/{len(work_item_ids)})")
-                comentarios = obtener_comentarios_workitem(organization, project, pat, work_item_id)
+                # Lanzar la descarga de comentarios del work item en segundo plano
+                # (solo si no están guardados para esta revisión)
+                comentarios = comentarios_guardados.get(work_item_id)
+                if comentarios is None and not comentarios_lazy:
+                    future = runner.enviar(con_limite(
+                        limite_comentarios,
+                        devops_async.obtener_comentarios_workitem(cliente_async, organization, project, work_item_id)
+                    ))
+                    comentarios_futures[future] = len(all_items)
+
+                work_item = {"id": work_item_id, "rev": item.get("rev", 0)}
+                for clave, (campo, por_defecto) in WORKITEM_CAMPOS_SYNC.items():
+                    work_item[clave] = fields.get(campo, por_defecto)
 
                 # Procesar campo AssignedTo (puede ser un objeto o string)
-                assigned_to = fields.get("System.AssignedTo", "")
-                if isinstance(assigned_to, dict):
-                    assigned_to = assigned_to.get("displayName", "")
-
-                all_items.append({
-                    "id": work_item_id,
-                    "tipo": fields.get("System.WorkItemType", ""),
-                    "titulo": fields.get("System.Title", "Sin título"),
-                    "descripcion": fields.get("System.Description", "Sin descripción"),
-                    "estado": fields.get("System.State", ""),
-                    "area": fields.get("System.AreaPath", ""),
-                    "tags": fields.get("System.Tags", ""),
-                    "resolucion": fields.get("Microsoft.VSTS.Common.ResolvedReason", ""),
-                    "fecha_creacion": fields.get("System.CreatedDate", ""),
-                    "fecha_cambio": fields.get("System.ChangedDate", ""),
-                    "assigned_to": assigned_to,
-                    "url": item.get("url", ""),
-                    "comentarios": comentarios  # Nueva propiedad con comentarios
-                })
+                if isinstance(work_item["assigned_to"], dict):
+                    work_item["assigned_to"] = work_item["assigned_to"].get("displayName", "")
+
+                work_item["url"] = item.get("url", "")
+                # Se rellena cuando termina su future (o al consultar, en modo lazy)
+                work_item["comentarios"] = comentarios if comentarios is not None or comentarios_lazy else []
+                all_items.append(work_item)
+
+            total_str = f"/{len(work_item_ids)}" if isinstance(work_item_ids, list) else ""
+            if comentarios_lazy:
+                comments_progress.info(f"📝 Detalles obtenidos: {len(all_items)}{total_str} (comentarios bajo demanda)")
+            else:
+                comments_progress.info(f"📝 Detalles obtenidos: {len(all_items)}{total_str} — descargando comentarios en paralelo ({comments_workers} simultáneos, {len(all_items) - len(comentarios_futures)} reutilizados)...")
+
+        # Recoger los comentarios según van terminando
+        completados = 0
+        fallidos = []
+        total_comentarios = len(comentarios_futures)
+        for future in as_completed(comentarios_futures):
+            idx = comentarios_futures[future]
+            try:
+                all_items[idx]["comentarios"] = future.result()
+            except Exception as e:
+                # Cualquier fallo (HTTP, JSON inesperado, petición cancelada) deja el work
+                # item para el reintento síncrono en lugar de abortar la sincronización
+                fallidos.append(idx)
+                add_log(f"⚠️ Comentarios de #{all_items[idx]['id']} no disponibles: {str(e)[:150]}", "warning")
+            completados += 1
+            if completados % 10 == 0 or completados == total_comentarios:
+                comments_progress.info(f"📝 Obteniendo comentarios de work items... ({completados}/{total_comentarios})")
+    finally:
+        # Si algo falla a mitad, no esperar a las peticiones pendientes
+        for future in comentarios_futures:
+            future.cancel()
+
+    # Segundo intento, de uno en uno, para los que fallaron (normalmente por throttling).
+    # Los que sigan fallando quedan con comentarios=None: no se guardan en el almacén
+    # y se vuelven a pedir en la siguiente sincronización.
+    if fallidos:
+        comments_progress.info(f"🔁 Reintentando comentarios de {len(fallidos)} work items...")
+        sin_comentarios = 0
+        for idx in fallidos:
+            try:
+                all_items[idx]["comentarios"] = obtener_comentarios_workitem(organization, project, pat, all_items[idx]["id"])
+            except requests.exceptions.RequestException:
+                all_items[idx]["comentarios"] = None
+                sin_comentarios += 1
+        if sin_comentarios:
+            add_log(f"⚠️ {sin_comentarios} work items sin comentarios tras reintentar; se pedirán en la próxima sincronización", "warning")
+            st.warning(f"⚠️ No se pudieron obtener los comentarios de {sin_comentarios} work items (Azure DevOps limitó las peticiones). Se reintentarán en la próxima sincronización.")
+
+    comments_progress.empty()  # Limpiar mensaje de progreso
+
+    return all_items
 
-        comments_progress.empty()  # Limpiar mensaje de progreso
+def obtener_incidencias_devops(organization, project, pat, area_path=None, work_item_types=None, max_items=400, states=None, fecha_inicio=None, fecha_fin=None, assigned_to=None, fecha_tipo='ChangedDate', comments_workers=8, comentarios_lazy=False):
+    """
+    Obtiene work items de Azure DevOps con filtros configurables
+
+    Args:
+        organization: Organización de Azure DevOps
+        project: Proyecto
+        pat: Personal Access Token
+        area_path: Ruta del área (opcional)
+        work_item_types: Lista de tipos de work items (opcional)
+        max_items: Máximo de items a retornar (None o 0 para el proyecto completo)
+        states: Lista de estados a filtrar (opcional, ej: ['New', 'Active', 'Resolved'])
+        fecha_inicio: Fecha inicio para filtrado (formato: YYYY-MM-DD)
+        fecha_fin: Fecha fin para filtrado (formato: YYYY-MM-DD)
+        assigned_to: Usuario asignado para filtrar (opcional)
+        fecha_tipo: Tipo de fecha para filtrar ('CreatedDate' o 'ChangedDate')
+        comments_workers: Número máximo de peticiones de comentarios simultáneas
+        comentarios_lazy: No descargar comentarios (se cargan al consultar los items)
+    """
+    if not work_item_types or len(work_item_types) == 0:
+        work_item_types = ['Bug']
+
+    try:
+        # Debug
+        add_log(f"🔍 Consultando: {organization}/{project}", "info")
+        add_log(f"📋 Tipos: {', '.join(work_item_types)}", "info")
+        if area_path:
+            add_log(f"📁 Área: {area_path}", "info")
+        if states:
+            add_log(f"📊 Estados: {', '.join(states)}", "info")
+        if fecha_inicio or fecha_fin:
+            add_log(f"📅 Rango de fechas ({fecha_tipo}): {fecha_inicio or 'inicio'} → {fecha_fin or 'ahora'}", "info")
+        if assigned_to:
+            add_log(f"👤 Asignado a: {assigned_to}", "info")
+        add_log(f"🔢 Límite: {max_items or 'sin límite (proyecto completo)'} items", "info")
+
+        # Los IDs llegan por ventanas WIQL y se van descargando sus detalles
+        # sin esperar a que termine el recorrido completo
+        ventanas = iterar_ids_workitems(
+            organization, project, pat,
+            area_path=area_path, work_item_types=work_item_types, states=states,
+            fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, assigned_to=assigned_to,
+            fecha_tipo=fecha_tipo, max_items=max_items
+        )
+        all_items = obtener_detalles_workitems(
+            organization, project, pat,
+            (wid for ids in ventanas for wid in ids),
+            comments_workers,
+            comentarios_lazy
+        )
+
+        if not all_items:
+            st.warning("⚠️ La query no devolvió ningún Work Item")
+            st.info("Verifica que existan items del tipo seleccionado")
+            return []
 
         # Log de los items finales procesados
         add_log(f"✅ Total de items procesados: {len(all_items)}", "success")
@@ -564,7 +1038,7 @@ def obtener_incidencias_devops(organization, project, pat, area_path=None, work_
             add_log(f"🔽 Últimos 10 IDs procesados: {ultimos_ids}", "debug")
 
         return all_items
-    
+
     except requests.exceptions.Timeout:
         st.error("❌ Timeout: Azure DevOps no respondió a tiempo")
         return []
@@ -574,40 +1048,119 @@ def obtener_incidencias_devops(organization, project, pat, area_path=None, work_
             st.code(e.response.text[:500])
         return []
 
+def clave_sync_workitems(organization, project, area_path=None, work_item_types=None, max_items=400, states=None, assigned_to=None):
+    """Identificador estable del conjunto de filtros de una sincronización (org/proyecto/filtros)."""
+    filtros = {
+        "area_path": area_path or "",
+        "work_item_types": sorted(work_item_types or ['Bug']),
+        "max_items": max_items,
+        "states": sorted(states or []),
+        "assigned_to": assigned_to or "",
+    }
+    return f"{organization}/{project}/{hashlib.sha256(json.dumps(filtros, sort_keys=True).encode()).hexdigest()[:16]}"
+
+def calcular_watermark(incidencias):
+    """Devuelve el System.ChangedDate más reciente de la lista (ISO 8601), o None si está vacía."""
+    fechas = [inc.get('fecha_cambio') for inc in incidencias if inc.get('fecha_cambio')]
+    if not fechas:
+        return None
+    return max(fechas, key=_parse_fecha_azure)
+
+def _parse_fecha_azure(fecha):
+    """Convierte una fecha ISO de Azure DevOps (con 'Z' y fracción variable) en datetime comparable."""
+    m = re.match(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?', fecha)
+    if not m:
+        return datetime.min
+    fraccion = (m.group(2) or "0")[:6].ljust(6, "0")
+    return datetime.fromisoformat(f"{m.group(1)}.{fraccion}")
+
+def sincronizar_incidencias_devops(organization, project, pat, area_path=None, work_item_types=None, max_items=400, states=None, assigned_to=None, comments_workers=8, incremental=True, comentarios_lazy=False):
+    """
+    Sincroniza work items usando la marca de agua de System.ChangedDate guardada en disco
+
+    En modo incremental solo se descargan (detalles y comentarios) los items nuevos o
+    modificados desde la última sincronización del mismo conjunto de filtros; los items
+    que ya no cumplen los filtros (estado, Removed, fuera del límite) se eliminan de la caché.
+
+    Returns:
+        tuple (incidencias, ids_cambiados) donde ids_cambiados es el conjunto de IDs
+        descargados en esta llamada (todos en una sincronización completa)
+    """
+    if not work_item_types or len(work_item_types) == 0:
+        work_item_types = ['Bug']
+
+    clave = clave_sync_workitems(organization, project, area_path, work_item_types, max_items, states, assigned_to)
+    store = obtener_workitem_store()
+    snapshot = store.cargar(clave) if incremental else None
+
+    if not snapshot or not snapshot.get("watermark"):
+        # Primera sincronización (o completa forzada)
+        incidencias = obtener_incidencias_devops(
+            organization, project, pat,
+            area_path=area_path, work_item_types=work_item_types, max_items=max_items,
+            states=states, assigned_to=assigned_to, comments_workers=comments_workers,
+            comentarios_lazy=comentarios_lazy
+        )
+        if incidencias:
+            store.guardar(clave, organization, project, calcular_watermark(incidencias), incidencias)
+        return incidencias, {inc['id'] for inc in incidencias}
+
+    watermark = snapshot["watermark"]
+    cache_por_id = {inc['id']: inc for inc in snapshot.get("items", [])}
+    add_log(f"⚡ Sincronización incremental desde {watermark} ({len(cache_por_id)} items en caché)", "info")
+
+    try:
+        # 1) Pertenencia actual al filtro (solo IDs): detecta altas, bajas y cambios de estado
+        ids_actuales = listar_ids_workitems(
+            organization, project, pat,
+            area_path=area_path, work_item_types=work_item_types, states=states,
+            assigned_to=assigned_to, max_items=max_items
+        )
+        # 2) Items del filtro modificados desde la marca de agua
+        ids_modificados = set(listar_ids_workitems(
+            organization, project, pat,
+            area_path=area_path, work_item_types=work_item_types, states=states,
+            assigned_to=assigned_to, cambiados_desde=watermark
+        ))
+        ids_a_descargar = [
+            wid for wid in ids_actuales
+            if wid not in cache_por_id or wid in ids_modificados
+            # comentarios pendientes de una sincronización anterior (salvo en modo lazy)
+            or (not comentarios_lazy and cache_por_id[wid].get('comentarios') is None)
+        ]
+        ids_eliminados = set(cache_por_id) - set(ids_actuales)
+
+        add_log(f"🔄 Delta: {len(ids_a_descargar)} nuevos/modificados, {len(ids_eliminados)} eliminados del filtro", "info")
+
+        if ids_a_descargar:
+            for inc in obtener_detalles_workitems(organization, project, pat, ids_a_descargar, comments_workers, comentarios_lazy):
+                cache_por_id[inc['id']] = inc
+
+    except requests.exceptions.Timeout:
+        st.error("❌ Timeout: Azure DevOps no respondió a tiempo")
+        return [], set()
+    except requests.exceptions.RequestException as e:
+        st.error(f"❌ Error de conexión: {str(e)}")
+        if hasattr(e.response, 'text'):
+            st.code(e.response.text[:500])
+        return [], set()
+
+    # Mantener el orden de la WIQL (ID descendente)
+    incidencias = [cache_por_id[wid] for wid in ids_actuales if wid in cache_por_id]
+    nuevo_watermark = calcular_watermark(incidencias) or watermark
+    store.guardar(clave, organization, project, nuevo_watermark, incidencias)
+
+    return incidencias, set(ids_a_descargar)
+
 def obtener_attachments_workitem(organization, project, pat, work_item_id):
     """
-    Obtiene la lista de attachments de un work item
+    Obtiene la lista de attachments .docx de un work item (por el cliente asíncrono
+    compartido, ver devops_async)
     """
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/{work_item_id}?$expand=all&api-version=7.1"
-    
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
-    }
-    
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        work_item = response.json()
-        relations = work_item.get("relations", [])
-        
-        attachments = []
-        for relation in relations:
-            if relation.get("rel") == "AttachedFile":
-                file_name = relation.get("attributes", {}).get("name", "Unknown")
-                # Solo incluir archivos .docx
-                if file_name.lower().endswith('.docx'):
-                    attachments.append({
-                        "url": relation.get("url"),
-                        "name": file_name
-                    })
-        
-        return attachments
-    
+        return obtener_runner_devops().ejecutar(devops_async.obtener_attachments_workitem(
+            obtener_cliente_async_devops(pat), organization, project, work_item_id
+        ))
     except Exception as e:
         st.error(f"Error al obtener attachments: {str(e)}")
         return []
@@ -624,61 +1177,38 @@ def obtener_comentarios_workitem(organization, project, pat, work_item_id):
 
     Returns:
         Lista de comentarios ordenados de más reciente a más antiguo
+        (vacía si el work item no tiene comentarios o ya no existe)
+
+    Raises:
+        requests.exceptions.RequestException: Si la petición falla tras los reintentos
+            del cliente (throttling persistente, 5xx, red), para no confundirlo con
+            un work item sin comentarios
     """
     url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workItems/{work_item_id}/comments?api-version=7.1-preview.3"
 
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    cliente = obtener_cliente_devops(pat)
 
     headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
+        "Content-Type": "application/json"
     }
 
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-
-        comments_data = response.json()
-        comments = comments_data.get("comments", [])
-
-        # Ordenar por fecha más reciente primero
-        comments_sorted = sorted(
-            comments,
-            key=lambda x: x.get("createdDate", ""),
-            reverse=True
-        )
-
-        # Formatear comentarios
-        formatted_comments = []
-        for comment in comments_sorted:
-            formatted_comments.append({
-                "text": comment.get("text", ""),
-                "createdBy": comment.get("createdBy", {}).get("displayName", "Unknown"),
-                "createdDate": comment.get("createdDate", ""),
-                "modifiedDate": comment.get("modifiedDate", "")
-            })
-
-        return formatted_comments
-
-    except Exception as e:
-        # No mostrar error en UI, solo retornar lista vacía
-        # Algunos work items pueden no tener comentarios o dar error 404
+    response = cliente.get(url, headers=headers, timeout=30)
+    if response.status_code == 404:
+        # Work item eliminado o sin acceso a sus comentarios
         return []
+    response.raise_for_status()
+
+    # Ordenados de más reciente a más antiguo
+    return formatear_comentarios(response.json())
 
 def descargar_attachment_devops(attachment_url, pat):
     """
     Descarga un attachment desde Azure DevOps
     """
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
-
-    headers = {
-        "Authorization": f"Basic {encoded_credentials}"
-    }
+    cliente = obtener_cliente_devops(pat)
 
     try:
-        response = requests.get(attachment_url, headers=headers, timeout=30)
+        response = cliente.get(attachment_url, timeout=30)
         response.raise_for_status()
         return response.content
     except Exception as e:
@@ -704,12 +1234,10 @@ def crear_workitem_devops(organization, project, pat, work_item_type, campos, fi
     url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/${work_item_type}?api-version=7.1"
 
     # Encoding del PAT
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    cliente = obtener_cliente_devops(pat)
 
     headers = {
-        "Content-Type": "application/json-patch+json",
-        "Authorization": f"Basic {encoded_credentials}"
+        "Content-Type": "application/json-patch+json"
     }
 
     # Construir el body en formato JSON Patch
@@ -752,7 +1280,7 @@ def crear_workitem_devops(organization, project, pat, work_item_type, campos, fi
         })
 
     try:
-        response = requests.post(url, json=body, headers=headers, timeout=30)
+        response = cliente.post(url, json=body, headers=headers, timeout=30)
 
         if response.status_code == 200 or response.status_code == 201:
             data = response.json()
@@ -798,39 +1326,346 @@ def limpiar_html(texto):
     texto = re.sub(r'\s+', ' ', texto)
     return texto.strip()
 
-def generar_embeddings_incidencias(incidencias, modelo):
+def secciones_texto(texto, max_tokens=CHUNK_INCIDENCIA_TOKENS):
+    """
+    Divide un texto (HTML o plano) en secciones de como mucho max_tokens tokens, sin
+    solape, respetando los párrafos (ver dividir_en_chunks)
+    """
+    if not texto:
+        return []
+    texto = re.sub(r'(?i)<br\s*/?>|</(p|div|li|h[1-6]|tr|pre|blockquote)>', '\n\n', texto)
+    paragrafos = [limpiar_html(para) for para in re.split(r'\n\s*\n', texto)]
+    chunks = dividir_en_chunks("\n\n".join(p for p in paragrafos if p), chunk_tokens=max_tokens, solape_tokens=0)
+    return [chunk["texto"] for chunk in chunks]
+
+def chunks_incidencia(inc):
+    """
+    Textos que se indexan de un work item, cada uno con su propio embedding: cabecera
+    (título, tags, resolución, estado, asignado) con el inicio de la descripción, el
+    resto de secciones de la descripción y los comentarios. Cada chunk lleva el título
+    para que se entienda solo.
+
+    Returns:
+        Lista de textos (al menos uno, como mucho MAX_CHUNKS_INCIDENCIA)
+    """
+    titulo = inc['titulo']
+    assigned = inc.get('assigned_to', '')
+    cabecera = f"{titulo} {inc['tags']} {inc['resolucion']} {inc['estado']} {assigned}".strip()
+
+    comentarios = []
+    for comment in (inc.get('comentarios') or [])[:MAX_COMENTARIOS_INDEXADOS]:
+        comment_text = limpiar_html(comment.get('text', ''))
+        if len(comment_text) >= MIN_CARACTERES_COMENTARIO:
+            # Solo la primera sección de cada comentario
+            comentarios.extend(f"{titulo}: {seccion}" for seccion in secciones_texto(comment_text)[:1])
+
+    secciones = secciones_texto(inc['descripcion'])
+    # La descripción cede sitio a los comentarios, pero conserva al menos la mitad
+    max_secciones = max(MAX_CHUNKS_INCIDENCIA - len(comentarios), MAX_CHUNKS_INCIDENCIA // 2)
+    chunks = [f"{cabecera} {secciones[0]}" if secciones else cabecera]
+    chunks += [f"{titulo}: {seccion}" for seccion in secciones[1:max_secciones]]
+    chunks += comentarios
+    return list(dict.fromkeys(chunks))[:MAX_CHUNKS_INCIDENCIA]
+
+def chunks_incidencias(incidencias):
+    """
+    Chunks de una lista de work items, en filas consecutivas por item
+
+    Returns:
+        tuple (textos, padres): texto de cada chunk y posición de su work item (np.int32)
+    """
+    textos, padres = [], []
+    for posicion, inc in enumerate(incidencias):
+        chunks = chunks_incidencia(inc)
+        textos.extend(chunks)
+        padres.extend([posicion] * len(chunks))
+    return textos, np.asarray(padres, dtype=np.int32)
+
+def metadatos_chunks_incidencias(incidencias, padres):
+    """Tipo y estado del work item de cada chunk (metadatos filtrables del índice)"""
+    return [{"tipo": incidencias[p]['tipo'], "estado": incidencias[p]['estado']} for p in padres]
+
+@st.cache_resource
+def obtener_worker_indexacion():
+    """Trabajos de indexación en segundo plano del proceso (sobreviven a reruns y recargas)"""
+    return IndexingWorker()
+
+def lexico_incidencias(claves, ids_cambiados):
+    """
+    Índice BM25 de partida para los chunks de una sincronización: las filas del índice de
+    la sesión cuyos work items no se descargaron de nuevo (y con el mismo texto) pasan a
+    su fila nueva sin volver a tokenizarse; las de work items eliminados desaparecen. El
+    trabajo de indexación solo añade las filas que falten.
+
+    Args:
+        claves: (id del work item, hash del texto) de cada chunk nuevo
+        ids_cambiados: IDs descargados en la sincronización (None = índice desde cero)
+    """
+    anterior = st.session_state.devops_lexico
+    claves_anteriores = st.session_state.devops_lexico_claves
+    if anterior is None or not claves_anteriores or ids_cambiados is None:
+        return BM25Index()
+
+    filas_anteriores = {
+        clave: fila for fila, clave in enumerate(claves_anteriores) if clave[0] not in ids_cambiados
+    }
+    filas = {}
+    for fila, clave in enumerate(claves):
+        anterior_fila = filas_anteriores.get(clave)
+        if anterior_fila is not None:
+            filas[anterior_fila] = fila
+    lexico = anterior.renumerado(filas)
+    add_log(f"🔤 Índice léxico: {len(lexico)} de {len(claves)} chunks reutilizados", "info")
+    return lexico
+
+def lanzar_indexacion_incidencias(organization, project, incidencias, ids_cambiados=None):
+    """
+    Indexa los work items en segundo plano, con un vector por chunk (ver chunks_incidencia)
+    y reutilizando los embeddings de la caché por contenido: solo se codifican los chunks
+    nuevos o editados, por lotes que se guardan en la caché según terminan. Mientras tanto
+    la sesión consulta el índice parcial (ver refrescar_indice_incidencias).
+
+    Args:
+        organization: Organización de Azure DevOps
+        project: Proyecto
+        incidencias: Lista de work items (con su 'rev')
+        ids_cambiados: IDs descargados en esta sincronización; el índice BM25 de la sesión
+            solo se actualiza para ellos y los eliminados (None = se construye desde cero)
+    """
+    modelo = cargar_modelo_embeddings()
+    modelo_id = id_modelo_embeddings(modelo)
+    cache = obtener_cache_embeddings()
+    textos, padres = chunks_incidencias(incidencias)
+    claves_lexico = [(incidencias[p]['id'], hash(texto)) for texto, p in zip(textos, padres.tolist())]
+
+    encontrados = cache.obtener(modelo_id, [cache.clave(texto) for texto in textos])
+    embeddings = None
+    pendientes = list(range(len(textos)))
+    if encontrados:
+        dimension = len(next(iter(encontrados.values())))
+        embeddings = np.zeros((len(textos), dimension), dtype=np.float32)
+        pendientes = []
+        for fila, texto in enumerate(textos):
+            vector = encontrados.get(cache.clave(texto))
+            if vector is None or len(vector) != dimension:
+                pendientes.append(fila)
+            else:
+                embeddings[fila] = vector
+
+    st.session_state.devops_chunks_padres = padres
+    if not pendientes:
+        # Índice vectorial completo ya; el trabajo solo construye el índice léxico
+        st.session_state.devops_embeddings = crear_indice_incidencias(incidencias, embeddings, padres)
+        add_log(
+            f"🧠 Embeddings de {len(incidencias)} work items ({len(textos)} chunks) recuperados de la caché",
+            "info"
+        )
+    else:
+        # El índice anterior tiene otras filas: hasta el primer lote no hay índice parcial
+        st.session_state.devops_embeddings = None
+
+    codificador = codificador_embeddings(modelo)
+
+    def codificar(textos):
+        return cache.codificar(modelo_id, modelo, textos, codificador=codificador)[0]
+
+    firma = hashlib.sha256("\x00".join(textos).encode("utf-8") + padres.tobytes()).hexdigest()
+    # La clave incluye la firma: otra sesión que sincronice el mismo proyecto con otros
+    # filtros lanza su propio trabajo en lugar de cancelar y sustituir el de esta
+    trabajo = obtener_worker_indexacion().lanzar(IndexingJob(
+        f"devops:{organization}/{project}:{firma[:16]}",
+        textos,
+        codificar,
+        matriz=embeddings,
+        pendientes=pendientes,
+        firma=firma,
+        lexico=lexico_incidencias(claves_lexico, ids_cambiados),
+        # Con pool multiproceso, lotes grandes para que compense repartirlos
+        tamano_lote=EMBEDDING_POOL_MIN_TEXTOS if codificador is not None else 256
+    ))
+    # El índice BM25 se va completando por lotes junto a los embeddings
+    st.session_state.devops_lexico = trabajo.lexico
+    st.session_state.devops_lexico_claves = claves_lexico
+    st.session_state.devops_indexacion_clave = trabajo.clave
+    st.session_state.devops_indexacion_firma = firma
+    st.session_state.devops_indexacion_version = trabajo.version if not pendientes else -1
+    if pendientes:
+        add_log(
+            f"🧠 Indexación en segundo plano: {len(pendientes)} de {len(textos)} chunks de "
+            f"{len(incidencias)} work items por codificar",
+            "info"
+        )
+    refrescar_indice_incidencias()
+
+def refrescar_indice_incidencias():
+    """
+    Lleva al índice de work items de la sesión el avance del trabajo en segundo plano:
+    índice parcial (solo filas ya codificadas) mientras corre y el definitivo al terminar
+    """
+    clave = st.session_state.devops_indexacion_clave
+    if not clave:
+        return
+    trabajo = obtener_worker_indexacion().trabajo(clave)
+    if trabajo is None or trabajo.estado == "cancelado" or trabajo.firma != st.session_state.devops_indexacion_firma:
+        # Proceso reiniciado, trabajo olvidado o de otro corpus: sus filas no son las de la sesión
+        st.session_state.devops_indexacion_clave = None
+        return
+    if trabajo.activo and trabajo.version == st.session_state.devops_indexacion_version:
+        return
+
+    incidencias = st.session_state.devops_incidencias
+    padres = st.session_state.devops_chunks_padres
+    matriz, listas, version = trabajo.instantanea()
+    if matriz is None or padres is None or len(matriz) != len(padres):
+        return
+
+    if trabajo.activo or trabajo.estado == "error":
+        # Índice parcial: solo se buscan las filas ya codificadas
+        st.session_state.devops_embeddings = VectorIndex(
+            matriz,
+            metadatos_chunks_incidencias(incidencias, padres),
+            precision=EMBEDDINGS_PRECISION,
+            activas=listas
+        )
+        st.session_state.devops_indexacion_version = version
+        if trabajo.activo:
+            return
+
+    st.session_state.devops_indexacion_clave = None
+    if trabajo.estado == "error":
+        add_log(f"❌ Error en la indexación en segundo plano: {trabajo.error}", "error")
+        return
+    if not trabajo.pendientes:
+        # Sin embeddings que calcular: el índice definitivo ya se creó al lanzar
+        return
+
+    st.session_state.devops_embeddings = crear_indice_incidencias(incidencias, matriz, padres)
+    progreso = trabajo.progreso()
+    add_log(
+        f"✅ Indexación en segundo plano completada: {progreso['hechos']} chunks de "
+        f"{len(incidencias)} work items en "
+        f"{progreso['transcurrido_s']}s ({progreso['textos_por_s']} textos/s)",
+        "success"
+    )
+
+def mostrar_progreso_indexacion():
+    """Barra de progreso y ETA de la indexación en segundo plano de los work items"""
+    refrescar_indice_incidencias()
+    clave = st.session_state.devops_indexacion_clave
+    trabajo = obtener_worker_indexacion().trabajo(clave) if clave else None
+    if trabajo is None:
+        return
+
+    progreso = trabajo.progreso()
+    if not progreso['total']:
+        return
+    eta = f"{progreso['eta_s']:.0f}s" if progreso['eta_s'] is not None else "calculando..."
+    st.progress(
+        progreso['porcentaje'] / 100,
+        text=(
+            f"🧠 Indexando en segundo plano: {progreso['hechos']}/{progreso['total']} chunks de work items · "
+            f"{progreso['textos_por_s']} textos/s · quedan {eta}"
+        )
+    )
+    st.caption("Las consultas ya usan los work items indexados hasta ahora")
+
+if hasattr(st, "fragment"):
+    # Se refresca sola cada 2 segundos sin relanzar el resto del script
+    mostrar_progreso_indexacion = st.fragment(run_every=2)(mostrar_progreso_indexacion)
+
+def cargar_incidencias_desde_store(organization, project):
+    """
+    Recupera en la sesión la última sincronización guardada del proyecto (arranque en caliente)
+
+    Returns:
+        True si se cargaron work items desde el almacén local
+    """
+    store = obtener_workitem_store()
+    clave = store.ultima_clave(organization, project)
+    if not clave:
+        return False
+
+    incidencias = store.items(clave)
+    if not incidencias:
+        return False
+
+    st.session_state.devops_incidencias = incidencias
+    st.session_state.devops_embeddings = None
+    lanzar_indexacion_incidencias(organization, project, incidencias)
+    st.session_state.devops_sync_clave = clave
+    st.session_state.devops_indexed = True
+    add_log(f"♻️ {len(incidencias)} work items recuperados del almacén local ({organization}/{project})", "info")
+    return True
+
+def obtener_incidencias_indexadas(tipos=None):
+    """
+    Devuelve los work items de la sincronización indexada leyendo del almacén local
+
+    Args:
+        tipos: Si se indica, solo los work items de esos tipos
+    """
+    if st.session_state.devops_sync_clave:
+        return obtener_workitem_store().items(st.session_state.devops_sync_clave, tipos)
+    return [
+        inc for inc in st.session_state.devops_incidencias
+        if not tipos or inc['tipo'] in tipos
+    ]
+
+def estadisticas_incidencias_indexadas():
+    """Conteo por tipo y por estado de los work items indexados"""
+    if st.session_state.devops_sync_clave:
+        return obtener_workitem_store().estadisticas(st.session_state.devops_sync_clave)
+
+    tipos, estados = {}, {}
+    for inc in st.session_state.devops_incidencias:
+        tipos[inc['tipo']] = tipos.get(inc['tipo'], 0) + 1
+        estados[inc['estado']] = estados.get(inc['estado'], 0) + 1
+    return {"tipos": tipos, "estados": estados, "total": len(st.session_state.devops_incidencias)}
+
+def crear_indice_incidencias(incidencias, embeddings, padres):
     """
-    Genera embeddings para cada incidencia
+    Crea el índice vectorial de los chunks de los work items, con el tipo y estado de su
+    work item como metadatos filtrables
+
+    Args:
+        padres: Posición del work item de cada fila (ver chunks_incidencias)
     """
-    textos = []
-    for inc in incidencias:
-        # Incluir más información en el texto para mejorar las búsquedas
-        assigned = inc.get('assigned_to', '')
-        texto_completo = f"{inc['titulo']} {limpiar_html(inc['descripcion'])} {inc['tags']} {inc['resolucion']} {inc['estado']} {assigned}"
-        textos.append(texto_completo)
-    
-    with st.spinner("🔄 Generando embeddings de incidencias..."):
-        embeddings = modelo.encode(textos, show_progress_bar=True)
-    
-    return np.array(embeddings)
+    return crear_indice_vectorial("devops", embeddings, metadatos_chunks_incidencias(incidencias, padres))
 
-def buscar_incidencias_similares(query, incidencias, embeddings, modelo, top_k=5):
+def buscar_incidencias_similares(query, incidencias, indice, modelo, top_k=5, tipos=None, lexico=None, padres=None):
     """
-    Busca las incidencias más similares a la query usando embeddings
+    Busca las incidencias más similares a la query: embeddings y, si hay índice léxico,
+    BM25 (códigos de error, componentes, tags...) fusionados por RRF. La búsqueda es por
+    chunks y cada work item puntúa según sus chunks (AGREGACION_CHUNKS).
+
+    Args:
+        indice: VectorIndex de los chunks de los work items (crear_indice_incidencias);
+            None mientras la indexación en segundo plano no ha terminado el primer lote
+        tipos: Si se indica, solo se buscan work items de esos tipos
+        lexico: BM25Index de los chunks (opcional)
+        padres: Work item de cada fila del índice (None = una fila por work item)
     """
+    if indice is None:
+        return []
+
     query_embedding = modelo.encode([query])[0]
-    
-    similitudes = np.dot(embeddings, query_embedding) / (
-        np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
-    )
-    
-    top_indices = np.argsort(similitudes)[-top_k:][::-1]
-    
+    filtro = {"tipo": tipos} if tipos else None
+
+    if padres is None:
+        coincidencias = busqueda_hibrida(indice, lexico, query, query_embedding, top_k=top_k, filtro=filtro)
+    else:
+        coincidencias = agrupar_por_padre(
+            busqueda_hibrida(indice, lexico, query, query_embedding, top_k=top_k * CANDIDATOS_POR_ITEM, filtro=filtro),
+            padres,
+            top_k=top_k,
+            agregacion=AGREGACION_CHUNKS
+        )
+
     resultados = []
-    for idx in top_indices:
+    for idx, similitud in coincidencias:
         resultados.append({
             "incidencia": incidencias[idx],
-            "similitud": float(similitudes[idx])
+            "similitud": similitud
         })
     
     return resultados
@@ -869,6 +1704,57 @@ def buscar_work_items_por_id(query, incidencias):
 
     return ids_encontrados, ids_no_encontrados, items_encontrados
 
+def completar_comentarios_resultados(organization, project, pat, resultados):
+    """
+    Carga bajo demanda los comentarios de los work items recuperados que no los tienen
+    (sincronización con comentarios lazy)
+
+    Se consulta primero la caché TTL por (id, revisión), después el almacén local y solo
+    los que falten se piden a Azure DevOps, en paralelo. Los items se actualizan en sitio.
+
+    Args:
+        resultados: Lista de {"incidencia", "similitud"} devuelta por la búsqueda
+    """
+    pendientes = [r["incidencia"] for r in resultados if r["incidencia"].get("comentarios") is None]
+    if not pendientes:
+        return
+
+    cache = obtener_cache_comentarios()
+    store = obtener_workitem_store()
+
+    sin_cache = []
+    for inc in pendientes:
+        comentarios = cache.obtener(organization, project, inc["id"], inc.get("rev", 0))
+        if comentarios is None:
+            sin_cache.append(inc)
+        else:
+            inc["comentarios"] = comentarios
+
+    guardados = store.comentarios_vigentes(organization, project, {inc["id"]: inc.get("rev", 0) for inc in sin_cache})
+    a_descargar = []
+    for inc in sin_cache:
+        if inc["id"] in guardados:
+            inc["comentarios"] = guardados[inc["id"]]
+            cache.guardar(organization, project, inc["id"], inc.get("rev", 0), inc["comentarios"])
+        else:
+            a_descargar.append(inc)
+
+    add_log(f"💬 Comentarios bajo demanda: {len(pendientes) - len(a_descargar)} en caché, {len(a_descargar)} a descargar", "info")
+    if not a_descargar:
+        return
+
+    descargados = obtener_runner_devops().ejecutar(devops_async.obtener_comentarios_workitems(
+        obtener_cliente_async_devops(pat), organization, project, [inc["id"] for inc in a_descargar]
+    ))
+    for inc in a_descargar:
+        comentarios = descargados[inc["id"]]
+        if isinstance(comentarios, Exception):
+            add_log(f"⚠️ Comentarios de #{inc['id']} no disponibles: {str(comentarios)[:150]}", "warning")
+            continue
+        inc["comentarios"] = comentarios
+        cache.guardar(organization, project, inc["id"], inc.get("rev", 0), comentarios)
+        store.guardar_comentarios(organization, project, inc["id"], inc.get("rev", 0), comentarios)
+
 def construir_contexto_devops(incidencias_similares):
     """
     Construye el contexto para enviar a la IA con las incidencias encontradas
@@ -920,6 +1806,7 @@ def construir_contexto_devops(incidencias_similares):
 def leer_docx_desde_bytes(file_bytes, extraer_imagenes=False):
     """Lee un documento Word desde bytes y convierte a Markdown preservando tablas,
     encabezados y formato (negrita/cursiva), manteniendo el orden original del documento.
+    La conversión recorre el XML en streaming (ver docx_markdown).
 
     Args:
         file_bytes: Bytes del documento DOCX
@@ -931,133 +1818,157 @@ def leer_docx_desde_bytes(file_bytes, extraer_imagenes=False):
             donde imagenes es una lista de dict con 'data' (bytes), 'name', 'position' (índice en markdown)
     """
     try:
-        from docx.text.paragraph import Paragraph as DocxParagraph
-        from docx.table import Table as DocxTable
-
-        doc = docx.Document(BytesIO(file_bytes))
-
-        HEADING_MAP = {
-            'Heading 1': '#', 'Heading 2': '##', 'Heading 3': '###',
-            'Heading 4': '####', 'Title': '#', 'Subtitle': '##',
-        }
-
-        def runs_to_md(para):
-            parts = []
-            for run in para.runs:
-                t = run.text
-                if not t:
-                    continue
-                if run.bold and run.italic:
-                    t = f'***{t}***'
-                elif run.bold:
-                    t = f'**{t}**'
-                elif run.italic:
-                    t = f'*{t}*'
-                parts.append(t)
-            return ''.join(parts)
-
-        def para_to_md(para):
-            text = runs_to_md(para)
-            if not text.strip():
-                return None
-            style = para.style.name if para.style else ''
-            for key, prefix in HEADING_MAP.items():
-                if style.startswith(key):
-                    return f'{prefix} {text.strip()}'
-            if 'List Bullet' in style:
-                return f'- {text.strip()}'
-            if 'List Number' in style:
-                return f'1. {text.strip()}'
-            return text.strip()
-
-        def table_to_md(tbl):
-            rows_md = []
-            for i, row in enumerate(tbl.rows):
-                cells = [c.text.strip().replace('\n', ' ') for c in row.cells]
-                rows_md.append('| ' + ' | '.join(cells) + ' |')
-                if i == 0:
-                    rows_md.append('| ' + ' | '.join(['---'] * len(cells)) + ' |')
-            return '\n'.join(rows_md)
-
-        # Iterar los elementos del body en orden de documento (párrafos y tablas intercalados)
-        lineas = []
-        imagenes = []
-        imagen_counter = 0
-
-        for child in doc.element.body:
-            tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-            if tag == 'p':
-                para = DocxParagraph(child, doc)
-
-                # Buscar imágenes en este párrafo si extraer_imagenes está activo
-                if extraer_imagenes:
-                    # Buscar elementos drawing/picture en el párrafo
-                    for run in para.runs:
-                        # Los drawings contienen imágenes
-                        inline_shapes = run.element.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}drawing')
-
-                        for drawing in inline_shapes:
-                            # Buscar el blip (binary large image or picture)
-                            blips = drawing.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/main}blip')
-
-                            for blip in blips:
-                                # Obtener el relationship ID de la imagen
-                                embed_id = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
-
-                                if embed_id:
-                                    try:
-                                        # Obtener la imagen del documento
-                                        image_part = doc.part.related_parts[embed_id]
-                                        image_bytes = image_part.blob
-
-                                        # Detectar extensión de la imagen
-                                        content_type = image_part.content_type
-                                        if 'png' in content_type:
-                                            ext = 'png'
-                                        elif 'jpeg' in content_type or 'jpg' in content_type:
-                                            ext = 'jpg'
-                                        elif 'gif' in content_type:
-                                            ext = 'gif'
-                                        else:
-                                            ext = 'png'  # default
-
-                                        imagen_counter += 1
-                                        image_name = f"imagen_{imagen_counter}.{ext}"
-
-                                        # Guardar imagen y su posición
-                                        imagenes.append({
-                                            'data': image_bytes,
-                                            'name': image_name,
-                                            'position': len(lineas),  # Posición actual en las líneas
-                                            'ext': ext
-                                        })
-
-                                        # Insertar placeholder en el texto
-                                        lineas.append(f"{{{{IMAGE_PLACEHOLDER_{imagen_counter}}}}}")
-
-                                    except Exception as e:
-                                        st.warning(f"⚠️ No se pudo extraer una imagen: {str(e)}")
-
-                # Añadir el texto del párrafo
-                md = para_to_md(para)
-                if md:
-                    lineas.append(md)
-            elif tag == 'tbl':
-                tbl = DocxTable(child, doc)
-                lineas.append('')
-                lineas.append(table_to_md(tbl))
-                lineas.append('')
-
-        markdown_final = '\n\n'.join(l for l in lineas if l is not None)
-
-        if extraer_imagenes:
-            return markdown_final, imagenes
-        else:
-            return markdown_final
+        return docx_a_markdown(file_bytes, extraer_imagenes, avisar=lambda aviso: st.warning(f"⚠️ {aviso}"))
     except Exception as e:
         st.error(f"Error al leer documento: {str(e)}")
         return ""
 
+def version_parser_documento(tipo, extraer_imagenes=False):
+    """Versión del parser de un tipo de documento, parte de su clave en la caché de documentos"""
+    if tipo == "docx":
+        return f"docx:{docx_markdown.VERSION}:{'imagenes' if extraer_imagenes else 'texto'}"
+    if tipo == "pdf":
+        return f"pdf:{pdf_extraction.VERSION}:{PDF_BACKEND}"
+    raise ValueError(f"Tipo de documento no soportado: {tipo}")
+
+def leer_documento_desde_bytes(file_bytes, tipo, extraer_imagenes=False):
+    """
+    Lee un documento .docx o .pdf pasando por la caché de documentos: si ya se procesó
+    el mismo fichero (mismo SHA-256) con la misma versión del parser, no se vuelve a leer.
+    Un PDF con páginas que fallaron no se guarda (un timeout puntual no debe quedar
+    como un hueco permanente en el documento guardado).
+
+    Args:
+        file_bytes: Bytes del documento
+        tipo: "docx" o "pdf"
+        extraer_imagenes: Extraer también las imágenes (solo .docx)
+
+    Returns:
+        tuple (contenido, imagenes, clave): clave del documento en la caché (None si no
+        se pudo leer o no se guardó)
+    """
+    extraer_imagenes = extraer_imagenes and tipo == "docx"
+    cache = obtener_cache_documentos()
+    clave = cache.clave(file_bytes, version_parser_documento(tipo, extraer_imagenes))
+    guardado = cache.obtener_documento(clave)
+    if guardado is not None:
+        add_log(f"♻️ Documento recuperado de la caché ({len(guardado[0])} caracteres, {len(guardado[1])} imágenes)", "info")
+        return guardado[0], guardado[1], clave
+
+    imagenes = []
+    fallidas = []
+    if tipo == "pdf":
+        contenido, fallidas = leer_pdf_desde_bytes(file_bytes)
+    elif extraer_imagenes:
+        resultado = leer_docx_desde_bytes(file_bytes, extraer_imagenes=True)
+        contenido, imagenes = resultado if resultado else ("", [])
+    else:
+        contenido = leer_docx_desde_bytes(file_bytes)
+
+    if not contenido:
+        return contenido, imagenes, None
+    if fallidas:
+        # Sin clave, chunks_y_embeddings_documento tampoco guarda sus chunks
+        add_log("⚠️ PDF incompleto: no se guarda en la caché de documentos", "warning")
+        return contenido, imagenes, None
+    cache.guardar_documento(clave, contenido, imagenes)
+    return contenido, imagenes, clave
+
+def id_troceado(chunk_tokens, por_pagina=False):
+    """
+    Identificador del troceado en la caché de documentos (versión y parámetros del
+    chunker); el troceado página a página de indexar_pdf_desde_bytes lleva su propio
+    identificador porque sus chunks no cruzan los saltos de página
+    """
+    troceado = f"tokens:{CHUNKER_VERSION}:{chunk_tokens}:{CHUNK_SOLAPE_TOKENS}"
+    return f"{troceado}:pagina" if por_pagina else troceado
+
+def chunks_y_embeddings_documento(clave, contenido, chunk_tokens, modelo):
+    """
+    Divide un documento en chunks y genera sus embeddings, reutilizando los de la caché
+    de documentos si el mismo fichero ya se indexó con el mismo troceado y modelo
+
+    Args:
+        clave: Clave del documento en la caché (leer_documento_desde_bytes) o None
+        contenido: Texto del documento
+        chunk_tokens: Tokens máximos por chunk
+
+    Returns:
+        tuple (chunks, embeddings): chunks como los de dividir_en_chunks (con su posición
+        en el contenido)
+    """
+    cache = obtener_cache_documentos()
+    troceado = id_troceado(chunk_tokens)
+    modelo_id = id_modelo_embeddings(modelo)
+    if clave:
+        guardado = cache.obtener_chunks(clave, troceado, modelo_id)
+        if guardado is not None:
+            add_log(f"♻️ {len(guardado[0])} chunks y embeddings del documento recuperados de la caché", "info")
+            return guardado
+
+    chunks = dividir_en_chunks(contenido, chunk_tokens=chunk_tokens)
+    embeddings = generar_embeddings_documento([chunk["texto"] for chunk in chunks], modelo)
+    if clave and chunks:
+        cache.guardar_chunks(clave, troceado, modelo_id, chunks, embeddings)
+    return chunks, embeddings
+
+def indexar_pdf_desde_bytes(file_bytes, chunk_tokens, modelo):
+    """
+    Lee, trocea y codifica un PDF en streaming: cada página se trocea en cuanto llega
+    del extractor y los chunks se codifican por lotes de PDF_LOTE_CHUNKS mientras los
+    procesos del extractor siguen con las páginas siguientes. Pasa por la caché de
+    documentos como leer_documento_desde_bytes y chunks_y_embeddings_documento.
+
+    Los chunks no cruzan el salto de página (cada página se trocea por separado) y se
+    guardan con su propio troceado (id_troceado con por_pagina); sus posiciones son
+    relativas al contenido completo. Si alguna página falla, no se guarda nada en la
+    caché: un timeout puntual no debe quedar como un hueco permanente en el documento.
+
+    Returns:
+        tuple (contenido, chunks, embeddings): contenido "" si no se pudo leer
+    """
+    cache = obtener_cache_documentos()
+    clave = cache.clave(file_bytes, version_parser_documento("pdf"))
+    troceado = id_troceado(chunk_tokens, por_pagina=True)
+    modelo_id = id_modelo_embeddings(modelo)
+    guardado = cache.obtener_documento(clave)
+    if guardado is not None:
+        add_log(f"♻️ Documento recuperado de la caché ({len(guardado[0])} caracteres)", "info")
+        chunks_guardados = cache.obtener_chunks(clave, troceado, modelo_id)
+        if chunks_guardados is not None:
+            add_log(f"♻️ {len(chunks_guardados[0])} chunks y embeddings del documento recuperados de la caché", "info")
+            return (guardado[0],) + tuple(chunks_guardados)
+        # El documento lo guardó otra ruta (leer_documento_desde_bytes): ya no se conocen
+        # los saltos de página, así que se trocea completo con el troceado normal
+        chunks, embeddings = chunks_y_embeddings_documento(clave, guardado[0], chunk_tokens, modelo)
+        return guardado[0], chunks, embeddings
+
+    chunker = obtener_chunker(chunk_tokens)
+    chunks, pendientes, lotes = [], [], []
+
+    def al_leer_pagina(texto, inicio):
+        for chunk in chunker.trocear(texto):
+            chunks.append({**chunk, "inicio": chunk["inicio"] + inicio, "fin": chunk["fin"] + inicio})
+            pendientes.append(chunk["texto"])
+        if len(pendientes) >= PDF_LOTE_CHUNKS:
+            lotes.append(codificar_textos(pendientes, modelo, show_progress_bar=False))
+            pendientes.clear()
+
+    contenido, fallidas = leer_pdf_desde_bytes(file_bytes, al_leer_pagina=al_leer_pagina)
+    if not contenido:
+        return contenido, [], None
+    if pendientes:
+        lotes.append(codificar_textos(pendientes, modelo, show_progress_bar=False))
+    embeddings = np.vstack(lotes) if lotes else np.zeros((0, 0), dtype=np.float32)
+
+    if fallidas:
+        add_log("⚠️ PDF incompleto: no se guarda en la caché de documentos", "warning")
+        return contenido, chunks, embeddings
+    cache.guardar_documento(clave, contenido)
+    if chunks:
+        cache.guardar_chunks(clave, troceado, modelo_id, chunks, embeddings)
+    return contenido, chunks, embeddings
+
 def descargar_documento_url(url):
     """Descarga un documento desde una URL pública"""
     try:
@@ -1068,49 +1979,52 @@ def descargar_documento_url(url):
         st.error(f"Error al descargar documento: {str(e)}")
         return None
 
-def dividir_en_chunks(texto, chunk_size=1000):
-    """Divide el texto en fragmentos para embeddings"""
-    # Dividir por párrafos primero
-    paragrafos = [p.strip() for p in texto.split('\n\n') if p.strip()]
-    
-    chunks = []
-    chunk_actual = ""
-    
-    for para in paragrafos:
-        if len(chunk_actual) + len(para) < chunk_size:
-            chunk_actual += para + "\n\n"
-        else:
-            if chunk_actual:
-                chunks.append(chunk_actual.strip())
-            chunk_actual = para + "\n\n"
-    
-    if chunk_actual:
-        chunks.append(chunk_actual.strip())
-    
-    return chunks
+@st.cache_resource
+def obtener_chunker(chunk_tokens=CHUNK_TOKENS, solape_tokens=CHUNK_SOLAPE_TOKENS):
+    """
+    Chunker que mide en tokens del modelo de embeddings, uno por configuración y proceso;
+    chunk_tokens se limita a lo que admite el modelo (lo que pase de ahí no llegaría a
+    codificarse)
+    """
+    modelo = cargar_modelo_embeddings()
+    return Chunker(
+        max_tokens=min(chunk_tokens, max_tokens_modelo(modelo)),
+        solape_tokens=solape_tokens,
+        contar_tokens=contador_tokens_modelo(modelo)
+    )
+
+def dividir_en_chunks(texto, chunk_tokens=CHUNK_TOKENS, solape_tokens=CHUNK_SOLAPE_TOKENS):
+    """
+    Divide el texto en fragmentos para embeddings de como mucho chunk_tokens tokens,
+    respetando párrafos y frases y repitiendo solape_tokens entre fragmentos consecutivos
+    (motor común de documentos, wikis y work items; ver chunker)
+
+    Returns:
+        Lista de dict por fragmento: texto, inicio y fin (posición en texto) y tokens
+    """
+    return obtener_chunker(chunk_tokens, solape_tokens).trocear(texto)
 
 def generar_embeddings_documento(chunks, modelo):
     """Genera embeddings para los chunks del documento"""
     with st.spinner("🔄 Generando embeddings del documento..."):
-        embeddings = modelo.encode(chunks, show_progress_bar=True)
-    return np.array(embeddings)
+        embeddings = codificar_textos(chunks, modelo)
+    return embeddings
 
-def buscar_chunks_similares(query, chunks, embeddings, modelo, top_k=3):
-    """Busca los chunks más relevantes del documento"""
+def buscar_chunks_similares(query, chunks, indice, modelo, top_k=3, lexico=None):
+    """
+    Busca los chunks más relevantes del documento (chunks: los de dividir_en_chunks;
+    indice: VectorIndex de los chunks; lexico: BM25Index opcional para la búsqueda híbrida)
+    """
     query_embedding = modelo.encode([query])[0]
     
-    similitudes = np.dot(embeddings, query_embedding) / (
-        np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
-    )
-    
-    top_indices = np.argsort(similitudes)[-top_k:][::-1]
-    
     resultados = []
-    for idx in top_indices:
+    for idx, similitud in busqueda_hibrida(indice, lexico, query, query_embedding, top_k=top_k):
         resultados.append({
-            "chunk": chunks[idx],
-            "similitud": float(similitudes[idx]),
-            "indice": idx
+            "chunk": chunks[idx]["texto"],
+            "similitud": similitud,
+            "indice": idx,
+            "inicio": chunks[idx]["inicio"],
+            "fin": chunks[idx]["fin"]
         })
     
     return resultados
@@ -1139,16 +2053,14 @@ def obtener_wikis_proyecto(organization, project, pat):
     """
     url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis?api-version=7.1"
 
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    cliente = obtener_cliente_devops(pat)
 
     headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
+        "Content-Type": "application/json"
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = cliente.get(url, headers=headers, timeout=30)
 
         if response.status_code == 401:
             st.error("❌ Error 401: No autorizado para acceder a las Wikis")
@@ -1195,16 +2107,14 @@ def obtener_subpaginas_especificas(organization, project, pat, wiki_id, page_pat
     path_encoded = urllib.parse.quote(page_path, safe='')
     url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages?path={path_encoded}&recursionLevel=5&includeContent=false&api-version=7.1"
 
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    cliente = obtener_cliente_devops(pat)
 
     headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
+        "Content-Type": "application/json"
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = cliente.get(url, headers=headers, timeout=30)
 
         if response.status_code != 200:
             return []
@@ -1250,16 +2160,14 @@ def obtener_paginas_wiki(organization, project, pat, wiki_id, recursion_level=5)
 
     url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages?recursionLevel={recursion_level}&api-version=7.1"
 
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    cliente = obtener_cliente_devops(pat)
 
     headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
+        "Content-Type": "application/json"
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = cliente.get(url, headers=headers, timeout=30)
 
         if response.status_code == 401:
             st.session_state.wiki_logs.append(("error", "❌ Error 401: No autorizado para acceder a las páginas de la Wiki"))
@@ -1386,16 +2294,14 @@ def obtener_paginas_wiki_recursivo(organization, project, pat, wiki_id, path="/"
         encoded_path = requests.utils.quote(path, safe='')
         url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages?path={encoded_path}&api-version=7.1"
 
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    cliente = obtener_cliente_devops(pat)
 
     headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
+        "Content-Type": "application/json"
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = cliente.get(url, headers=headers, timeout=30)
 
         if response.status_code == 401:
             st.session_state.wiki_logs.append(("error", "❌ Error 401: No autorizado"))
@@ -1475,6 +2381,7 @@ def expandir_paginas_padre(organization, project, pat, wiki_id, paginas_padre):
         st.session_state.wiki_logs = []
 
     todas_las_paginas = []
+    cliente = obtener_cliente_devops(pat)
 
     st.session_state.wiki_logs.append(("info", f"🔄 Expandiendo {len(paginas_padre)} página(s) padre..."))
 
@@ -1493,16 +2400,12 @@ def expandir_paginas_padre(organization, project, pat, wiki_id, paginas_padre):
             encoded_path = requests.utils.quote(path, safe='')
             url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages?path={encoded_path}&includeContent=false&recursionLevel=full&api-version=7.1"
 
-            credentials = f":{pat}"
-            encoded_credentials = base64.b64encode(credentials.encode()).decode()
-
             headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Basic {encoded_credentials}"
+                "Content-Type": "application/json"
             }
 
             try:
-                response = requests.get(url, headers=headers, timeout=30)
+                response = cliente.get(url, headers=headers, timeout=30)
 
                 if response.status_code == 200:
                     data = response.json()
@@ -1568,16 +2471,14 @@ def obtener_contenido_pagina_wiki(organization, project, pat, wiki_id, page_id):
         # Si es un ID numérico, usar la ruta tradicional
         url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages/{page_id}?includeContent=true&api-version=7.1"
 
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    cliente = obtener_cliente_devops(pat)
 
     headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
+        "Content-Type": "application/json"
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = cliente.get(url, headers=headers, timeout=30)
 
         if response.status_code == 401:
             st.error(f"❌ Error 401: No autorizado para acceder al contenido de la página")
@@ -1630,46 +2531,50 @@ def limpiar_markdown(texto):
 
 def generar_embeddings_wiki(paginas_contenido, modelo):
     """
-    Genera embeddings para las páginas de la wiki
-    paginas_contenido: lista de dict con 'path', 'chunks', etc.
+    Genera el índice vectorial de las páginas de la wiki
+    paginas_contenido: lista de dict con 'path', 'chunks' (los de dividir_en_chunks), etc.
+
+    Returns:
+        tuple (indice, referencias, chunks): VectorIndex NumPy normalizado (como el resto
+        de corpus), referencia de página y posición en ella por chunk y lista plana con el
+        texto de los chunks
     """
     todos_chunks = []
     referencias = []  # Para mantener referencia de página y chunk
 
     for pagina in paginas_contenido:
         for idx, chunk in enumerate(pagina['chunks']):
-            todos_chunks.append(chunk)
+            todos_chunks.append(chunk['texto'])
             referencias.append({
                 'path': pagina['path'],
                 'chunk_idx': idx,
-                'page_id': pagina['id']
+                'page_id': pagina['id'],
+                'inicio': chunk['inicio'],
+                'fin': chunk['fin']
             })
 
     with st.spinner("🔄 Generando embeddings de páginas Wiki..."):
-        embeddings = modelo.encode(todos_chunks, show_progress_bar=True)
+        embeddings = codificar_textos(todos_chunks, modelo)
 
-    return np.array(embeddings), referencias
+    return crear_indice_vectorial("wiki", embeddings, referencias), referencias, todos_chunks
 
-def buscar_chunks_wiki_similares(query, chunks, embeddings, referencias, modelo, top_k=5):
+def buscar_chunks_wiki_similares(query, chunks, indice, referencias, modelo, top_k=5, lexico=None):
     """
-    Busca los chunks más relevantes de las páginas Wiki
+    Busca los chunks más relevantes de las páginas Wiki (indice: VectorIndex de los chunks;
+    lexico: BM25Index opcional para la búsqueda híbrida)
     """
     query_embedding = modelo.encode([query])[0]
 
-    similitudes = np.dot(embeddings, query_embedding) / (
-        np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
-    )
-
-    top_indices = np.argsort(similitudes)[-top_k:][::-1]
-
     resultados = []
-    for idx in top_indices:
+    for idx, similitud in busqueda_hibrida(indice, lexico, query, query_embedding, top_k=top_k):
         resultados.append({
             "chunk": chunks[idx],
-            "similitud": float(similitudes[idx]),
+            "similitud": similitud,
             "path": referencias[idx]['path'],
             "page_id": referencias[idx]['page_id'],
-            "chunk_idx": referencias[idx]['chunk_idx']
+            "chunk_idx": referencias[idx]['chunk_idx'],
+            "inicio": referencias[idx]['inicio'],
+            "fin": referencias[idx]['fin']
         })
 
     return resultados
@@ -1691,25 +2596,107 @@ def construir_contexto_wiki(chunks_similares):
 
     return contexto
 
+def migrar_indices_vectoriales_sesion():
+    """
+    Migración única de sesiones indexadas con versiones anteriores, que guardaban los
+    embeddings como tensores de torch o arrays sin normalizar: se convierten al VectorIndex
+    NumPy de cada corpus para que las consultas no conviertan nada
+    """
+    corpus_sesion = {
+        "devops_embeddings": ("devops", lambda: [
+            {"tipo": inc['tipo'], "estado": inc['estado']} for inc in st.session_state.devops_incidencias
+        ]),
+        "wiki_embeddings": ("wiki", lambda: st.session_state.wiki_referencias),
+        "doc_embeddings": ("doc", lambda: None),
+        "tilena_embeddings": ("tilena", lambda: None),
+    }
+    for clave, (corpus, metadatos) in corpus_sesion.items():
+        valor = st.session_state.get(clave)
+        if valor is None or isinstance(valor, VectorIndex):
+            continue
+        if hasattr(valor, "detach"):
+            # Tensor de torch (posiblemente en GPU)
+            valor = valor.detach().cpu().numpy()
+        st.session_state[clave] = crear_indice_vectorial(corpus, np.asarray(valor, dtype=np.float32), metadatos())
+        add_log(f"♻️ Índice '{corpus}' de la sesión migrado a NumPy ({len(st.session_state[clave])} vectores)", "info")
+
 # ==================================================
 # HELPERS PARA CREACIÓN DE WIKI DESDE DOCUMENTOS
 # ==================================================
 
-def leer_pdf_desde_bytes(file_bytes):
-    """Lee un documento PDF desde bytes"""
-    try:
-        pdf_reader = PyPDF2.PdfReader(BytesIO(file_bytes))
-        texto_completo = []
+@st.cache_resource
+def obtener_extractor_pdf():
+    """Extractor de PDF con su pool de procesos, compartido por todas las sesiones"""
+    return PDFExtractor(PDF_BACKEND, procesos=PDF_PROCESOS, timeout_pagina=PDF_TIMEOUT_PAGINA)
+
+def iterar_paginas_pdf(file_bytes):
+    """
+    Texto de un PDF página a página, en orden y según se van extrayendo en paralelo
+    (ver PDFExtractor.iterar_paginas), para empezar a procesarlo antes de la última
+
+    Yields:
+        dict con pagina, total, texto y error
+    """
+    return obtener_extractor_pdf().iterar_paginas(file_bytes)
+
+def leer_pdf_desde_bytes(file_bytes, al_leer_pagina=None):
+    """
+    Lee un documento PDF desde bytes (páginas extraídas en paralelo, con timeout por página)
 
-        for page in pdf_reader.pages:
-            texto = page.extract_text()
-            if texto.strip():
-                texto_completo.append(texto.strip())
+    Args:
+        file_bytes: Bytes del PDF
+        al_leer_pagina: Callback opcional (texto, inicio) por cada página con texto en
+            cuanto llega, con su posición en el texto devuelto; permite trocear e indexar
+            mientras se extraen las siguientes (ver indexar_pdf_desde_bytes). Sus
+            excepciones no se tratan como errores de lectura: se propagan.
 
-        return "\n\n".join(texto_completo)
+    Returns:
+        tuple (texto, fallidas): texto de las páginas separadas por línea en blanco ("" si
+        hay error) y números de las páginas que fallaron o agotaron su timeout (el texto
+        está incompleto si no es una lista vacía)
+    """
+    try:
+        paginas = iterar_paginas_pdf(file_bytes)
     except Exception as e:
         st.error(f"Error al leer PDF: {str(e)}")
-        return ""
+        return "", []
+
+    texto_completo = []
+    fallidas = []
+    posicion = 0
+    progreso = st.empty()
+    try:
+        while True:
+            try:
+                pagina = next(paginas)
+            except StopIteration:
+                break
+            except Exception as e:
+                st.error(f"Error al leer PDF: {str(e)}")
+                return "", fallidas
+
+            if pagina["error"]:
+                fallidas.append(pagina["pagina"])
+            elif pagina["texto"].strip():
+                texto = pagina["texto"].strip()
+                if texto_completo:
+                    posicion += 2  # "\n\n" entre páginas
+                if al_leer_pagina:
+                    al_leer_pagina(texto, posicion)
+                texto_completo.append(texto)
+                posicion += len(texto)
+            progreso.progress(pagina["pagina"] / pagina["total"], text=f"📄 Página {pagina['pagina']}/{pagina['total']}")
+    finally:
+        # Si se sale antes de tiempo (error de lectura o del callback), el extractor
+        # libera el fichero temporal y sus procesos
+        paginas.close()
+        progreso.empty()
+
+    if fallidas:
+        add_log(f"⚠️ PDF: {len(fallidas)} páginas sin texto por error o timeout ({fallidas[:10]})", "warning")
+        st.warning(f"⚠️ No se pudo extraer el texto de {len(fallidas)} página(s): {', '.join(map(str, fallidas[:10]))}")
+
+    return "\n\n".join(texto_completo), fallidas
 
 def detectar_encabezados_principales(contenido_documento):
     """
@@ -2166,97 +3153,66 @@ def mejorar_contenido_pagina_con_frida(titulo_pagina, contenido_original, contex
 
 def crear_pagina_wiki_azure(organization, project, pat, wiki_id, path, contenido_markdown):
     """
-    Crea o actualiza una página en Azure DevOps Wiki
+    Crea o actualiza una página en Azure DevOps Wiki (por el cliente asíncrono compartido;
+    si ya existe se actualiza con su ETag, ver devops_async.crear_pagina_wiki)
 
     Parameters:
     - path: Ruta de la página (ej: "/Introduccion" o "/Introduccion/Objetivos")
     - contenido_markdown: Contenido en formato markdown
 
     Returns:
-    - True si se creó exitosamente, False si hubo error
+    - tuple (True, página) si se creó exitosamente, (False, None) si hubo error
     """
-    # Limpiar y formatear el path
-    path = path.strip()
-    if not path.startswith('/'):
-        path = '/' + path
-
-    # URL de la API
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages?path={path}&api-version=7.1"
-
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
-    }
-
-    payload = {
-        "content": contenido_markdown
-    }
-
     try:
-        response = requests.put(url, json=payload, headers=headers, timeout=30)
-
-        if response.status_code in [200, 201]:
-            return True, response.json()
-        elif response.status_code == 409:
-            # La página ya existe, intentar actualizar
-            return actualizar_pagina_wiki_azure(organization, project, pat, wiki_id, path, contenido_markdown)
-        else:
-            st.error(f"❌ Error {response.status_code} al crear página: {path}")
-            st.code(response.text[:300])
-            return False, None
-
+        pagina = obtener_runner_devops().ejecutar(devops_async.crear_pagina_wiki(
+            obtener_cliente_async_devops(pat), organization, project, wiki_id, path, contenido_markdown
+        ))
+        return True, pagina
     except Exception as e:
         st.error(f"❌ Error al crear página {path}: {str(e)}")
         return False, None
 
-def actualizar_pagina_wiki_azure(organization, project, pat, wiki_id, path, contenido_markdown):
-    """
-    Actualiza una página existente en Azure DevOps Wiki
+def crear_paginas_wiki_azure(organization, project, pat, wiki_id, paginas):
     """
-    # Primero obtener la versión actual de la página
-    url_get = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages?path={path}&api-version=7.1"
-
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}"
-    }
+    Crea o actualiza a la vez varias páginas de Azure DevOps Wiki cuyas páginas padre ya
+    existen (fan-out con la concurrencia limitada del cliente asíncrono)
 
-    try:
-        # Obtener ETag para actualización
-        response_get = requests.get(url_get, headers=headers, timeout=30)
-
-        if response_get.status_code != 200:
-            st.error(f"No se pudo obtener información de la página: {path}")
-            return False, None
-
-        page_data = response_get.json()
-        etag = response_get.headers.get('ETag')
-
-        # Actualizar con el ETag
-        headers['If-Match'] = etag
-
-        payload = {
-            "content": contenido_markdown
-        }
+    Args:
+        paginas: Lista de tuplas (path, contenido_markdown)
 
-        response_put = requests.put(url_get, json=payload, headers=headers, timeout=30)
+    Returns:
+        Lista alineada con paginas: dict de la página creada o la excepción si falló
+    """
+    return obtener_runner_devops().ejecutar(devops_async.crear_paginas_wiki(
+        obtener_cliente_async_devops(pat), organization, project, wiki_id, paginas
+    ))
 
-        if response_put.status_code in [200, 201]:
-            return True, response_put.json()
-        else:
-            st.error(f"❌ Error {response_put.status_code} al actualizar página: {path}")
-            st.code(response_put.text[:300])
-            return False, None
+def niveles_paginas_wiki(paginas):
+    """
+    Agrupa las páginas de una estructura por nivel (0 = raíz o sin padre conocido, 1 =
+    hijas de esas, ...) conservando el orden dentro de cada nivel: las de un nivel se
+    pueden crear a la vez cuando ya existen las del anterior
+    """
+    por_titulo = {pagina['titulo']: pagina for pagina in paginas}
+    niveles_titulo = {}
+
+    def nivel(pagina, visitados=()):
+        titulo = pagina['titulo']
+        if titulo not in niveles_titulo:
+            padre = pagina.get('padre', '')
+            if pagina.get('es_raiz', False) or padre not in por_titulo or padre in visitados or padre == titulo:
+                niveles_titulo[titulo] = 0
+            else:
+                niveles_titulo[titulo] = nivel(por_titulo[padre], visitados + (titulo,)) + 1
+        return niveles_titulo[titulo]
 
-    except Exception as e:
-        st.error(f"❌ Error al actualizar página {path}: {str(e)}")
-        return False, None
+    niveles = []
+    for pagina in paginas:
+        n = nivel(pagina)
+        while len(niveles) <= n:
+            niveles.append([])
+        niveles[n].append(pagina)
+    return [paginas_nivel for paginas_nivel in niveles if paginas_nivel]
 
 def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, image_name):
     """
@@ -2275,15 +3231,13 @@ def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, imag
         tuple: (success: bool, attachment_url: str or None)
     """
     import uuid
-    from io import BytesIO
 
     # Generar nombre único para evitar colisiones
     unique_name = f"{uuid.uuid4().hex[:8]}_{image_name}"
 
     url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/attachments?name={unique_name}&api-version=7.1-preview.1"
 
-    credentials = f":{pat}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    cliente = obtener_cliente_devops(pat)
 
     errores = []  # Colectar errores de cada método
 
@@ -2292,14 +3246,13 @@ def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, imag
         add_log(f"Método 1 - PUT con Base64 string + octet-stream para {image_name}", "debug")
 
         headers = {
-            "Authorization": f"Basic {encoded_credentials}",
             "Content-Type": "application/octet-stream"
         }
 
         # Convertir bytes a Base64 string
         base64_content = base64.b64encode(image_bytes).decode('utf-8')
 
-        response = requests.put(url, data=base64_content, headers=headers, timeout=60)
+        response = cliente.put(url, data=base64_content, headers=headers, timeout=60)
 
         if response.status_code not in [200, 201]:
             error_msg = response.text[:300] if response.text else "Sin mensaje"
@@ -2316,10 +3269,9 @@ def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, imag
     try:
         add_log(f"Método 2 - POST con bytes binarios para {image_name}", "debug")
         headers = {
-            "Authorization": f"Basic {encoded_credentials}",
             "Content-Type": "application/octet-stream"
         }
-        response = requests.post(url, data=image_bytes, headers=headers, timeout=60)
+        response = cliente.post(url, data=image_bytes, headers=headers, timeout=60)
 
         if response.status_code not in [200, 201]:
             error_msg = response.text[:300] if response.text else "Sin mensaje"
@@ -2335,9 +3287,8 @@ def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, imag
     # Método 3: PUT con multipart/form-data
     try:
         add_log(f"Método 3 - PUT con multipart/form-data para {image_name}", "debug")
-        files = {'file': (unique_name, BytesIO(image_bytes), 'application/octet-stream')}
-        headers = {"Authorization": f"Basic {encoded_credentials}"}
-        response = requests.put(url, files=files, headers=headers, timeout=60)
+        files = {'file': (unique_name, image_bytes, 'application/octet-stream')}
+        response = cliente.put(url, files=files, timeout=60)
 
         if response.status_code not in [200, 201]:
             error_msg = response.text[:300] if response.text else "Sin mensaje"
@@ -2353,9 +3304,8 @@ def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, imag
     # Método 4: POST con multipart/form-data
     try:
         add_log(f"Método 4 - POST con multipart/form-data para {image_name}", "debug")
-        files = {'file': (unique_name, BytesIO(image_bytes), 'application/octet-stream')}
-        headers = {"Authorization": f"Basic {encoded_credentials}"}
-        response = requests.post(url, files=files, headers=headers, timeout=60)
+        files = {'file': (unique_name, image_bytes, 'application/octet-stream')}
+        response = cliente.post(url, files=files, timeout=60)
 
         if response.status_code not in [200, 201]:
             error_msg = response.text[:300] if response.text else "Sin mensaje"
@@ -2372,7 +3322,6 @@ def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, imag
     try:
         add_log(f"Método 5 - PUT con JSON + Base64 para {image_name}", "debug")
         headers = {
-            "Authorization": f"Basic {encoded_credentials}",
             "Content-Type": "application/json"
         }
         base64_content = base64.b64encode(image_bytes).decode('utf-8')
@@ -2380,7 +3329,7 @@ def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, imag
             "content": base64_content,
             "name": unique_name
         }
-        response = requests.put(url, json=json_data, headers=headers, timeout=60)
+        response = cliente.put(url, json=json_data, headers=headers, timeout=60)
 
         if response.status_code not in [200, 201]:
             error_msg = response.text[:300] if response.text else "Sin mensaje"
@@ -2397,10 +3346,9 @@ def subir_attachment_wiki(organization, project, pat, wiki_id, image_bytes, imag
     try:
         add_log(f"Método 6 - PUT con bytes binarios raw para {image_name}", "debug")
         headers = {
-            "Authorization": f"Basic {encoded_credentials}",
             "Content-Type": "application/octet-stream"
         }
-        response = requests.put(url, data=image_bytes, headers=headers, timeout=60)
+        response = cliente.put(url, data=image_bytes, headers=headers, timeout=60)
 
         if response.status_code not in [200, 201]:
             error_msg = response.text[:300] if response.text else "Sin mensaje"
@@ -2726,6 +3674,9 @@ if st.session_state.tilena_url:
 else:
     st.sidebar.info("ℹ️ Configura Tilena para consultar tickets")
 
+# Índices de sesiones creadas con versiones anteriores (tensores / arrays sin normalizar)
+migrar_indices_vectoriales_sesion()
+
 # ==================================================
 # TABS
 # ==================================================
@@ -2812,14 +3763,23 @@ with tab_devops:
                 )
 
             with col_filtros2:
+                proyecto_completo = st.checkbox(
+                    "🌐 Indexar proyecto completo",
+                    value=False,
+                    help="Recorre todos los work items que cumplen los filtros (queries WIQL por ventanas de ID), sin límite de cantidad"
+                )
+
                 max_items = st.slider(
                     "Límite de items a traer",
                     min_value=50,
                     max_value=1000,
                     value=400,
                     step=50,
-                    help="Máximo de work items a sincronizar"
+                    help="Máximo de work items a sincronizar",
+                    disabled=proyecto_completo
                 )
+                if proyecto_completo:
+                    max_items = None
 
                 top_k_similar = st.slider(
                     "Items similares a mostrar",
@@ -2830,6 +3790,28 @@ with tab_devops:
                     help="Número de items similares para enviar a Frida"
                 )
 
+                comments_workers = st.slider(
+                    "Peticiones de comentarios en paralelo",
+                    min_value=1,
+                    max_value=32,
+                    value=st.session_state.devops_comments_workers,
+                    step=1,
+                    help="Número de work items cuyos comentarios se descargan a la vez durante la sincronización"
+                )
+                st.session_state.devops_comments_workers = comments_workers
+
+                sync_incremental = st.checkbox(
+                    "⚡ Sincronización incremental",
+                    value=True,
+                    help="Solo descarga los work items creados o modificados desde la última sincronización con estos mismos filtros"
+                )
+
+                comentarios_lazy = st.checkbox(
+                    "💤 Comentarios bajo demanda",
+                    value=False,
+                    help="No descarga comentarios al sincronizar; se cargan solo para los work items que devuelve cada consulta"
+                )
+
             st.markdown("---")
 
             col_btn1, col_btn2 = st.columns([3, 1])
@@ -2839,7 +3821,7 @@ with tab_devops:
                         st.error("❌ Selecciona al menos un tipo de work item")
                     else:
                         with st.spinner("📥 Obteniendo work items de Azure DevOps..."):
-                            incidencias = obtener_incidencias_devops(
+                            incidencias, ids_cambiados = sincronizar_incidencias_devops(
                                 st.session_state.devops_org,
                                 st.session_state.devops_project,
                                 st.session_state.devops_pat,
@@ -2847,11 +3829,14 @@ with tab_devops:
                                 work_item_types=work_item_types,
                                 max_items=max_items,
                                 states=work_item_states if work_item_states else None,
-                                assigned_to=assigned_to_input if assigned_to_input else None
+                                assigned_to=assigned_to_input if assigned_to_input else None,
+                                comments_workers=comments_workers,
+                                incremental=sync_incremental,
+                                comentarios_lazy=comentarios_lazy
                             )
 
                         if incidencias:
-                            st.success(f"✅ Se encontraron {len(incidencias)} work items")
+                            st.success(f"✅ Se encontraron {len(incidencias)} work items ({len(ids_cambiados)} descargados en esta sincronización)")
 
                             tipos_count = {}
                             for inc in incidencias:
@@ -2860,20 +3845,32 @@ with tab_devops:
 
                             st.info(f"📊 Distribución: " + ", ".join([f"{t}: {c}" for t, c in tipos_count.items()]))
 
-                            st.session_state.devops_incidencias = incidencias
+                            clave_sync = clave_sync_workitems(
+                                st.session_state.devops_org,
+                                st.session_state.devops_project,
+                                area_path=area_path_input if area_path_input else None,
+                                work_item_types=work_item_types,
+                                max_items=max_items,
+                                states=work_item_states if work_item_states else None,
+                                assigned_to=assigned_to_input if assigned_to_input else None
+                            )
 
-                            if st.session_state.embedding_model is None:
-                                st.session_state.embedding_model = cargar_modelo_embeddings()
+                            st.session_state.devops_incidencias = incidencias
+                            st.session_state.devops_sync_clave = clave_sync
 
-                            embeddings = generar_embeddings_incidencias(
+                            # Los embeddings de chunks sin cambios se leen de la caché;
+                            # el resto se codifica en segundo plano
+                            st.session_state.devops_embeddings = None
+                            lanzar_indexacion_incidencias(
+                                st.session_state.devops_org,
+                                st.session_state.devops_project,
                                 incidencias,
-                                st.session_state.embedding_model
+                                ids_cambiados=ids_cambiados
                             )
-                            st.session_state.devops_embeddings = embeddings
                             st.session_state.devops_indexed = True
                             st.session_state.devops_top_k = top_k_similar
 
-                            st.success("✅ Indexación completada. Ahora puedes hacer consultas.")
+                            st.success("✅ Work items sincronizados. Ya puedes hacer consultas mientras se completa la indexación.")
                             st.rerun()
                         else:
                             st.warning("⚠️ No se encontraron work items o hubo un error")
@@ -2882,20 +3879,32 @@ with tab_devops:
                 if st.button("🗑️ Limpiar", use_container_width=True, key="limpiar_devops_common"):
                     st.session_state.devops_incidencias = []
                     st.session_state.devops_embeddings = None
+                    st.session_state.devops_lexico = None
+                    st.session_state.devops_lexico_claves = None
+                    st.session_state.devops_chunks_padres = None
                     st.session_state.devops_indexed = False
+                    st.session_state.devops_sync_clave = ""
+                    st.session_state.devops_indexacion_clave = None
+                    st.session_state.devops_indexacion_firma = None
                     st.session_state.devops_messages = []
                     st.success("✅ Cache limpiado")
                     st.rerun()
 
+        # Arranque en caliente: recuperar la última sincronización guardada del proyecto
+        if not st.session_state.devops_indexed and not st.session_state.devops_store_revisado:
+            st.session_state.devops_store_revisado = True
+            with st.spinner("♻️ Recuperando work items del almacén local..."):
+                cargar_incidencias_desde_store(st.session_state.devops_org, st.session_state.devops_project)
+
+        # Progreso de la indexación en segundo plano (el índice de la sesión se actualiza solo)
+        mostrar_progreso_indexacion()
+
         # Estado de indexación de Work Items
         if st.session_state.devops_indexed:
-            tipos_en_cache = {}
-            for inc in st.session_state.devops_incidencias:
-                tipo = inc['tipo']
-                tipos_en_cache[tipo] = tipos_en_cache.get(tipo, 0) + 1
+            estadisticas = estadisticas_incidencias_indexadas()
 
-            tipos_str = ", ".join([f"{t} ({c})" for t, c in tipos_en_cache.items()])
-            st.info(f"📊 **{len(st.session_state.devops_incidencias)} work items indexados**: {tipos_str}")
+            tipos_str = ", ".join([f"{t} ({c})" for t, c in estadisticas["tipos"].items()])
+            st.info(f"📊 **{estadisticas['total']} work items indexados**: {tipos_str}")
             st.info(f"🎯 **Top-K configurado**: {st.session_state.get('devops_top_k', 5)} items similares por consulta")
 
         st.markdown("---")
@@ -3078,12 +4087,12 @@ with tab_devops:
             with col2:
                 st.markdown("#### ⚙️ Configuración")
                 wiki_chunk_size = st.slider(
-                    "Tamaño de fragmentos",
-                    min_value=500,
-                    max_value=4000,
-                    value=1000,
-                    step=100,
-                    help="Tamaño de cada fragmento de las páginas Wiki",
+                    "Tamaño de fragmentos (tokens)",
+                    min_value=64,
+                    max_value=256,
+                    value=CHUNK_TOKENS,
+                    step=8,
+                    help="Tokens del modelo de embeddings por fragmento de las páginas Wiki (admite hasta 256)",
                     key="wiki_chunk_size_common"
                 )
 
@@ -3108,29 +4117,35 @@ with tab_devops:
                     if not hasattr(st.session_state, 'selected_wiki_pages') or len(st.session_state.selected_wiki_pages) == 0:
                         st.error("❌ Debes seleccionar al menos una página de la wiki")
                     else:
-                        # Procesar cada página seleccionada
+                        # Descargar todas las páginas seleccionadas en paralelo (cliente asíncrono)
                         paginas_contenido = []
                         progress_bar = st.progress(0)
                         total_pages = len(st.session_state.selected_wiki_pages)
 
-                        for idx, page in enumerate(st.session_state.selected_wiki_pages):
+                        with st.spinner(f"Descargando {total_pages} páginas..."):
+                            contenidos = obtener_runner_devops().ejecutar(devops_async.obtener_contenidos_paginas_wiki(
+                                obtener_cliente_async_devops(st.session_state.devops_pat),
+                                st.session_state.devops_org,
+                                st.session_state.devops_project,
+                                st.session_state.selected_wiki_id,
+                                [page['id'] for page in st.session_state.selected_wiki_pages]
+                            ))
+
+                        paginas_con_error = []
+                        for idx, (page, contenido_page) in enumerate(zip(st.session_state.selected_wiki_pages, contenidos)):
                             progress_bar.progress((idx + 1) / total_pages)
 
-                            with st.spinner(f"Descargando {page['path']}..."):
-                                contenido_page = obtener_contenido_pagina_wiki(
-                                    st.session_state.devops_org,
-                                    st.session_state.devops_project,
-                                    st.session_state.devops_pat,
-                                    st.session_state.selected_wiki_id,
-                                    page['id']
-                                )
+                            if isinstance(contenido_page, Exception):
+                                paginas_con_error.append(page['path'])
+                                add_log(f"❌ Error al obtener contenido de {page['path']}: {str(contenido_page)[:150]}", "error")
+                                continue
 
                             if contenido_page and contenido_page['content']:
                                 # Limpiar markdown
                                 texto_limpio = limpiar_markdown(contenido_page['content'])
 
                                 # Dividir en chunks
-                                chunks = dividir_en_chunks(texto_limpio, chunk_size=wiki_chunk_size)
+                                chunks = dividir_en_chunks(texto_limpio, chunk_tokens=wiki_chunk_size)
 
                                 paginas_contenido.append({
                                     'id': page['id'],
@@ -3138,33 +4153,17 @@ with tab_devops:
                                     'chunks': chunks
                                 })
 
-                        if paginas_contenido:
-                            # Crear lista plana de todos los chunks con referencias
-                            todos_chunks = []
-                            referencias = []
-
-                            for pagina in paginas_contenido:
-                                for idx, chunk in enumerate(pagina['chunks']):
-                                    todos_chunks.append(chunk)
-                                    referencias.append({
-                                        'page_id': pagina['id'],
-                                        'path': pagina['path'],
-                                        'chunk_idx': idx
-                                    })
+                        if paginas_con_error:
+                            st.warning(f"⚠️ No se pudo obtener el contenido de {len(paginas_con_error)} página(s): {', '.join(paginas_con_error[:5])}{'...' if len(paginas_con_error) > 5 else ''}")
 
-                            # Generar embeddings
-                            with st.spinner("Generando embeddings..."):
-                                if st.session_state.embedding_model is None:
-                                    st.session_state.embedding_model = cargar_modelo_embeddings()
-
-                                embeddings = st.session_state.embedding_model.encode(
-                                    todos_chunks,
-                                    convert_to_tensor=True,
-                                    show_progress_bar=True
-                                )
+                        if paginas_contenido:
+                            indice_wiki, referencias, todos_chunks = generar_embeddings_wiki(
+                                paginas_contenido, cargar_modelo_embeddings()
+                            )
 
                             st.session_state.wiki_paginas_contenido = paginas_contenido
-                            st.session_state.wiki_embeddings = embeddings
+                            st.session_state.wiki_embeddings = indice_wiki
+                            st.session_state.wiki_lexico = construir_indice_lexico(todos_chunks)
                             st.session_state.wiki_referencias = referencias
                             st.session_state.wiki_chunks = todos_chunks
                             st.session_state.wiki_indexed = True
@@ -3179,6 +4178,7 @@ with tab_devops:
                 if st.button("🗑️ Limpiar", use_container_width=True, key="limpiar_wiki_common"):
                     st.session_state.wiki_paginas_contenido = []
                     st.session_state.wiki_embeddings = None
+                    st.session_state.wiki_lexico = None
                     st.session_state.wiki_referencias = []
                     st.session_state.wiki_chunks = []
                     st.session_state.wiki_indexed = False
@@ -3224,22 +4224,15 @@ with tab_devops:
             with col_stats:
                 st.subheader("📈 Estadísticas")
                 if st.session_state.devops_incidencias:
+                    estadisticas = estadisticas_incidencias_indexadas()
                     st.markdown("**Por tipo:**")
-                    tipos = {}
-                    for inc in st.session_state.devops_incidencias:
-                        tipo = inc['tipo']
-                        tipos[tipo] = tipos.get(tipo, 0) + 1
-                    for tipo, count in sorted(tipos.items()):
+                    for tipo, count in sorted(estadisticas["tipos"].items()):
                         st.metric(tipo, count)
     
                     st.markdown("---")
     
                     st.markdown("**Por estado:**")
-                    estados = {}
-                    for inc in st.session_state.devops_incidencias:
-                        estado = inc['estado']
-                        estados[estado] = estados.get(estado, 0) + 1
-                    for estado, count in sorted(estados.items(), key=lambda x: x[1], reverse=True)[:5]:
+                    for estado, count in sorted(estadisticas["estados"].items(), key=lambda x: x[1], reverse=True)[:5]:
                         st.text(f"{estado}: {count}")
                 else:
                     st.info("Sincroniza primero los work items")
@@ -3297,11 +4290,22 @@ with tab_devops:
                                     devops_query,
                                     st.session_state.devops_incidencias,
                                     st.session_state.devops_embeddings,
-                                    st.session_state.embedding_model,
-                                    top_k=top_k
+                                    cargar_modelo_embeddings(),
+                                    top_k=top_k,
+                                    lexico=st.session_state.devops_lexico,
+                                    padres=st.session_state.devops_chunks_padres
                                 )
                                 tipo_busqueda = "similitud"
 
+                        # Comentarios bajo demanda solo para los items recuperados
+                        with st.spinner("💬 Cargando comentarios de los work items encontrados..."):
+                            completar_comentarios_resultados(
+                                st.session_state.devops_org,
+                                st.session_state.devops_project,
+                                st.session_state.devops_pat,
+                                resultados
+                            )
+
                         contexto = construir_contexto_devops(resultados)
     
                         system_prompt = """Eres un asistente técnico experto en analizar work items de Azure DevOps.
@@ -3409,8 +4413,9 @@ with tab_devops:
                             st.session_state.wiki_chunks,
                             st.session_state.wiki_embeddings,
                             st.session_state.wiki_referencias,
-                            st.session_state.embedding_model,
-                            top_k=top_k
+                            cargar_modelo_embeddings(),
+                            top_k=top_k,
+                            lexico=st.session_state.wiki_lexico
                         )
     
                     # Construir contexto
@@ -3499,18 +4504,13 @@ with tab_devops:
                             file_bytes = uploaded_file.read()
 
                             with st.spinner(f"📖 Leyendo {file_ext.upper()}..."):
-                                if file_ext == "docx":
-                                    if incluir_imagenes:
-                                        contenido, imagenes = leer_docx_desde_bytes(file_bytes, extraer_imagenes=True)
-                                        st.session_state.wiki_create_imagenes = imagenes
-                                        if imagenes:
-                                            st.info(f"📸 {len(imagenes)} imagen(es) encontradas en el documento")
-                                    else:
-                                        contenido = leer_docx_desde_bytes(file_bytes, extraer_imagenes=False)
-                                        st.session_state.wiki_create_imagenes = []
-                                elif file_ext == "pdf":
-                                    contenido = leer_pdf_desde_bytes(file_bytes)
-                                    st.session_state.wiki_create_imagenes = []
+                                if file_ext in ("docx", "pdf"):
+                                    contenido, imagenes, _ = leer_documento_desde_bytes(
+                                        file_bytes, file_ext, extraer_imagenes=incluir_imagenes
+                                    )
+                                    st.session_state.wiki_create_imagenes = imagenes
+                                    if imagenes:
+                                        st.info(f"📸 {len(imagenes)} imagen(es) encontradas en el documento")
                                 else:
                                     st.error("Formato no soportado")
                                     contenido = ""
@@ -3979,71 +4979,80 @@ with tab_devops:
 
                         st.info("📊 Los logs de creación se pueden ver en tiempo real en la pestaña 'Monitor Log'")
 
-                        for idx, pagina in enumerate(paginas_ordenadas):
-                            progress_bar.progress((idx + 1) / len(paginas_ordenadas))
-                            status_text.text(f"Creando: {pagina['titulo']} ({idx + 1}/{len(paginas_ordenadas)})")
+                        # Las páginas se crean por niveles: las de un mismo nivel (sus padres ya
+                        # existen) se envían a la vez por el cliente asíncrono
+                        procesadas = 0
+                        for nivel, paginas_nivel in enumerate(niveles_paginas_wiki(paginas_ordenadas)):
+                            lote = []
+                            for pagina in paginas_nivel:
+                                titulo_clean = pagina['titulo'].replace(' ', '-')
 
-                            titulo_clean = pagina['titulo'].replace(' ', '-')
-
-                            # Construir path usando el mapa de paths
-                            if st.session_state.wiki_create_modo == "nueva":
-                                if pagina.get('es_raiz', False):
-                                    path = f"/{titulo_clean}"
-                                else:
-                                    padre_titulo = pagina.get('padre', '')
-                                    if padre_titulo and padre_titulo in titulo_a_path:
-                                        path = f"{titulo_a_path[padre_titulo]}/{titulo_clean}"
-                                    else:
-                                        path = f"/{titulo_clean}"
-                            else:
-                                base_path = st.session_state.wiki_create_pagina_padre
-                                if base_path == "/":
-                                    path = f"/{titulo_clean}"
-                                else:
+                                # Construir path usando el mapa de paths
+                                if st.session_state.wiki_create_modo == "nueva":
                                     if pagina.get('es_raiz', False):
-                                        path = f"{base_path}/{titulo_clean}"
+                                        path = f"/{titulo_clean}"
                                     else:
                                         padre_titulo = pagina.get('padre', '')
                                         if padre_titulo and padre_titulo in titulo_a_path:
                                             path = f"{titulo_a_path[padre_titulo]}/{titulo_clean}"
                                         else:
+                                            path = f"/{titulo_clean}"
+                                else:
+                                    base_path = st.session_state.wiki_create_pagina_padre
+                                    if base_path == "/":
+                                        path = f"/{titulo_clean}"
+                                    else:
+                                        if pagina.get('es_raiz', False):
                                             path = f"{base_path}/{titulo_clean}"
+                                        else:
+                                            padre_titulo = pagina.get('padre', '')
+                                            if padre_titulo and padre_titulo in titulo_a_path:
+                                                path = f"{titulo_a_path[padre_titulo]}/{titulo_clean}"
+                                            else:
+                                                path = f"{base_path}/{titulo_clean}"
+
+                                # Procesar imágenes si existen
+                                contenido_final = pagina['contenido_markdown']
+                                if st.session_state.wiki_create_imagenes and len(st.session_state.wiki_create_imagenes) > 0:
+                                    contenido_final = procesar_imagenes_en_markdown(
+                                        contenido_final,
+                                        st.session_state.wiki_create_imagenes,
+                                        st.session_state.devops_org,
+                                        st.session_state.devops_project,
+                                        st.session_state.devops_pat,
+                                        st.session_state.selected_wiki_id_crear
+                                    )
+                                lote.append((pagina, path, contenido_final))
 
-                            # Procesar imágenes si existen
-                            contenido_final = pagina['contenido_markdown']
-                            if st.session_state.wiki_create_imagenes and len(st.session_state.wiki_create_imagenes) > 0:
-                                contenido_final = procesar_imagenes_en_markdown(
-                                    contenido_final,
-                                    st.session_state.wiki_create_imagenes,
-                                    st.session_state.devops_org,
-                                    st.session_state.devops_project,
-                                    st.session_state.devops_pat,
-                                    st.session_state.selected_wiki_id_crear
-                                )
-
-                            success, result = crear_pagina_wiki_azure(
+                            status_text.text(
+                                f"Creando {len(lote)} página(s) de nivel {nivel + 1} "
+                                f"({procesadas + len(lote)}/{len(paginas_ordenadas)})"
+                            )
+                            resultados = crear_paginas_wiki_azure(
                                 st.session_state.devops_org,
                                 st.session_state.devops_project,
                                 st.session_state.devops_pat,
                                 st.session_state.selected_wiki_id_crear,
-                                path,
-                                contenido_final
+                                [(path, contenido_final) for _, path, contenido_final in lote]
                             )
 
-                            if success:
-                                exitos += 1
-                                titulo_a_path[pagina['titulo']] = path
-                                add_log(f"✅ Creada: {pagina['titulo']} → {path}", "success")
-                            else:
-                                errores += 1
-                                add_log(f"❌ Error: {pagina['titulo']}", "error")
-                                # Guardar la página fallida con su path calculado
-                                paginas_fallidas_nuevas.append({
-                                    "titulo": pagina['titulo'],
-                                    "path": path,
-                                    "contenido_markdown": pagina['contenido_markdown'],
-                                    "wiki_id": st.session_state.selected_wiki_id_crear
-                                })
+                            for (pagina, path, _), resultado in zip(lote, resultados):
+                                if not isinstance(resultado, Exception):
+                                    exitos += 1
+                                    titulo_a_path[pagina['titulo']] = path
+                                    add_log(f"✅ Creada: {pagina['titulo']} → {path}", "success")
+                                else:
+                                    errores += 1
+                                    add_log(f"❌ Error: {pagina['titulo']} ({path}): {str(resultado)[:200]}", "error")
+                                    # Guardar la página fallida con su path calculado
+                                    paginas_fallidas_nuevas.append({
+                                        "titulo": pagina['titulo'],
+                                        "path": path,
+                                        "contenido_markdown": pagina['contenido_markdown'],
+                                        "wiki_id": st.session_state.selected_wiki_id_crear
+                                    })
+                            procesadas += len(lote)
+                            progress_bar.progress(procesadas / len(paginas_ordenadas))
 
                         progress_bar.progress(1.0)
                         status_text.text("¡Creación completada!")
@@ -4890,7 +5899,7 @@ REGLAS CRÍTICAS:
             st.warning("⚠️ Primero sincroniza e indexa los Work Items en la pestaña **Consulta Work Items**")
         else:
             # Obtener tipos disponibles en los work items indexados
-            tipos_disponibles = sorted(set(inc['tipo'] for inc in st.session_state.devops_incidencias))
+            tipos_disponibles = sorted(estadisticas_incidencias_indexadas()["tipos"])
 
             analisis_tab_a, analisis_tab_b = st.tabs([
                 "📊 Comparar Tareas con Fuente",
@@ -4933,10 +5942,8 @@ REGLAS CRÍTICAS:
                         file_bytes = doc_upload.read()
                         nombre_fuente = doc_upload.name
                         ext = doc_upload.name.rsplit(".", 1)[-1].lower()
-                        if ext == "docx":
-                            contenido_fuente = leer_docx_desde_bytes(file_bytes)
-                        elif ext == "pdf":
-                            contenido_fuente = leer_pdf_desde_bytes(file_bytes)
+                        if ext in ("docx", "pdf"):
+                            contenido_fuente = leer_documento_desde_bytes(file_bytes, ext)[0]
                         elif ext == "txt":
                             contenido_fuente = file_bytes.decode("utf-8", errors="replace")
                         if contenido_fuente:
@@ -4962,10 +5969,7 @@ REGLAS CRÍTICAS:
                         st.error("❌ No hay fuente de referencia disponible. Indexa la Wiki o sube un documento.")
                     else:
                         # Filtrar work items por tipo seleccionado
-                        items_filtrados = [
-                            inc for inc in st.session_state.devops_incidencias
-                            if inc['tipo'] in tipos_sel_a
-                        ]
+                        items_filtrados = obtener_incidencias_indexadas(tipos_sel_a)
 
                         if not items_filtrados:
                             st.error(f"❌ No hay work items de tipo: {', '.join(tipos_sel_a)}")
@@ -5100,10 +6104,7 @@ Responde en español, con formato Markdown claro."""
                     if not tipos_sel_b:
                         st.error("❌ Selecciona al menos un tipo de work item")
                     else:
-                        items_doc = [
-                            inc for inc in st.session_state.devops_incidencias
-                            if inc['tipo'] in tipos_sel_b
-                        ]
+                        items_doc = obtener_incidencias_indexadas(tipos_sel_b)
 
                         if not items_doc:
                             st.error(f"❌ No hay work items de tipo: {', '.join(tipos_sel_b)}")
@@ -5205,9 +6206,9 @@ with tab_doc:
         with col1:
             st.markdown("#### Opción 1: Subir archivo local")
             uploaded_doc = st.file_uploader(
-                "Sube un documento Word (.docx)", 
-                type=["docx"],
-                help="Archivo .docx desde tu ordenador",
+                "Sube un documento Word (.docx) o PDF", 
+                type=["docx", "pdf"],
+                help="Archivo .docx o .pdf desde tu ordenador (los PDF se indexan según se extraen sus páginas)",
                 key="upload_doc_file"
             )
             
@@ -5259,18 +6260,18 @@ with tab_doc:
             doc_url = st.text_input(
                 "URL del documento",
                 placeholder="https://ejemplo.com/documento.docx",
-                help="URL de acceso público a un archivo .docx"
+                help="URL de acceso público a un archivo .docx o .pdf"
             )
         
         with col2:
             st.markdown("#### ⚙️ Configuración")
             chunk_size = st.slider(
-                "Tamaño de fragmentos",
-                min_value=500,
-                max_value=4000,
-                value=1000,
-                step=100,
-                help="Tamaño de cada fragmento del documento"
+                "Tamaño de fragmentos (tokens)",
+                min_value=64,
+                max_value=256,
+                value=CHUNK_TOKENS,
+                step=8,
+                help="Tokens del modelo de embeddings por fragmento del documento (admite hasta 256)"
             )
             
             doc_top_k = st.slider(
@@ -5322,30 +6323,34 @@ with tab_doc:
                 
                 if doc_bytes:
                     # Leer contenido
+                    es_pdf = filename.lower().split("?")[0].endswith(".pdf")
                     with st.spinner("📖 Leyendo contenido del documento..."):
-                        contenido = leer_docx_desde_bytes(doc_bytes)
+                        if es_pdf:
+                            # Las páginas se trocean y codifican según se extraen
+                            contenido, chunks, embeddings = indexar_pdf_desde_bytes(
+                                doc_bytes, chunk_size, cargar_modelo_embeddings()
+                            )
+                        else:
+                            contenido, _, clave_documento = leer_documento_desde_bytes(doc_bytes, "docx")
                     
                     if contenido:
                         st.success(f"✅ Documento leído: {len(contenido)} caracteres")
                         
-                        # Dividir en chunks
-                        chunks = dividir_en_chunks(contenido, chunk_size=chunk_size)
+                        if not es_pdf:
+                            # Dividir en chunks y generar embeddings (o recuperarlos de la caché)
+                            chunks, embeddings = chunks_y_embeddings_documento(
+                                clave_documento,
+                                contenido,
+                                chunk_size,
+                                cargar_modelo_embeddings()
+                            )
                         st.info(f"📑 Dividido en {len(chunks)} fragmentos")
                         
-                        # Cargar modelo si no está cargado
-                        if st.session_state.embedding_model is None:
-                            st.session_state.embedding_model = cargar_modelo_embeddings()
-                        
-                        # Generar embeddings
-                        embeddings = generar_embeddings_documento(
-                            chunks,
-                            st.session_state.embedding_model
-                        )
-                        
                         # Guardar en session_state
                         st.session_state.doc_content = contenido
                         st.session_state.doc_chunks = chunks
-                        st.session_state.doc_embeddings = embeddings
+                        st.session_state.doc_embeddings = crear_indice_vectorial("doc", embeddings)
+                        st.session_state.doc_lexico = construir_indice_lexico([chunk["texto"] for chunk in chunks])
                         st.session_state.doc_indexed = True
                         st.session_state.doc_filename = filename
                         st.session_state.doc_top_k = doc_top_k
@@ -5365,6 +6370,7 @@ with tab_doc:
                 st.session_state.doc_content = ""
                 st.session_state.doc_chunks = []
                 st.session_state.doc_embeddings = None
+                st.session_state.doc_lexico = None
                 st.session_state.doc_indexed = False
                 st.session_state.doc_messages = []
                 st.session_state.doc_filename = ""
@@ -5410,8 +6416,9 @@ with tab_doc:
                         doc_query,
                         st.session_state.doc_chunks,
                         st.session_state.doc_embeddings,
-                        st.session_state.embedding_model,
-                        top_k=top_k
+                        cargar_modelo_embeddings(),
+                        top_k=top_k,
+                        lexico=st.session_state.doc_lexico
                     )
                 
                 # Construir contexto
@@ -5507,8 +6514,9 @@ Cuando respondas:
                                 instruccion_generacion,
                                 st.session_state.doc_chunks,
                                 st.session_state.doc_embeddings,
-                                st.session_state.embedding_model,
-                                top_k=st.session_state.get('doc_top_k', 3)
+                                cargar_modelo_embeddings(),
+                                top_k=st.session_state.get('doc_top_k', 3),
+                                lexico=st.session_state.doc_lexico
                             )
                         contexto_doc = construir_contexto_documento(resultados)
                     
@@ -5742,10 +6750,6 @@ with tab_tilena:
                                         if len(tickets) == 0:
                                             st.warning("⚠️ No hay tickets para indexar")
                                         else:
-                                            # Crear modelo de embeddings si no existe
-                                            if st.session_state.embedding_model is None:
-                                                st.session_state.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-
                                             # Preparar textos para embeddings
                                             textos = []
                                             for ticket in tickets:
@@ -5770,8 +6774,8 @@ with tab_tilena:
                                                     textos.append(texto)
 
                                             # Generar embeddings
-                                            embeddings = st.session_state.embedding_model.encode(textos)
-                                            st.session_state.tilena_embeddings = embeddings
+                                            embeddings = codificar_textos(textos, cargar_modelo_embeddings(), show_progress_bar=False)
+                                            st.session_state.tilena_embeddings = crear_indice_vectorial("tilena", embeddings)
                                             st.session_state.tilena_indexed = True
 
                                             add_log(f"Indexados {len(textos)} tickets para consultas IA", "success")
@@ -5891,18 +6895,13 @@ with tab_tilena:
                 with st.spinner("🤖 La IA está analizando los tickets..."):
                     try:
                         # Buscar tickets similares usando embeddings
-                        query_embedding = st.session_state.embedding_model.encode([prompt])[0]
-
-                        # Calcular similitudes
-                        from numpy.linalg import norm
-                        similitudes = []
-                        for idx, ticket_emb in enumerate(st.session_state.tilena_embeddings):
-                            similitud = np.dot(query_embedding, ticket_emb) / (norm(query_embedding) * norm(ticket_emb))
-                            similitudes.append((idx, similitud))
+                        query_embedding = cargar_modelo_embeddings().encode([prompt])[0]
 
-                        # Ordenar por similitud
-                        similitudes.sort(key=lambda x: x[1], reverse=True)
-                        top_indices = [idx for idx, _ in similitudes[:st.session_state.tilena_top_k]]
+                        top_indices = [
+                            idx for idx, _ in st.session_state.tilena_embeddings.buscar(
+                                query_embedding, top_k=st.session_state.tilena_top_k
+                            )
+                        ]
 
                         # Construir contexto con tickets relevantes
                         contexto_tickets = []
@@ -5981,6 +6980,111 @@ with tab_logs:
 
     st.markdown("---")
 
+    # Métricas de las llamadas HTTP a Azure DevOps (cliente compartido)
+    if st.session_state.devops_pat:
+        with st.expander("🌐 Métricas HTTP Azure DevOps", expanded=False):
+            cliente_devops = obtener_cliente_devops(st.session_state.devops_pat)
+            resumen_http = cliente_devops.resumen_metricas()
+            if resumen_http:
+                st.dataframe(resumen_http, use_container_width=True, hide_index=True)
+            else:
+                st.info("ℹ️ Aún no se ha hecho ninguna llamada a Azure DevOps")
+
+            estado_rate_limit = cliente_devops.scheduler.estado()
+            st.caption(
+                f"🚦 Concurrencia actual: {estado_rate_limit['concurrencia']} · "
+                f"En vuelo: {estado_rate_limit['en_vuelo']} · "
+                f"Pausa pendiente: {estado_rate_limit['pausa_s']}s"
+            )
+            eventos_throttling = cliente_devops.scheduler.eventos()
+            if eventos_throttling:
+                st.markdown(f"**Eventos de throttling ({len(eventos_throttling)}):**")
+                st.dataframe(list(reversed(eventos_throttling)), use_container_width=True, hide_index=True)
+
+        st.markdown("---")
+
+    # Modelos de embeddings cargados en el proceso y backends de inferencia
+    with st.expander("🧠 Modelos y backends de embeddings", expanded=False):
+        modelos_cargados = obtener_registro_modelos().estadisticas()
+        if modelos_cargados:
+            st.markdown("**Modelos cargados en el proceso:**")
+            st.dataframe(modelos_cargados, use_container_width=True, hide_index=True)
+        else:
+            st.info("ℹ️ Aún no se ha cargado ningún modelo de embeddings")
+
+        st.caption(
+            f"Backend activo: `{EMBEDDING_BACKEND}` (variable HELPTASK_EMBEDDING_BACKEND: torch, onnx o int8). "
+            "La paridad es la similitud coseno con los embeddings de PyTorch."
+        )
+        if st.button("⏱️ Comparar backends", key="btn_benchmark_backends"):
+            with st.spinner("Midiendo cada backend (los que no están cargados se cargan temporalmente)..."):
+                st.session_state.embedding_backends_benchmark = embedding_backend.comparar_backends(
+                    EMBEDDING_MODEL_NAME, registro=obtener_registro_modelos()
+                )
+            for fila in st.session_state.embedding_backends_benchmark:
+                if "error" in fila:
+                    add_log(f"⚠️ Backend '{fila['backend']}' no disponible: {fila['error']}", "warning")
+                else:
+                    add_log(
+                        f"⏱️ Backend '{fila['backend']}': {fila['textos_por_s']} textos/s, "
+                        f"paridad coseno mín. {fila['coseno_min']}",
+                        "info"
+                    )
+        if st.session_state.embedding_backends_benchmark:
+            st.dataframe(st.session_state.embedding_backends_benchmark, use_container_width=True, hide_index=True)
+
+        st.markdown("**Pool multiproceso de codificación:**")
+        pool_codificacion = obtener_pool_codificacion(EMBEDDING_BACKEND)
+        if pool_codificacion is None:
+            st.caption("Desactivado (variable HELPTASK_EMBEDDING_PROCESOS = número de procesos para activarlo)")
+        else:
+            st.caption(
+                f"{pool_codificacion.procesos} procesos × {pool_codificacion.hilos_por_proceso} hilos; "
+                f"se usa a partir de {EMBEDDING_POOL_MIN_TEXTOS} textos por codificar"
+            )
+            if getattr(pool_codificacion, "error", None):
+                st.warning(f"⚠️ Último error del pool (se codificó en el proceso principal): {pool_codificacion.error}")
+        if st.button("📈 Medir escalado multiproceso", key="btn_benchmark_pool"):
+            with st.spinner("Codificando textos de prueba con 1, 2, 4... procesos..."):
+                try:
+                    st.session_state.embedding_pool_benchmark = medir_escalado(
+                        EMBEDDING_MODEL_NAME, textos_distintos(embedding_backend.TEXTOS_PRUEBA, 2000), backend=EMBEDDING_BACKEND
+                    )
+                    mejor = max(st.session_state.embedding_pool_benchmark, key=lambda f: f["textos_por_s"])
+                    add_log(
+                        f"📈 Escalado multiproceso: máximo {mejor['textos_por_s']} textos/s con {mejor['procesos']} "
+                        f"procesos (x{mejor['aceleracion']} frente a 1)",
+                        "info"
+                    )
+                except Exception as e:
+                    add_log(f"❌ Error midiendo el escalado multiproceso: {e}", "error")
+                    st.error(f"❌ Error: {e}")
+        if st.session_state.embedding_pool_benchmark:
+            st.dataframe(st.session_state.embedding_pool_benchmark, use_container_width=True, hide_index=True)
+
+    # Trabajos de indexación en segundo plano del proceso
+    trabajos_indexacion = obtener_worker_indexacion().progresos()
+    if trabajos_indexacion:
+        with st.expander("🧵 Indexación en segundo plano", expanded=False):
+            st.dataframe(trabajos_indexacion, use_container_width=True, hide_index=True)
+
+    # Caché de documentos procesados (compartida por pestañas y sesiones)
+    with st.expander("📦 Caché de documentos", expanded=False):
+        estadisticas_documentos = obtener_cache_documentos().estadisticas()
+        st.caption(
+            f"{estadisticas_documentos['documentos']} documentos · {estadisticas_documentos['mb']} de "
+            f"{estadisticas_documentos['max_mb']} MB · {estadisticas_documentos['aciertos']} aciertos / "
+            f"{estadisticas_documentos['fallos']} fallos en este proceso"
+        )
+
+    # Recall/latencia de los índices vectoriales aproximados
+    if st.session_state.indices_vectoriales_informe:
+        with st.expander("🧭 Índices vectoriales aproximados", expanded=False):
+            st.caption("Recall@10 y latencia media por consulta frente a la búsqueda exacta, medidos al construir cada índice")
+            st.dataframe(list(st.session_state.indices_vectoriales_informe.values()), use_container_width=True, hide_index=True)
+
+        st.markdown("---")
+
     # Contenedor de logs con scroll
     st.markdown("""
     <style>
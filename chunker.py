@@ -0,0 +1,227 @@
+"""
+Troceado de textos en chunks medidos en tokens del modelo de embeddings
+
+- El tamaño se mide en tokens del tokenizer del modelo (el límite real del encoder),
+  no en caracteres; sin tokenizer se estima a partir de la longitud
+- Los chunks respetan los párrafos; un párrafo que no cabe se corta por frases y una
+  frase que no cabe, por palabras, de modo que ningún chunk supera el máximo
+- Solape configurable: cada chunk repite el final del anterior (párrafos o frases
+  enteras si caben en el solape; si no, las últimas palabras)
+- Cada chunk guarda su posición (inicio, fin) en el texto original
+- Los tokens se cuentan por lotes y los chunks se montan con joins de listas: el coste
+  es lineal en la longitud del texto
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+SEPARADOR_PARRAFOS = re.compile(r"\n\s*\n")
+FIN_FRASE = re.compile(r"(?<=[.!?…])\s+")
+PALABRA = re.compile(r"\S+")
+CARACTERES_POR_TOKEN = 4  # estimación sin tokenizer (texto en español/inglés)
+
+# Un tramo del texto: (inicio, fin, tokens, párrafo al que pertenece)
+Tramo = Tuple[int, int, int, int]
+ContadorTokens = Callable[[List[str]], List[int]]
+
+
+def estimar_tokens(textos: List[str]) -> List[int]:
+    """Tokens aproximados de cada texto cuando no hay tokenizer"""
+    return [max(1, -(-len(texto) // CARACTERES_POR_TOKEN)) for texto in textos]
+
+
+def contador_tokens_modelo(modelo: Any) -> ContadorTokens:
+    """
+    Función que cuenta los tokens de una lista de textos con el tokenizer del modelo
+    (sin tokens especiales); si el modelo no expone tokenizer, usa estimar_tokens
+    """
+    tokenizer = getattr(modelo, "tokenizer", None)
+    if tokenizer is None:
+        return estimar_tokens
+
+    def contar(textos: List[str]) -> List[int]:
+        if not textos:
+            return []
+        ids = tokenizer(textos, add_special_tokens=False, verbose=False)["input_ids"]
+        return [len(i) for i in ids]
+    return contar
+
+
+def max_tokens_modelo(modelo: Any, por_defecto: int = 256) -> int:
+    """Tokens de texto que admite el modelo por entrada (max_seq_length sin [CLS] y [SEP])"""
+    limite = getattr(modelo, "max_seq_length", None) or por_defecto
+    return max(1, limite - 2)
+
+
+def _tramos(texto: str, patron: "re.Pattern", inicio: int, fin: int) -> List[Tuple[int, int]]:
+    """Tramos de texto[inicio:fin] entre separadores, sin espacios en los extremos"""
+    tramos = []
+    pos = inicio
+    for m in patron.finditer(texto, inicio, fin):
+        tramos.append((pos, m.start()))
+        pos = m.end()
+    tramos.append((pos, fin))
+
+    resultado = []
+    for a, b in tramos:
+        while a < b and texto[a].isspace():
+            a += 1
+        while b > a and texto[b - 1].isspace():
+            b -= 1
+        if a < b:
+            resultado.append((a, b))
+    return resultado
+
+
+class Chunker:
+    """Divide textos en chunks de como mucho max_tokens tokens, con solape opcional"""
+
+    def __init__(self, max_tokens: int = 254, solape_tokens: int = 0,
+                 contar_tokens: Optional[ContadorTokens] = None):
+        """
+        Args:
+            max_tokens: Tokens máximos por chunk
+            solape_tokens: Tokens del final de cada chunk que se repiten al principio del
+                siguiente (como mucho la mitad de max_tokens)
+            contar_tokens: Cuenta los tokens de una lista de textos (ver
+                contador_tokens_modelo); por defecto, estimar_tokens
+        """
+        self.max_tokens = max(1, max_tokens)
+        self.solape_tokens = min(max(0, solape_tokens), self.max_tokens // 2)
+        self.contar_tokens = contar_tokens or estimar_tokens
+        # Unidades (párrafos, frases o grupos de palabras) de como mucho este tamaño: así
+        # el solape completo siempre cabe junto a la unidad que abre el chunk siguiente
+        self.max_tokens_unidad = self.max_tokens - self.solape_tokens
+
+    def _contar(self, texto: str, tramos: List[Tuple[int, int]]) -> List[int]:
+        return self.contar_tokens([texto[a:b] for a, b in tramos])
+
+    def _partir_por_palabras(self, texto: str, inicio: int, fin: int, parrafo: int) -> List[Tramo]:
+        """Corta una frase demasiado larga en grupos de palabras que caben en max_tokens_unidad"""
+        palabras = [(m.start(), m.end()) for m in PALABRA.finditer(texto, inicio, fin)]
+        tokens = self._contar(texto, palabras)
+
+        piezas: List[Tramo] = []
+        for (a, b), n in zip(palabras, tokens):
+            if n > self.max_tokens_unidad:
+                # Una "palabra" sin espacios más larga que un chunk (URL, base64...): corte duro
+                paso = max(1, (b - a) * self.max_tokens_unidad // n)
+                cortes = [(i, min(i + paso, b)) for i in range(a, b, paso)]
+                for (i, j), m in zip(cortes, self._contar(texto, cortes)):
+                    piezas.append((i, j, m, parrafo))
+            elif piezas and piezas[-1][2] + n <= self.max_tokens_unidad:
+                piezas[-1] = (piezas[-1][0], b, piezas[-1][2] + n, parrafo)
+            else:
+                piezas.append((a, b, n, parrafo))
+        return piezas
+
+    def _unidades(self, texto: str) -> List[Tramo]:
+        """
+        Párrafos del texto, con los que no caben cortados por frases y las frases que no
+        caben cortadas por palabras
+        """
+        parrafos = _tramos(texto, SEPARADOR_PARRAFOS, 0, len(texto))
+        unidades: List[Tramo] = []
+        for p, ((a, b), n) in enumerate(zip(parrafos, self._contar(texto, parrafos))):
+            if n <= self.max_tokens_unidad:
+                unidades.append((a, b, n, p))
+                continue
+            frases = _tramos(texto, FIN_FRASE, a, b)
+            for (fa, fb), fn in zip(frases, self._contar(texto, frases)):
+                if fn <= self.max_tokens_unidad:
+                    unidades.append((fa, fb, fn, p))
+                else:
+                    unidades.extend(self._partir_por_palabras(texto, fa, fb, p))
+        return unidades
+
+    def _cola(self, texto: str, unidad: Tramo, presupuesto: int) -> Optional[Tramo]:
+        """
+        Final de una unidad que cabe en presupuesto tokens: sus últimas frases enteras o,
+        si ni la última cabe, sus últimas palabras. Solo se mira el final de la unidad,
+        de modo que el coste no depende de su longitud.
+        """
+        a, b, _, parrafo = unidad
+        inicio = max(a, b - 2 * presupuesto * CARACTERES_POR_TOKEN)
+        frases = _tramos(texto, FIN_FRASE, inicio, b)
+        palabras = [(m.start(), m.end()) for m in PALABRA.finditer(texto, inicio, b)]
+        if inicio > a:
+            # Lo primero de la ventana puede empezar a medias
+            frases = frases[1:]
+            if palabras and not texto[inicio - 1].isspace():
+                palabras = palabras[1:]
+        for tramos in (frases, palabras):
+            cola, tokens = None, 0
+            for (ta, _), n in zip(reversed(tramos), reversed(self._contar(texto, tramos))):
+                if tokens + n > presupuesto:
+                    break
+                cola, tokens = ta, tokens + n
+            if cola is not None:
+                return (cola, b, tokens, parrafo)
+        return None
+
+    def _solape(self, texto: str, previas: List[Tramo]) -> List[Tramo]:
+        """Unidades (o final de una unidad) del chunk cerrado que se repiten en el siguiente"""
+        solape: List[Tramo] = []
+        tokens = 0
+        for previa in reversed(previas):
+            if tokens + previa[2] <= self.solape_tokens:
+                solape.append(previa)
+                tokens += previa[2]
+                continue
+            cola = self._cola(texto, previa, self.solape_tokens - tokens) if tokens < self.solape_tokens else None
+            if cola is not None:
+                solape.append(cola)
+            break
+        solape.reverse()
+        return solape
+
+    def _montar(self, texto: str, unidades: List[Tramo]) -> Dict[str, Any]:
+        """Chunk a partir de sus unidades: párrafos separados por línea en blanco y frases por espacio"""
+        partes = [texto[unidades[0][0]:unidades[0][1]]]
+        for anterior, unidad in zip(unidades, unidades[1:]):
+            partes.append(" " if unidad[3] == anterior[3] else "\n\n")
+            partes.append(texto[unidad[0]:unidad[1]])
+        return {
+            "texto": "".join(partes),
+            "inicio": unidades[0][0],
+            "fin": unidades[-1][1],
+            "tokens": sum(u[2] for u in unidades),
+        }
+
+    def trocear(self, texto: str) -> List[Dict[str, Any]]:
+        """
+        Divide el texto en chunks
+
+        Returns:
+            Lista de dict por chunk: texto, inicio y fin (posición en el texto original,
+            texto[inicio:fin] contiene el chunk con su espaciado original) y tokens
+        """
+        if not texto:
+            return []
+
+        chunks = []
+        actual: List[Tramo] = []
+        tokens_actual = 0
+        nuevas = 0  # unidades del chunk actual que no vienen del solape
+        for unidad in self._unidades(texto):
+            if actual and tokens_actual + unidad[2] > self.max_tokens:
+                if nuevas:
+                    chunks.append(self._montar(texto, actual))
+                solape = self._solape(texto, actual) if self.solape_tokens else []
+                tokens_solape = sum(u[2] for u in solape)
+                # El solape no puede dejar sin sitio a la unidad nueva
+                while solape and tokens_solape + unidad[2] > self.max_tokens:
+                    tokens_solape -= solape.pop(0)[2]
+                actual, tokens_actual, nuevas = solape, tokens_solape, 0
+            actual.append(unidad)
+            tokens_actual += unidad[2]
+            nuevas += 1
+
+        if nuevas:
+            chunks.append(self._montar(texto, actual))
+        return chunks
+
+    def textos(self, texto: str) -> List[str]:
+        """Solo el texto de cada chunk (ver trocear)"""
+        return [chunk["texto"] for chunk in self.trocear(texto)]
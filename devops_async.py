@@ -0,0 +1,365 @@
+"""
+Cliente asíncrono (httpx) para la API REST de Azure DevOps
+
+Pensado para cargas de tipo fan-out (comentarios de muchos work items, contenido de
+muchas páginas de wiki, etc.), donde interesa tener decenas de peticiones en vuelo sin
+un hilo por petición. Este módulo proporciona:
+- AsyncAzureDevOpsClient: httpx.AsyncClient con pool keep-alive, semáforo de
+  concurrencia y reintentos; comparte el RateLimitScheduler del cliente síncrono, de
+  modo que el throttling se gestiona de forma global para todas las llamadas
+- Equivalentes asíncronos de los helpers de Azure DevOps de la app
+- AsyncRunner: event loop en un hilo de fondo para usar todo lo anterior desde
+  los handlers (síncronos) de Streamlit
+
+Los errores de red se convierten a las excepciones de requests que ya maneja la app.
+"""
+
+import asyncio
+import base64
+import random
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Any, Awaitable, Iterable, Tuple
+
+import httpx
+import requests
+
+from devops_client import (
+    METODOS_IDEMPOTENTES,
+    RateLimitScheduler,
+    endpoint_url,
+    formatear_comentarios,
+    segundos_retry_after,
+)
+
+
+class AsyncAzureDevOpsClient:
+    """Cliente HTTP asíncrono con pool de conexiones, semáforo y reintentos para Azure DevOps"""
+
+    def __init__(
+        self,
+        pat: str,
+        max_concurrencia: int = 32,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_espera: float = 60.0,
+        timeout: float = 30,
+        scheduler: Optional[RateLimitScheduler] = None
+    ):
+        """
+        Inicializa el cliente (debe crearse dentro del event loop que lo va a usar)
+
+        Args:
+            pat: Personal Access Token de Azure DevOps
+            max_concurrencia: Peticiones simultáneas máximas de este cliente (semáforo compartido)
+            max_retries: Reintentos máximos por llamada
+            backoff: Espera base (segundos) del backoff exponencial
+            max_espera: Espera máxima (segundos) entre reintentos
+            timeout: Timeout por defecto de cada petición (segundos)
+            scheduler: Planificador de rate limit compartido con el cliente síncrono
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_espera = max_espera
+        self.scheduler = scheduler or RateLimitScheduler(max_concurrencia=max_concurrencia)
+        self.semaforo = asyncio.Semaphore(max_concurrencia)
+
+        encoded_credentials = base64.b64encode(f":{pat}".encode()).decode()
+        self.client = httpx.AsyncClient(
+            headers={"Authorization": f"Basic {encoded_credentials}"},
+            limits=httpx.Limits(max_connections=max_concurrencia, max_keepalive_connections=max_concurrencia),
+            timeout=timeout
+        )
+
+    async def _turno(self) -> None:
+        """Espera (sin bloquear el loop) a que el planificador global conceda un hueco"""
+        while True:
+            espera = self.scheduler.intentar_turno()
+            if espera is None:
+                return
+            await asyncio.sleep(espera)
+
+    async def request(self, method: str, url: str, idempotente: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """
+        Ejecuta una petición con reintentos (mismas reglas que AzureDevOpsClient.request)
+
+        Returns:
+            La última respuesta recibida
+
+        Raises:
+            requests.exceptions.RequestException: Si fallan todos los intentos por red
+        """
+        method = method.upper()
+        if idempotente is None:
+            idempotente = method in METODOS_IDEMPOTENTES
+        endpoint = endpoint_url(url)
+
+        intento = 0
+        async with self.semaforo:
+            while True:
+                await self._turno()
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    if not idempotente or intento >= self.max_retries:
+                        raise _error_requests(e) from e
+                    await asyncio.sleep(self._espera_backoff(intento))
+                    intento += 1
+                    continue
+                finally:
+                    self.scheduler.liberar_turno()
+
+                self.scheduler.observar(response, endpoint)
+                reintentable = response.status_code == 429 or (idempotente and response.status_code >= 500)
+                if not reintentable or intento >= self.max_retries:
+                    return response
+
+                espera = segundos_retry_after(response.headers.get("Retry-After"))
+                if espera is None:
+                    espera = self._espera_backoff(intento)
+                espera = min(espera, self.max_espera)
+                if response.status_code == 429:
+                    # Throttling: la pausa es global (también para el cliente síncrono)
+                    self.scheduler.pausar(espera, "429", endpoint)
+                else:
+                    await asyncio.sleep(espera)
+                intento += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    def _espera_backoff(self, intento: int) -> float:
+        """Backoff exponencial con jitter"""
+        return min(self.max_espera, self.backoff * (2 ** intento)) * random.uniform(0.5, 1.0)
+
+    async def aclose(self) -> None:
+        """Cierra las conexiones del pool"""
+        await self.client.aclose()
+
+
+def _error_requests(e: httpx.HTTPError) -> requests.exceptions.RequestException:
+    """Traduce un error de httpx a la excepción equivalente de requests"""
+    if isinstance(e, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(e))
+    if isinstance(e, httpx.HTTPStatusError):
+        return requests.exceptions.HTTPError(f"{e.response.status_code} {e.response.reason_phrase} for url: {e.request.url}")
+    return requests.exceptions.ConnectionError(str(e))
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        raise _error_requests(e) from e
+
+
+# ==================================================
+# HELPERS ASÍNCRONOS DE AZURE DEVOPS
+# ==================================================
+
+async def obtener_comentarios_workitem(cliente: AsyncAzureDevOpsClient, organization: str, project: str, work_item_id: int) -> List[Dict[str, Any]]:
+    """
+    Obtiene los comentarios de un work item
+
+    Returns:
+        Lista de comentarios ordenados de más reciente a más antiguo
+        (vacía si el work item no existe)
+
+    Raises:
+        requests.exceptions.RequestException: Si la petición falla tras los reintentos
+    """
+    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workItems/{work_item_id}/comments?api-version=7.1-preview.3"
+    response = await cliente.get(url)
+    if response.status_code == 404:
+        return []
+    _raise_for_status(response)
+    return formatear_comentarios(response.json())
+
+
+async def obtener_comentarios_workitems(cliente: AsyncAzureDevOpsClient, organization: str, project: str, work_item_ids: Iterable[int]) -> Dict[int, Any]:
+    """
+    Obtiene en paralelo los comentarios de varios work items
+
+    Returns:
+        {work_item_id: lista de comentarios, o la excepción si falló}
+    """
+    ids = list(work_item_ids)
+    resultados = await asyncio.gather(
+        *(obtener_comentarios_workitem(cliente, organization, project, wid) for wid in ids),
+        return_exceptions=True
+    )
+    return dict(zip(ids, resultados))
+
+
+async def obtener_attachments_workitem(cliente: AsyncAzureDevOpsClient, organization: str, project: str, work_item_id: int) -> List[Dict[str, Any]]:
+    """
+    Obtiene la lista de attachments .docx de un work item
+
+    Returns:
+        Lista de dicts con 'url' y 'name'
+    """
+    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/{work_item_id}?$expand=all&api-version=7.1"
+    response = await cliente.get(url)
+    _raise_for_status(response)
+
+    attachments = []
+    for relation in response.json().get("relations", []) or []:
+        if relation.get("rel") == "AttachedFile":
+            file_name = relation.get("attributes", {}).get("name", "Unknown")
+            if file_name.lower().endswith('.docx'):
+                attachments.append({"url": relation.get("url"), "name": file_name})
+    return attachments
+
+
+async def obtener_contenido_pagina_wiki(cliente: AsyncAzureDevOpsClient, organization: str, project: str, wiki_id: str, page_id: Any) -> Dict[str, Any]:
+    """
+    Obtiene el contenido de una página de la wiki (page_id puede ser el ID o el path)
+
+    Returns:
+        dict con 'id', 'path', 'content' y 'gitItemPath'
+
+    Raises:
+        requests.exceptions.RequestException: Si la petición falla
+    """
+    if isinstance(page_id, str) and page_id.startswith('/'):
+        url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages"
+        params = {"path": page_id, "includeContent": "true", "api-version": "7.1"}
+    else:
+        url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages/{page_id}"
+        params = {"includeContent": "true", "api-version": "7.1"}
+
+    response = await cliente.get(url, params=params)
+    _raise_for_status(response)
+    data = response.json()
+    return {
+        "id": data.get("id"),
+        "path": data.get("path"),
+        "content": data.get("content", ""),
+        "gitItemPath": data.get("gitItemPath", "")
+    }
+
+
+async def obtener_contenidos_paginas_wiki(cliente: AsyncAzureDevOpsClient, organization: str, project: str, wiki_id: str, page_ids: Iterable[Any]) -> List[Any]:
+    """
+    Obtiene en paralelo el contenido de varias páginas de la wiki
+
+    Returns:
+        Lista alineada con page_ids: el dict de la página, o la excepción si falló
+    """
+    return await asyncio.gather(
+        *(obtener_contenido_pagina_wiki(cliente, organization, project, wiki_id, page_id) for page_id in page_ids),
+        return_exceptions=True
+    )
+
+
+async def crear_pagina_wiki(cliente: AsyncAzureDevOpsClient, organization: str, project: str, wiki_id: str, path: str, contenido_markdown: str) -> Dict[str, Any]:
+    """
+    Crea una página en la wiki, o la actualiza si ya existe (409)
+
+    Returns:
+        dict de la página creada/actualizada
+
+    Raises:
+        requests.exceptions.RequestException: Si la creación o la actualización fallan
+    """
+    path = path.strip()
+    if not path.startswith('/'):
+        path = '/' + path
+
+    url = f"https://dev.azure.com/{organization}/{project}/_apis/wiki/wikis/{wiki_id}/pages"
+    params = {"path": path, "api-version": "7.1"}
+    payload = {"content": contenido_markdown}
+
+    response = await cliente.put(url, params=params, json=payload)
+    if response.status_code == 409:
+        # La página ya existe: actualizar con su ETag
+        response_get = await cliente.get(url, params=params)
+        _raise_for_status(response_get)
+        response = await cliente.put(url, params=params, json=payload, headers={"If-Match": response_get.headers.get("ETag", "")})
+    _raise_for_status(response)
+    return response.json()
+
+
+async def crear_paginas_wiki(cliente: AsyncAzureDevOpsClient, organization: str, project: str, wiki_id: str, paginas: Iterable[Tuple[str, str]]) -> List[Any]:
+    """
+    Crea en paralelo varias páginas de la wiki (sus páginas padre deben existir ya)
+
+    Args:
+        paginas: Tuplas (path, contenido_markdown)
+
+    Returns:
+        Lista alineada con paginas: el dict de la página, o la excepción si falló
+    """
+    return await asyncio.gather(
+        *(crear_pagina_wiki(cliente, organization, project, wiki_id, path, contenido) for path, contenido in paginas),
+        return_exceptions=True
+    )
+
+
+# ==================================================
+# RUNNER PARA STREAMLIT
+# ==================================================
+
+class AsyncRunner:
+    """
+    Event loop en un hilo de fondo, compartido por toda la app
+
+    Los handlers de Streamlit son síncronos: ejecutar() bloquea hasta que termina la
+    corrutina y enviar() devuelve un concurrent.futures.Future, combinable con as_completed.
+    Mantiene un AsyncAzureDevOpsClient por PAT para reutilizar su pool de conexiones.
+    """
+
+    def __init__(self, max_concurrencia: int = 32):
+        """
+        Inicializa el runner
+
+        Args:
+            max_concurrencia: Tamaño del semáforo de cada cliente asíncrono
+        """
+        self.max_concurrencia = max_concurrencia
+        self.loop = asyncio.new_event_loop()
+        self._clientes: Dict[str, AsyncAzureDevOpsClient] = {}
+        self._lock = threading.Lock()
+        self._hilo = threading.Thread(target=self.loop.run_forever, name="devops-async-loop", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, coro: Awaitable) -> Future:
+        """Programa una corrutina en el loop y devuelve su Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def ejecutar(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Ejecuta una corrutina en el loop y espera su resultado"""
+        return self.enviar(coro).result(timeout=timeout)
+
+    def cliente(self, pat: str, scheduler: Optional[RateLimitScheduler] = None) -> AsyncAzureDevOpsClient:
+        """
+        Devuelve el cliente asíncrono de un PAT (se crea dentro del loop la primera vez)
+
+        Args:
+            scheduler: Planificador de rate limit a compartir (normalmente el del cliente síncrono)
+        """
+        async def _crear():
+            return AsyncAzureDevOpsClient(pat, max_concurrencia=self.max_concurrencia, scheduler=scheduler)
+
+        with self._lock:
+            if pat not in self._clientes:
+                self._clientes[pat] = self.ejecutar(_crear())
+            return self._clientes[pat]
+
+    def limitar(self, max_concurrencia: int) -> asyncio.Semaphore:
+        """Crea (en el loop) un semáforo para acotar la concurrencia de una operación concreta"""
+        async def _crear():
+            return asyncio.Semaphore(max(1, int(max_concurrencia)))
+        return self.ejecutar(_crear())
+
+
+async def con_limite(semaforo: asyncio.Semaphore, coro: Awaitable) -> Any:
+    """Ejecuta una corrutina ocupando un hueco del semáforo indicado"""
+    async with semaforo:
+        return await coro
@@ -0,0 +1,388 @@
+"""
+Cliente HTTP compartido para la API REST de Azure DevOps
+
+Este módulo proporciona:
+- Una sesión HTTP con pool de conexiones keep-alive (se reutilizan TCP/TLS entre llamadas)
+- Autenticación Basic con PAT configurada una sola vez
+- Reintentos con backoff exponencial ante errores 5xx, timeouts y errores de conexión
+- Respeto de la cabecera Retry-After en respuestas 429 (throttling)
+- Planificador global que adapta concurrencia y ritmo a las cabeceras de rate limit
+  (X-RateLimit-Remaining, X-RateLimit-Delay, Retry-After) y registra los eventos
+- Métricas de tiempo por llamada
+"""
+
+import base64
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Métodos que se pueden reintentar sin riesgo ante 5xx/timeouts
+METODOS_IDEMPOTENTES = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+class RateLimitScheduler:
+    """
+    Planificador global de las peticiones a Azure DevOps
+
+    Todas las llamadas del cliente pasan por turno(): se limita el número de peticiones
+    en vuelo (concurrencia adaptativa) y se respeta una pausa global cuando Azure DevOps
+    indica que hay que frenar. La concurrencia se reduce a la mitad ante cada señal de
+    throttling y se recupera de uno en uno tras una racha de respuestas sin señales.
+    """
+
+    def __init__(self, max_concurrencia: int = 16, min_concurrencia: int = 1, umbral_restante: float = 0.1, racha_recuperacion: int = 20):
+        """
+        Inicializa el planificador
+
+        Args:
+            max_concurrencia: Peticiones simultáneas máximas sin throttling
+            min_concurrencia: Peticiones simultáneas mínimas con throttling
+            umbral_restante: Fracción de X-RateLimit-Remaining/Limit bajo la que se frena
+            racha_recuperacion: Respuestas sin señales necesarias para subir la concurrencia
+        """
+        self.max_concurrencia = max_concurrencia
+        self.min_concurrencia = min_concurrencia
+        self.umbral_restante = umbral_restante
+        self.racha_recuperacion = racha_recuperacion
+
+        self.limite = max_concurrencia
+        self.en_vuelo = 0
+        self.pausa_hasta = 0.0
+        self._racha = 0
+        self._cond = threading.Condition()
+        self._eventos = deque(maxlen=500)
+
+    @contextmanager
+    def turno(self):
+        """Espera a que haya hueco y no haya pausa global, y ocupa un hueco mientras dura la petición"""
+        with self._cond:
+            while True:
+                espera = self.pausa_hasta - time.monotonic()
+                if espera > 0:
+                    self._cond.wait(timeout=espera)
+                elif self.en_vuelo >= self.limite:
+                    self._cond.wait()
+                else:
+                    break
+            self.en_vuelo += 1
+        try:
+            yield
+        finally:
+            self.liberar_turno()
+
+    def intentar_turno(self) -> Optional[float]:
+        """
+        Intenta ocupar un hueco sin bloquear (para clientes asíncronos)
+
+        Returns:
+            None si se ocupó el hueco (hay que llamar a liberar_turno al terminar),
+            o los segundos a esperar antes de volver a intentarlo
+        """
+        with self._cond:
+            espera = self.pausa_hasta - time.monotonic()
+            if espera > 0:
+                return espera
+            if self.en_vuelo >= self.limite:
+                return 0.05
+            self.en_vuelo += 1
+            return None
+
+    def liberar_turno(self) -> None:
+        """Libera el hueco ocupado por una petición"""
+        with self._cond:
+            self.en_vuelo -= 1
+            self._cond.notify_all()
+
+    def pausar(self, segundos: float, tipo: str, endpoint: str = "") -> None:
+        """Detiene todas las peticiones durante `segundos` y reduce la concurrencia"""
+        with self._cond:
+            self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + max(0.0, segundos))
+            self._frenar(tipo, endpoint, segundos)
+            self._cond.notify_all()
+
+    def observar(self, response: requests.Response, endpoint: str = "") -> None:
+        """Ajusta concurrencia y ritmo según las cabeceras de rate limit de una respuesta"""
+        headers = response.headers
+        retraso = _float_cabecera(headers.get("X-RateLimit-Delay"))
+        restante = _float_cabecera(headers.get("X-RateLimit-Remaining"))
+        limite = _float_cabecera(headers.get("X-RateLimit-Limit"))
+        retry_after = segundos_retry_after(headers.get("Retry-After"))
+
+        with self._cond:
+            if response.status_code == 429:
+                # La pausa la fija el cliente al reintentar (pausar)
+                return
+            if retry_after:
+                self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + retry_after)
+                self._frenar("retry-after", endpoint, retry_after)
+            elif retraso:
+                # Azure DevOps ya está retrasando nuestras peticiones: espaciar las siguientes
+                self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + min(retraso, 5.0))
+                self._frenar("delay", endpoint, retraso)
+            elif restante is not None and limite and restante / limite < self.umbral_restante:
+                self._frenar("remaining", endpoint, 0.0)
+            else:
+                self._racha += 1
+                if self._racha >= self.racha_recuperacion and self.limite < self.max_concurrencia:
+                    self.limite += 1
+                    self._racha = 0
+            self._cond.notify_all()
+
+    def _frenar(self, tipo: str, endpoint: str, espera: float) -> None:
+        """Reduce la concurrencia a la mitad y registra el evento (con el lock tomado)"""
+        self._racha = 0
+        self.limite = max(self.min_concurrencia, self.limite // 2)
+        self._eventos.append({
+            "momento": datetime.now().strftime("%H:%M:%S"),
+            "tipo": tipo,
+            "endpoint": endpoint,
+            "espera_s": round(espera, 2),
+            "concurrencia": self.limite,
+        })
+
+    def eventos(self) -> List[Dict[str, Any]]:
+        """Eventos de throttling registrados (más recientes al final)"""
+        with self._cond:
+            return list(self._eventos)
+
+    def estado(self) -> Dict[str, Any]:
+        """Concurrencia actual, peticiones en vuelo y segundos de pausa pendientes"""
+        with self._cond:
+            return {
+                "concurrencia": self.limite,
+                "en_vuelo": self.en_vuelo,
+                "pausa_s": round(max(0.0, self.pausa_hasta - time.monotonic()), 2),
+                "eventos": len(self._eventos),
+            }
+
+
+def _float_cabecera(valor: Optional[str]) -> Optional[float]:
+    """Convierte el valor numérico de una cabecera, o None si no existe o no es válido"""
+    if valor is None:
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        return None
+
+
+def segundos_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Segundos indicados por Retry-After (número o fecha HTTP), o None"""
+    if not valor:
+        return None
+    segundos = _float_cabecera(valor)
+    if segundos is not None:
+        return max(0.0, segundos)
+    try:
+        fecha = parsedate_to_datetime(valor)
+        return max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def formatear_comentarios(comments_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Convierte la respuesta de la API de comentarios de un work item al formato de la app
+
+    Returns:
+        Lista de comentarios ordenados de más reciente a más antiguo
+    """
+    comments_sorted = sorted(
+        comments_data.get("comments", []),
+        key=lambda x: x.get("createdDate", ""),
+        reverse=True
+    )
+    return [
+        {
+            "text": comment.get("text", ""),
+            "createdBy": comment.get("createdBy", {}).get("displayName", "Unknown"),
+            "createdDate": comment.get("createdDate", ""),
+            "modifiedDate": comment.get("modifiedDate", "")
+        }
+        for comment in comments_sorted
+    ]
+
+
+def endpoint_url(url: str) -> str:
+    """Endpoint de una URL sin organización/proyecto ni IDs, para poder agrupar métricas"""
+    segmentos = [s for s in urlsplit(url).path.split("/") if s]
+    if "_apis" in segmentos:
+        segmentos = segmentos[segmentos.index("_apis"):]
+    return "/".join(s if not s.isdigit() else "{id}" for s in segmentos[:4])
+
+
+class AzureDevOpsClient:
+    """Cliente HTTP con pool de conexiones, reintentos y métricas para Azure DevOps"""
+
+    def __init__(
+        self,
+        pat: str,
+        pool_size: int = 32,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_espera: float = 60.0,
+        timeout: float = 30,
+        scheduler: Optional[RateLimitScheduler] = None
+    ):
+        """
+        Inicializa el cliente
+
+        Args:
+            pat: Personal Access Token de Azure DevOps
+            pool_size: Conexiones keep-alive máximas por host
+            max_retries: Reintentos máximos por llamada
+            backoff: Espera base (segundos) del backoff exponencial
+            max_espera: Espera máxima (segundos) entre reintentos
+            timeout: Timeout por defecto de cada petición (segundos)
+            scheduler: Planificador de rate limit (por defecto uno propio con pool_size de concurrencia)
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_espera = max_espera
+        self.timeout = timeout
+        self.scheduler = scheduler or RateLimitScheduler(max_concurrencia=pool_size)
+
+        encoded_credentials = base64.b64encode(f":{pat}".encode()).decode()
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Basic {encoded_credentials}"})
+
+        # Los reintentos se gestionan en request() para poder respetar Retry-After y medir
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._metricas = deque(maxlen=1000)
+
+    def request(self, method: str, url: str, idempotente: Optional[bool] = None, **kwargs) -> requests.Response:
+        """
+        Ejecuta una petición con reintentos
+
+        Los 429 se reintentan siempre (la petición fue rechazada sin procesarse); los 5xx,
+        timeouts y errores de conexión solo en métodos idempotentes, o en POST de solo
+        lectura marcados con idempotente=True (ej: WIQL).
+
+        Args:
+            method: Método HTTP
+            url: URL completa
+            idempotente: Fuerza si la llamada se puede reintentar ante 5xx/timeouts
+            **kwargs: Argumentos de requests (headers, json, data, files, timeout...)
+
+        Returns:
+            La última respuesta recibida (el llamador decide según su status_code)
+
+        Raises:
+            requests.exceptions.RequestException: Si fallan todos los intentos por red
+        """
+        method = method.upper()
+        if idempotente is None:
+            idempotente = method in METODOS_IDEMPOTENTES
+        kwargs.setdefault("timeout", self.timeout)
+
+        endpoint = endpoint_url(url)
+        intento = 0
+        inicio = time.perf_counter()
+        while True:
+            try:
+                with self.scheduler.turno():
+                    response = self.session.request(method, url, **kwargs)
+                self.scheduler.observar(response, endpoint)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                if not idempotente or intento >= self.max_retries:
+                    self._registrar(method, endpoint, None, inicio, intento)
+                    raise
+                time.sleep(self._espera_backoff(intento))
+                intento += 1
+                continue
+
+            reintentable = response.status_code == 429 or (idempotente and response.status_code >= 500)
+            if not reintentable or intento >= self.max_retries:
+                self._registrar(method, endpoint, response.status_code, inicio, intento)
+                return response
+
+            espera = segundos_retry_after(response.headers.get("Retry-After"))
+            if espera is None:
+                espera = self._espera_backoff(intento)
+            espera = min(espera, self.max_espera)
+            response.close()
+            if response.status_code == 429:
+                # Throttling: la pausa es global para todas las peticiones en vuelo
+                self.scheduler.pausar(espera, "429", endpoint)
+            else:
+                time.sleep(espera)
+            intento += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def _espera_backoff(self, intento: int) -> float:
+        """Backoff exponencial con jitter"""
+        return min(self.max_espera, self.backoff * (2 ** intento)) * random.uniform(0.5, 1.0)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    def _registrar(self, method: str, endpoint: str, status: Optional[int], inicio: float, reintentos: int) -> None:
+        with self._lock:
+            self._metricas.append({
+                "momento": datetime.now().strftime("%H:%M:%S"),
+                "metodo": method,
+                "endpoint": endpoint,
+                "status": status,
+                "ms": (time.perf_counter() - inicio) * 1000,
+                "reintentos": reintentos,
+            })
+
+    def metricas(self) -> List[Dict[str, Any]]:
+        """Últimas llamadas registradas (más recientes al final)"""
+        with self._lock:
+            return list(self._metricas)
+
+    def resumen_metricas(self) -> List[Dict[str, Any]]:
+        """
+        Agrega las métricas por método y endpoint
+
+        Returns:
+            Lista de dicts con llamadas, errores, reintentos y tiempos medio/p95/máximo (ms)
+        """
+        grupos: Dict[tuple, List[Dict[str, Any]]] = {}
+        for m in self.metricas():
+            grupos.setdefault((m["metodo"], m["endpoint"]), []).append(m)
+
+        resumen = []
+        for (metodo, endpoint), llamadas in grupos.items():
+            tiempos = sorted(m["ms"] for m in llamadas)
+            resumen.append({
+                "metodo": metodo,
+                "endpoint": endpoint,
+                "llamadas": len(llamadas),
+                "errores": sum(1 for m in llamadas if m["status"] is None or m["status"] >= 400),
+                "reintentos": sum(m["reintentos"] for m in llamadas),
+                "media_ms": round(sum(tiempos) / len(tiempos), 1),
+                "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 1),
+                "max_ms": round(tiempos[-1], 1),
+            })
+        return sorted(resumen, key=lambda r: r["llamadas"], reverse=True)
+
+    def close(self) -> None:
+        """Cierra las conexiones del pool"""
+        self.session.close()
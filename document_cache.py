@@ -0,0 +1,201 @@
+"""
+Caché persistente de documentos procesados
+
+El mismo documento funcional se sube una y otra vez (análisis, creación de wiki, chat
+de documentos). Esta caché guarda, por SHA-256 de los bytes subidos y versión del
+parser, el Markdown y las imágenes extraídas y, por troceado y modelo, los chunks y sus
+embeddings. Está en SQLite, compartida por pestañas, sesiones y reinicios, con tamaño
+máximo y expulsión LRU de documentos completos.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class DocumentCache:
+    """Caché en SQLite de documentos procesados con expulsión LRU por tamaño"""
+
+    def __init__(self, ruta_db: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Inicializa la caché
+
+        Args:
+            ruta_db: Ruta del fichero SQLite (la carpeta se crea si no existe)
+            max_bytes: Tamaño máximo de los datos guardados; al superarlo se expulsan
+                los documentos usados hace más tiempo
+        """
+        self.ruta_db = Path(ruta_db)
+        self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.ruta_db), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documentos (
+                    clave TEXT PRIMARY KEY,
+                    markdown TEXT NOT NULL,
+                    tamano INTEGER NOT NULL,
+                    ultimo_uso REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS imagenes (
+                    clave TEXT NOT NULL REFERENCES documentos (clave) ON DELETE CASCADE,
+                    orden INTEGER NOT NULL,
+                    datos TEXT NOT NULL,
+                    contenido BLOB NOT NULL,
+                    PRIMARY KEY (clave, orden)
+                );
+                CREATE TABLE IF NOT EXISTS chunks (
+                    clave TEXT NOT NULL REFERENCES documentos (clave) ON DELETE CASCADE,
+                    troceado TEXT NOT NULL,
+                    modelo TEXT NOT NULL,
+                    chunks TEXT NOT NULL,
+                    dimension INTEGER NOT NULL,
+                    embeddings BLOB NOT NULL,
+                    PRIMARY KEY (clave, troceado, modelo)
+                );
+                CREATE INDEX IF NOT EXISTS idx_documentos_uso ON documentos (ultimo_uso);
+            """)
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def clave(file_bytes: bytes, version: str) -> str:
+        """sha256 de los bytes del documento junto con la versión del parser que lo procesa"""
+        return f"{hashlib.sha256(file_bytes).hexdigest()}:{version}"
+
+    def obtener_documento(self, clave: str) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Markdown e imágenes de un documento ya procesado
+
+        Returns:
+            tuple (markdown, imagenes) o None si no está en caché
+        """
+        with self._lock, self._conn:
+            fila = self._conn.execute("SELECT markdown FROM documentos WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                self.fallos += 1
+                return None
+            self._conn.execute("UPDATE documentos SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave))
+            imagenes = [
+                {**json.loads(datos), "data": contenido}
+                for datos, contenido in self._conn.execute(
+                    "SELECT datos, contenido FROM imagenes WHERE clave = ? ORDER BY orden", (clave,)
+                )
+            ]
+        self.aciertos += 1
+        return fila[0], imagenes
+
+    def guardar_documento(self, clave: str, markdown: str, imagenes: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Guarda el Markdown y las imágenes (dict con 'data' en bytes y el resto de campos
+        serializables en JSON) de un documento, sustituyendo lo anterior de esa clave
+        """
+        imagenes = imagenes or []
+        tamano = len(markdown.encode("utf-8")) + sum(len(imagen["data"]) for imagen in imagenes)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documentos WHERE clave = ?", (clave,))
+            self._conn.execute(
+                "INSERT INTO documentos (clave, markdown, tamano, ultimo_uso) VALUES (?, ?, ?, ?)",
+                (clave, markdown, tamano, time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO imagenes (clave, orden, datos, contenido) VALUES (?, ?, ?, ?)",
+                [
+                    (clave, orden, json.dumps({k: v for k, v in imagen.items() if k != "data"}), imagen["data"])
+                    for orden, imagen in enumerate(imagenes)
+                ]
+            )
+            self._recortar()
+
+    def obtener_chunks(self, clave: str, troceado: str, modelo: str) -> Optional[Tuple[List[Dict[str, Any]], np.ndarray]]:
+        """
+        Chunks y embeddings de un documento para un troceado y un modelo
+
+        Args:
+            clave: Clave del documento (debe estar guardado con guardar_documento)
+            troceado: Identificador del troceado (versión y parámetros del chunker)
+            modelo: Identificador del modelo de embeddings
+
+        Returns:
+            tuple (chunks, embeddings float32) o None si no están en caché; cada chunk es
+            un dict con su texto y su posición en el documento (inicio, fin), como se guardó
+        """
+        with self._lock, self._conn:
+            fila = self._conn.execute(
+                "SELECT chunks, dimension, embeddings FROM chunks WHERE clave = ? AND troceado = ? AND modelo = ?",
+                (clave, troceado, modelo)
+            ).fetchone()
+            if fila is None:
+                self.fallos += 1
+                return None
+            self._conn.execute("UPDATE documentos SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave))
+        self.aciertos += 1
+        chunks, dimension, embeddings = fila
+        return json.loads(chunks), np.frombuffer(embeddings, dtype=np.float32).reshape(-1, dimension)
+
+    def guardar_chunks(self, clave: str, troceado: str, modelo: str, chunks: List[Dict[str, Any]],
+                       embeddings: Any) -> None:
+        """
+        Guarda los chunks (dict serializables en JSON con el texto y la posición en el
+        documento, ver chunker) y embeddings de un documento ya guardado (si no está, no
+        hace nada)
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        datos_chunks = json.dumps(chunks, ensure_ascii=False)
+        tamano = len(datos_chunks.encode("utf-8")) + embeddings.nbytes
+        with self._lock, self._conn:
+            anterior = self._conn.execute(
+                "SELECT length(CAST(chunks AS BLOB)) + length(embeddings) FROM chunks "
+                "WHERE clave = ? AND troceado = ? AND modelo = ?",
+                (clave, troceado, modelo)
+            ).fetchone()
+            actualizado = self._conn.execute(
+                "UPDATE documentos SET tamano = tamano + ?, ultimo_uso = ? WHERE clave = ?",
+                (tamano - (anterior[0] if anterior else 0), time.time(), clave)
+            ).rowcount
+            if not actualizado:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunks (clave, troceado, modelo, chunks, dimension, embeddings) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (clave, troceado, modelo, datos_chunks, embeddings.shape[1] if embeddings.ndim == 2 else 0,
+                 embeddings.tobytes())
+            )
+            self._recortar()
+
+    def _recortar(self) -> None:
+        """Expulsa los documentos menos usados hasta caber en max_bytes (con el lock tomado)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(tamano), 0) FROM documentos").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for clave, tamano in self._conn.execute(
+            "SELECT clave, tamano FROM documentos ORDER BY ultimo_uso"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM documentos WHERE clave = ?", (clave,))
+            total -= tamano
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Documentos y bytes guardados, y aciertos/fallos desde que se creó la caché"""
+        with self._lock:
+            documentos, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM documentos"
+            ).fetchone()
+        return {
+            "documentos": documentos,
+            "mb": round(total / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
@@ -0,0 +1,376 @@
+"""
+Conversión de documentos Word (DOCX) a Markdown en streaming
+
+Recorre word/document.xml con un parser XML incremental (iterparse) y genera el
+Markdown bloque a bloque, liberando cada párrafo o tabla en cuanto se ha convertido:
+la memoria no crece con el tamaño del documento y no se crean objetos de python-docx
+por cada elemento. Conserva el resultado de la conversión anterior con python-docx:
+- Encabezados (Heading 1-4, Title, Subtitle) y listas (List Bullet, List Number)
+- Negrita y cursiva de cada run
+- Tablas (celdas combinadas repetidas como en python-docx)
+- Imágenes opcionales: se extraen y se sustituyen por {{IMAGE_PLACEHOLDER_n}}
+"""
+
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+CONTENT_TYPES = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+
+TIPO_DOCUMENTO = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+TIPO_ESTILOS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+
+VERSION = "1"  # cambiarla si cambia el Markdown generado (invalida la caché de documentos)
+
+HEADING_MAP = {
+    'Heading 1': '#', 'Heading 2': '##', 'Heading 3': '###',
+    'Heading 4': '####', 'Title': '#', 'Subtitle': '##',
+}
+
+# Nombres internos de estilos que Word muestra con otro nombre (como BabelFish de python-docx)
+NOMBRES_ESTILO_UI = {
+    "caption": "Caption", "footer": "Footer", "header": "Header",
+    **{f"heading {n}": f"Heading {n}" for n in range(1, 10)},
+}
+
+# Texto equivalente de los elementos de un run distintos de w:t y w:br
+TEXTO_ELEMENTOS_RUN = {W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+
+def _on_off(elemento: Optional[ET.Element]) -> Optional[bool]:
+    """Valor de una propiedad booleana (w:b, w:i...): None si no está, True sin w:val"""
+    if elemento is None:
+        return None
+    valor = elemento.get(W + "val")
+    return valor is None or valor in ("1", "true", "on")
+
+
+def _ruta_parte(base: str, destino: str) -> str:
+    """Nombre dentro del zip del destino de una relación, relativo a la carpeta base"""
+    if destino.startswith("/"):
+        return destino.lstrip("/")
+    return posixpath.normpath(posixpath.join(base, destino)).lstrip("/")
+
+
+class _PaqueteDocx:
+    """Relaciones, tipos de contenido y estilos del paquete (lo que no es el cuerpo)"""
+
+    def __init__(self, zip_docx: zipfile.ZipFile):
+        self.zip = zip_docx
+        self.parte_documento = next(
+            (_ruta_parte("", destino) for tipo, destino in self._relaciones("_rels/.rels").values() if tipo == TIPO_DOCUMENTO),
+            "word/document.xml"
+        )
+        base = posixpath.dirname(self.parte_documento)
+        rels = posixpath.join(base, "_rels", posixpath.basename(self.parte_documento) + ".rels")
+        # rId -> nombre de la parte en el zip (solo relaciones internas)
+        self.partes: Dict[str, str] = {}
+        parte_estilos = None
+        for rid, (tipo, destino) in self._relaciones(rels).items():
+            self.partes[rid] = _ruta_parte(base, destino)
+            if tipo == TIPO_ESTILOS:
+                parte_estilos = self.partes[rid]
+        self._tipos_por_parte, self._tipos_por_extension = self._tipos_contenido()
+        self.estilos, self.estilo_defecto = self._estilos(parte_estilos)
+
+    def _leer_xml(self, nombre: str) -> Optional[ET.Element]:
+        try:
+            return ET.fromstring(self.zip.read(nombre))
+        except KeyError:
+            return None
+
+    def _relaciones(self, nombre: str) -> Dict[str, Tuple[str, str]]:
+        """{rId: (tipo, destino)} de un fichero .rels, sin las relaciones externas"""
+        raiz = self._leer_xml(nombre)
+        if raiz is None:
+            return {}
+        return {
+            rel.get("Id"): (rel.get("Type"), rel.get("Target"))
+            for rel in raiz.findall(RELS + "Relationship")
+            if rel.get("TargetMode") != "External"
+        }
+
+    def _tipos_contenido(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        raiz = self._leer_xml("[Content_Types].xml")
+        if raiz is None:
+            return {}, {}
+        por_parte = {
+            e.get("PartName", "").lstrip("/").lower(): e.get("ContentType", "")
+            for e in raiz.findall(CONTENT_TYPES + "Override")
+        }
+        por_extension = {
+            e.get("Extension", "").lower(): e.get("ContentType", "")
+            for e in raiz.findall(CONTENT_TYPES + "Default")
+        }
+        return por_parte, por_extension
+
+    def tipo_contenido(self, parte: str) -> str:
+        """Content type de una parte del paquete"""
+        tipo = self._tipos_por_parte.get(parte.lower())
+        if tipo is None:
+            tipo = self._tipos_por_extension.get(posixpath.splitext(parte)[1].lstrip(".").lower(), "")
+        return tipo
+
+    def _estilos(self, parte: Optional[str]) -> Tuple[Dict[str, str], str]:
+        """
+        Nombres de los estilos de párrafo por id y nombre del estilo de párrafo por defecto
+        (los ids de estilos de otro tipo resuelven al de por defecto, como en python-docx)
+        """
+        raiz = self._leer_xml(parte) if parte else None
+        if raiz is None:
+            return {}, ""
+        nombres: Dict[str, Optional[str]] = {}
+        defecto = ""
+        for estilo in raiz.findall(W + "style"):
+            nombre = estilo.find(W + "name")
+            nombre = NOMBRES_ESTILO_UI.get(nombre.get(W + "val"), nombre.get(W + "val")) if nombre is not None else None
+            es_parrafo = estilo.get(W + "type") == "paragraph"
+            nombres.setdefault(estilo.get(W + "styleId"), nombre if es_parrafo else None)
+            if es_parrafo and estilo.get(W + "default") in ("1", "true", "on"):
+                defecto = nombre or ""
+        return {id_estilo: nombre for id_estilo, nombre in nombres.items() if nombre is not None}, defecto
+
+    def estilo_parrafo(self, p: ET.Element) -> str:
+        """Nombre del estilo de un párrafo (el de por defecto si no tiene o no existe)"""
+        ppr = p.find(W + "pPr")
+        pstyle = ppr.find(W + "pStyle") if ppr is not None else None
+        id_estilo = pstyle.get(W + "val") if pstyle is not None else None
+        if id_estilo and id_estilo in self.estilos:
+            return self.estilos[id_estilo]
+        return self.estilo_defecto
+
+
+def _texto_run(r: ET.Element) -> str:
+    """Texto de un run (tabuladores y saltos de línea incluidos)"""
+    partes = []
+    for hijo in r:
+        if hijo.tag == W + "t":
+            partes.append(hijo.text or "")
+        elif hijo.tag == W + "br":
+            # Los saltos de página o columna no aportan texto
+            if hijo.get(W + "type", "textWrapping") == "textWrapping":
+                partes.append("\n")
+        elif hijo.tag in TEXTO_ELEMENTOS_RUN:
+            partes.append(TEXTO_ELEMENTOS_RUN[hijo.tag])
+    return "".join(partes)
+
+
+def _texto_parrafo(p: ET.Element) -> str:
+    """Texto completo de un párrafo, incluido el de sus hipervínculos"""
+    partes = []
+    for hijo in p:
+        if hijo.tag == W + "r":
+            partes.append(_texto_run(hijo))
+        elif hijo.tag == W + "hyperlink":
+            partes.extend(_texto_run(r) for r in hijo.findall(W + "r"))
+    return "".join(partes)
+
+
+def _runs_a_md(p: ET.Element) -> str:
+    """Runs de un párrafo con su negrita/cursiva en Markdown (los de hipervínculos no)"""
+    partes = []
+    for r in p.findall(W + "r"):
+        t = _texto_run(r)
+        if not t:
+            continue
+        rpr = r.find(W + "rPr")
+        negrita = _on_off(rpr.find(W + "b")) if rpr is not None else None
+        cursiva = _on_off(rpr.find(W + "i")) if rpr is not None else None
+        if negrita and cursiva:
+            t = f'***{t}***'
+        elif negrita:
+            t = f'**{t}**'
+        elif cursiva:
+            t = f'*{t}*'
+        partes.append(t)
+    return ''.join(partes)
+
+
+def _parrafo_a_md(p: ET.Element, paquete: _PaqueteDocx) -> Optional[str]:
+    text = _runs_a_md(p)
+    if not text.strip():
+        return None
+    style = paquete.estilo_parrafo(p)
+    for key, prefix in HEADING_MAP.items():
+        if style.startswith(key):
+            return f'{prefix} {text.strip()}'
+    if 'List Bullet' in style:
+        return f'- {text.strip()}'
+    if 'List Number' in style:
+        return f'1. {text.strip()}'
+    return text.strip()
+
+
+def _span(tc: ET.Element) -> int:
+    """Columnas de la rejilla que ocupa una celda (w:gridSpan)"""
+    tcpr = tc.find(W + "tcPr")
+    grid_span = tcpr.find(W + "gridSpan") if tcpr is not None else None
+    return int(grid_span.get(W + "val")) if grid_span is not None else 1
+
+
+def _continua_vertical(tc: ET.Element) -> bool:
+    """True si la celda continúa una combinación vertical (w:vMerge sin restart)"""
+    tcpr = tc.find(W + "tcPr")
+    v_merge = tcpr.find(W + "vMerge") if tcpr is not None else None
+    return v_merge is not None and v_merge.get(W + "val", "continue") == "continue"
+
+
+def _celdas_con_posicion(tr: ET.Element) -> Iterator[Tuple[int, ET.Element]]:
+    """(columna de inicio en la rejilla, celda) de cada w:tc de una fila"""
+    trpr = tr.find(W + "trPr")
+    grid_before = trpr.find(W + "gridBefore") if trpr is not None else None
+    columna = int(grid_before.get(W + "val")) if grid_before is not None else 0
+    for tc in tr.findall(W + "tc"):
+        yield columna, tc
+        columna += _span(tc)
+
+
+def _celda_en_columna(tr: ET.Element, columna: int) -> ET.Element:
+    """Celda de una fila que empieza exactamente en esa columna de la rejilla"""
+    for inicio, tc in _celdas_con_posicion(tr):
+        if inicio > columna:
+            break
+        if inicio == columna:
+            return tc
+    raise ValueError(f"no `tc` element at grid_offset={columna}")
+
+
+def _celdas_fila(filas: List[ET.Element], i: int) -> Iterator[ET.Element]:
+    """
+    Celdas de la fila i como las devuelve python-docx: una por columna de la rejilla
+    (las combinadas en horizontal se repiten y las que continúan una combinación
+    vertical son la celda de arriba que la inicia)
+    """
+    for columna, tc in _celdas_con_posicion(filas[i]):
+        fila = i
+        while _continua_vertical(tc):
+            if fila == 0:
+                raise ValueError("no tr above topmost tr in w:tbl")
+            fila -= 1
+            tc = _celda_en_columna(filas[fila], columna)
+        for _ in range(_span(tc)):
+            yield tc
+
+
+def _tabla_a_md(tbl: ET.Element) -> str:
+    filas = tbl.findall(W + "tr")
+    textos: Dict[int, str] = {}
+    rows_md = []
+    for i in range(len(filas)):
+        cells = []
+        for tc in _celdas_fila(filas, i):
+            if id(tc) not in textos:
+                textos[id(tc)] = "\n".join(_texto_parrafo(p) for p in tc.findall(W + "p"))
+            cells.append(textos[id(tc)].strip().replace('\n', ' '))
+        rows_md.append('| ' + ' | '.join(cells) + ' |')
+        if i == 0:
+            rows_md.append('| ' + ' | '.join(['---'] * len(cells)) + ' |')
+    return '\n'.join(rows_md)
+
+
+def _extension_imagen(content_type: str) -> str:
+    if 'png' in content_type:
+        return 'png'
+    if 'jpeg' in content_type or 'jpg' in content_type:
+        return 'jpg'
+    if 'gif' in content_type:
+        return 'gif'
+    return 'png'  # default
+
+
+def iterar_markdown_docx(file_bytes: bytes, imagenes: Optional[List[Dict[str, Any]]] = None,
+                         avisar: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+    """
+    Genera el Markdown de un DOCX bloque a bloque, en el orden del documento
+
+    Args:
+        file_bytes: Bytes del documento DOCX
+        imagenes: Si se indica, lista en la que se añaden las imágenes extraídas (dict con
+            'data', 'name', 'position' y 'ext') y se emiten sus placeholders
+        avisar: Función a la que se pasan los avisos (imágenes que no se pudieron extraer)
+
+    Yields:
+        Bloques de Markdown (párrafos, tablas y placeholders); las tablas van rodeadas de
+        bloques vacíos. Unidos con "\\n\\n" dan el documento completo.
+
+    Raises:
+        zipfile.BadZipFile / ET.ParseError: Si los bytes no son un DOCX válido
+    """
+    with zipfile.ZipFile(BytesIO(file_bytes)) as zip_docx:
+        paquete = _PaqueteDocx(zip_docx)
+        emitidos = 0
+        imagen_counter = 0
+
+        with zip_docx.open(paquete.parte_documento) as xml:
+            profundidad = 0
+            body = None
+            for evento, elem in ET.iterparse(xml, events=("start", "end")):
+                if evento == "start":
+                    profundidad += 1
+                    if profundidad == 2 and elem.tag == W + "body":
+                        body = elem
+                    continue
+                profundidad -= 1
+                if elem is body:
+                    body = None
+                if profundidad != 2 or body is None:
+                    continue
+
+                # Elemento hijo directo del body completo: se convierte y se libera
+                tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
+                if tag == 'p':
+                    if imagenes is not None:
+                        for run in elem.findall(W + "r"):
+                            for drawing in run.findall('.//' + W + 'drawing'):
+                                for blip in drawing.findall('.//' + A + 'blip'):
+                                    embed_id = blip.get(R + 'embed')
+                                    if not embed_id:
+                                        continue
+                                    try:
+                                        parte = paquete.partes[embed_id]
+                                        image_bytes = zip_docx.read(parte)
+                                        ext = _extension_imagen(paquete.tipo_contenido(parte))
+                                        imagen_counter += 1
+                                        imagenes.append({
+                                            'data': image_bytes,
+                                            'name': f"imagen_{imagen_counter}.{ext}",
+                                            'position': emitidos,
+                                            'ext': ext
+                                        })
+                                        emitidos += 1
+                                        yield f"{{{{IMAGE_PLACEHOLDER_{imagen_counter}}}}}"
+                                    except Exception as e:
+                                        if avisar:
+                                            avisar(f"No se pudo extraer una imagen: {str(e)}")
+
+                    md = _parrafo_a_md(elem, paquete)
+                    if md:
+                        emitidos += 1
+                        yield md
+                elif tag == 'tbl':
+                    emitidos += 3
+                    yield ''
+                    yield _tabla_a_md(elem)
+                    yield ''
+                body.remove(elem)
+
+
+def docx_a_markdown(file_bytes: bytes, extraer_imagenes: bool = False,
+                    avisar: Optional[Callable[[str], None]] = None):
+    """
+    Convierte un DOCX completo a Markdown (ver iterar_markdown_docx)
+
+    Returns:
+        Si extraer_imagenes=False: str con markdown
+        Si extraer_imagenes=True: tuple (markdown: str, imagenes: list)
+    """
+    imagenes: Optional[List[Dict[str, Any]]] = [] if extraer_imagenes else None
+    markdown = '\n\n'.join(iterar_markdown_docx(file_bytes, imagenes, avisar))
+    return (markdown, imagenes) if extraer_imagenes else markdown
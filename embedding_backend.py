@@ -0,0 +1,238 @@
+"""
+Backends de inferencia del modelo de embeddings en CPU
+
+- "torch": SentenceTransformer con PyTorch (referencia)
+- "onnx": ONNX Runtime (sentence-transformers>=3.2 con optimum[onnxruntime])
+- "int8": PyTorch con las capas Linear cuantizadas dinámicamente a int8
+
+Incluye una comprobación de paridad frente a los embeddings de PyTorch y una medida
+de rendimiento (textos/segundo) para elegir backend, y el registro de modelos del
+proceso (ModelRegistry) por el que pasan todas las cargas.
+"""
+
+import gc
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+BACKENDS = ("torch", "onnx", "int8")
+
+TEXTOS_PRUEBA = [
+    "Error al guardar el formulario de alta de cliente",
+    "Como usuario quiero exportar el informe mensual a Excel",
+    "La aplicación tarda más de 30 segundos en cargar el listado de pedidos",
+    "Actualizar la librería de autenticación a la última versión",
+    "Timeout en la llamada al servicio de facturación desde el backend",
+    "Añadir validación del NIF en el registro de proveedores",
+    "El botón de enviar no responde en Safari",
+    "Migrar la base de datos de pruebas al nuevo servidor",
+]
+
+
+def cargar_modelo(nombre: str, backend: str = "torch") -> Any:
+    """
+    Carga el modelo de embeddings con el backend indicado
+
+    Args:
+        nombre: Nombre del modelo de sentence-transformers
+        backend: "torch", "onnx" o "int8"
+
+    Returns:
+        SentenceTransformer listo para encode
+
+    Raises:
+        ValueError: Si el backend no existe
+        ImportError / TypeError: Si el backend no está disponible en esta instalación
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend no soportado: {backend} (usar uno de {', '.join(BACKENDS)})")
+
+    if backend == "onnx":
+        # Exporta el modelo a ONNX la primera vez (requiere sentence-transformers>=3.2)
+        return SentenceTransformer(nombre, device="cpu", backend="onnx")
+
+    modelo = SentenceTransformer(nombre, device="cpu")
+    if backend == "int8":
+        import torch
+        modelo = torch.quantization.quantize_dynamic(modelo, {torch.nn.Linear}, dtype=torch.qint8)
+    return modelo
+
+
+def comprobar_paridad(referencia: Any, modelo: Any, textos: Optional[List[str]] = None) -> Dict[str, float]:
+    """
+    Compara los embeddings de un backend con los de referencia (PyTorch)
+
+    Returns:
+        dict con la similitud coseno mínima y media entre ambos embeddings de cada texto
+    """
+    textos = textos or TEXTOS_PRUEBA
+    a = np.asarray(referencia.encode(textos, show_progress_bar=False), dtype=np.float32)
+    b = np.asarray(modelo.encode(textos, show_progress_bar=False), dtype=np.float32)
+    cosenos = np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {"coseno_min": round(float(cosenos.min()), 5), "coseno_medio": round(float(cosenos.mean()), 5)}
+
+
+def medir_rendimiento(modelo: Any, textos: Optional[List[str]] = None, repeticiones: int = 16) -> float:
+    """
+    Textos por segundo que codifica el modelo (tras una pasada de calentamiento)
+    """
+    textos = (textos or TEXTOS_PRUEBA) * repeticiones
+    modelo.encode(textos[:8], show_progress_bar=False)
+    inicio = time.perf_counter()
+    modelo.encode(textos, show_progress_bar=False)
+    return round(len(textos) / (time.perf_counter() - inicio), 1)
+
+
+def comparar_backends(nombre: str, backends: Optional[List[str]] = None,
+                      textos: Optional[List[str]] = None,
+                      registro: Optional["ModelRegistry"] = None) -> List[Dict[str, Any]]:
+    """
+    Carga el modelo con cada backend y mide carga, paridad y rendimiento
+
+    Los backends que ya están en el registro se miden con ese mismo modelo, sin cargar
+    una segunda copia (carga_s es la de su carga en el registro). Los demás se cargan
+    solo para la comparación y se liberan al terminar de medir cada uno: como mucho hay
+    en memoria un modelo de más, aparte de la referencia PyTorch.
+
+    Args:
+        registro: Registro de modelos del proceso (ver ModelRegistry)
+
+    Returns:
+        Lista de dict por backend (los no disponibles incluyen el error)
+    """
+    def obtener(backend: str) -> Tuple[Any, float, bool]:
+        """(modelo, segundos de carga, si es una copia temporal que hay que liberar)"""
+        modelo = registro.cargado(nombre, backend) if registro is not None else None
+        if modelo is not None:
+            return modelo, registro.info(nombre, backend)["carga_s"], False
+        inicio = time.perf_counter()
+        modelo = cargar_modelo(nombre, backend)
+        return modelo, round(time.perf_counter() - inicio, 2), True
+
+    referencia = None
+    filas = []
+    for backend in backends or list(BACKENDS):
+        fila: Dict[str, Any] = {"backend": backend}
+        modelo = None
+        try:
+            modelo, fila["carga_s"], temporal = obtener(backend)
+            fila["en_registro"] = not temporal
+            if referencia is None:
+                referencia = modelo if backend == "torch" else obtener("torch")[0]
+            fila.update(comprobar_paridad(referencia, modelo, textos))
+            fila["textos_por_s"] = medir_rendimiento(modelo, textos)
+        except Exception as e:
+            fila["error"] = str(e)
+        finally:
+            # Las copias temporales se liberan antes de cargar el siguiente backend
+            modelo = None
+            gc.collect()
+        filas.append(fila)
+
+    referencia = None
+    gc.collect()
+    return filas
+
+
+def memoria_proceso() -> Optional[int]:
+    """Memoria residente (RSS) del proceso en bytes, o None si no se puede leer"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return None
+
+
+def memoria_parametros(modelo: Any) -> Optional[int]:
+    """Bytes que ocupan los parámetros de un modelo PyTorch (None si no expone parameters)"""
+    try:
+        return sum(p.numel() * p.element_size() for p in modelo.parameters())
+    except (AttributeError, TypeError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Registro de modelos de embeddings del proceso
+
+    Cada (nombre, backend) se carga una sola vez aunque lo pidan varias pestañas,
+    sesiones o hilos a la vez, y se guarda cuánto tardó y cuánta memoria ocupa.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._modelos: Dict[Tuple[str, str], Any] = {}
+        self._cargas: Dict[Tuple[str, str], threading.Lock] = {}
+        self._info: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def obtener(self, nombre: str, backend: str = "torch") -> Any:
+        """
+        Devuelve el modelo, cargándolo la primera vez
+
+        Raises:
+            Las mismas excepciones que cargar_modelo
+        """
+        clave = (nombre, backend)
+        with self._lock:
+            if clave in self._modelos:
+                self._info[clave]["usos"] += 1
+                return self._modelos[clave]
+            carga = self._cargas.setdefault(clave, threading.Lock())
+
+        # Un lock por modelo: cargar uno no bloquea el acceso a los demás
+        with carga:
+            with self._lock:
+                if clave in self._modelos:
+                    self._info[clave]["usos"] += 1
+                    return self._modelos[clave]
+
+            memoria_antes = memoria_proceso()
+            inicio = time.perf_counter()
+            modelo = cargar_modelo(nombre, backend)
+            segundos = time.perf_counter() - inicio
+            memoria_despues = memoria_proceso()
+
+            with self._lock:
+                self._modelos[clave] = modelo
+                self._info[clave] = {
+                    "modelo": nombre,
+                    "backend": backend,
+                    "carga_s": round(segundos, 2),
+                    "parametros_mb": _megas(memoria_parametros(modelo)),
+                    "rss_delta_mb": _megas(memoria_despues - memoria_antes)
+                    if memoria_antes is not None and memoria_despues is not None else None,
+                    "cargado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "usos": 1,
+                }
+            return modelo
+
+    def cargado(self, nombre: str, backend: str = "torch") -> Optional[Any]:
+        """El modelo si ya está cargado (sin cargarlo ni contarlo como uso), o None"""
+        with self._lock:
+            return self._modelos.get((nombre, backend))
+
+    def info(self, nombre: str, backend: str = "torch") -> Optional[Dict[str, Any]]:
+        """Datos de carga de un modelo, o None si aún no se ha cargado"""
+        with self._lock:
+            info = self._info.get((nombre, backend))
+            return dict(info) if info else None
+
+    def estadisticas(self) -> List[Dict[str, Any]]:
+        """Tiempo de carga, memoria y usos de cada modelo cargado"""
+        with self._lock:
+            return [dict(info) for info in self._info.values()]
+
+
+def _megas(valor: Optional[int]) -> Optional[float]:
+    return round(valor / (1024 * 1024), 1) if valor is not None else None
@@ -0,0 +1,210 @@
+"""
+Caché persistente (SQLite) de embeddings por contenido
+
+Cada embedding se guarda con la clave (modelo, sha256 del texto normalizado), de modo
+que un texto ya codificado no vuelve a pasar por SentenceTransformer.encode aunque
+cambie el work item, la página o el documento que lo contiene. La comparten todas las
+rutas de indexación (work items, documentos, wiki y Tilena).
+
+Los textos que faltan se codifican con codificar_por_longitud: sin duplicados,
+recortados a la longitud máxima del modelo y agrupados por longitud en tokens para
+que cada lote tenga el mínimo relleno (padding).
+"""
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+
+CARACTERES_POR_TOKEN = 8  # cota holgada: nunca se recorta texto que el modelo llegaría a ver
+PRESUPUESTO_TOKENS_LOTE = 16384  # tokens (con padding) por lote de encode
+MAX_TEXTOS_LOTE = 256
+
+
+def longitudes_tokens(modelo: Any, textos: List[str], max_tokens: int) -> List[int]:
+    """
+    Longitud en tokens de cada texto (recortada a max_tokens)
+
+    Usa el tokenizer del modelo si lo expone (SentenceTransformer.tokenizer); si no,
+    estima ~4 caracteres por token.
+    """
+    tokenizer = getattr(modelo, "tokenizer", None)
+    if tokenizer is not None:
+        try:
+            ids = tokenizer(textos, add_special_tokens=True, truncation=True, max_length=max_tokens)["input_ids"]
+            return [len(i) for i in ids]
+        except Exception:
+            pass
+    return [min(max_tokens, len(texto) // 4 + 2) for texto in textos]
+
+
+def codificar_por_longitud(modelo: Any, textos: List[str], presupuesto_tokens: int = PRESUPUESTO_TOKENS_LOTE,
+                           **encode_kwargs) -> np.ndarray:
+    """
+    Codifica textos agrupándolos por longitud para minimizar el padding
+
+    1. Elimina duplicados exactos (se codifican una vez)
+    2. Recorta cada texto a max_seq_length * CARACTERES_POR_TOKEN antes de tokenizar
+    3. Ordena por longitud en tokens y forma lotes de tamaño adaptativo: cuantos más
+       cortos los textos, más textos por lote (máximo presupuesto_tokens con padding)
+    4. Devuelve los embeddings en el orden original
+
+    Args:
+        modelo: Objeto con método encode (SentenceTransformer)
+        textos: Textos a codificar
+        presupuesto_tokens: Tokens por lote (textos del lote * longitud del más largo)
+        **encode_kwargs: Argumentos adicionales para modelo.encode
+
+    Returns:
+        np.ndarray float32 de forma (len(textos), dimensión)
+    """
+    if not textos:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    unicos = list(dict.fromkeys(textos))
+    max_tokens = getattr(modelo, "max_seq_length", None) or 512
+    recortados = [texto[:max_tokens * CARACTERES_POR_TOKEN] for texto in unicos]
+
+    longitudes = longitudes_tokens(modelo, recortados, max_tokens)
+    orden = sorted(range(len(recortados)), key=lambda i: longitudes[i])
+
+    lotes: List[List[int]] = []
+    for i in orden:
+        # Al estar ordenados, el último añadido es el más largo del lote
+        if lotes and len(lotes[-1]) < MAX_TEXTOS_LOTE and (len(lotes[-1]) + 1) * longitudes[i] <= presupuesto_tokens:
+            lotes[-1].append(i)
+        else:
+            lotes.append([i])
+
+    # El tamaño de lote lo decide el presupuesto y una barra de progreso por lote no aporta
+    encode_kwargs.pop("batch_size", None)
+    encode_kwargs.pop("show_progress_bar", None)
+    vectores: List[np.ndarray] = [None] * len(unicos)
+    for lote in lotes:
+        embeddings = np.asarray(
+            modelo.encode([recortados[i] for i in lote], batch_size=len(lote), show_progress_bar=False, **encode_kwargs),
+            dtype=np.float32
+        )
+        for i, vector in zip(lote, embeddings):
+            vectores[i] = vector
+
+    posicion = {texto: i for i, texto in enumerate(unicos)}
+    return np.vstack([vectores[posicion[texto]] for texto in textos])
+
+
+class EmbeddingCache:
+    """Caché de embeddings en SQLite indexada por modelo y hash del texto"""
+
+    def __init__(self, ruta_db: str):
+        """
+        Inicializa la caché
+
+        Args:
+            ruta_db: Ruta del fichero SQLite (la carpeta se crea si no existe)
+        """
+        self.ruta_db = Path(ruta_db)
+        self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.ruta_db), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    modelo TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (modelo, hash)
+                )
+            """)
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def normalizar_texto(texto: str) -> str:
+        """Normaliza espacios para que cambios solo de formato no invaliden la caché"""
+        return " ".join((texto or "").split())
+
+    @classmethod
+    def clave(cls, texto: str) -> str:
+        """sha256 del texto normalizado"""
+        return hashlib.sha256(cls.normalizar_texto(texto).encode("utf-8")).hexdigest()
+
+    def obtener(self, modelo: str, claves: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Busca embeddings en la caché
+
+        Returns:
+            {clave: vector float32} solo para las claves encontradas
+        """
+        encontrados = {}
+        unicas = list(dict.fromkeys(claves))
+        with self._lock:
+            for i in range(0, len(unicas), 500):
+                lote = unicas[i:i + 500]
+                filas = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE modelo = ? AND hash IN ({', '.join('?' for _ in lote)})",
+                    [modelo, *lote]
+                ).fetchall()
+                for clave, vector in filas:
+                    encontrados[clave] = np.frombuffer(vector, dtype=np.float32)
+        return encontrados
+
+    def guardar(self, modelo: str, claves: List[str], vectores: np.ndarray) -> None:
+        """Guarda embeddings (alineados con claves) en la caché"""
+        vectores = np.asarray(vectores, dtype=np.float32)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (modelo, hash, vector) VALUES (?, ?, ?)",
+                [(modelo, clave, vectores[i].tobytes()) for i, clave in enumerate(claves)]
+            )
+
+    def codificar(self, modelo_nombre: str, modelo: Any, textos: List[str],
+                  codificador: Optional[Callable[[List[str]], np.ndarray]] = None,
+                  **encode_kwargs) -> Tuple[np.ndarray, int]:
+        """
+        Devuelve los embeddings de una lista de textos, codificando solo los que no están en caché
+
+        Args:
+            modelo_nombre: Nombre del modelo (forma parte de la clave)
+            modelo: Objeto con método encode (SentenceTransformer)
+            textos: Textos a codificar
+            codificador: Función alternativa para codificar los textos que faltan (ej: pool
+                multiproceso); por defecto codificar_por_longitud con el modelo
+            **encode_kwargs: Argumentos adicionales para modelo.encode
+
+        Returns:
+            tuple (embeddings, codificados): np.ndarray float32 de forma (len(textos), dimensión)
+            y número de textos distintos que se han tenido que codificar
+        """
+        if not textos:
+            return np.zeros((0, 0), dtype=np.float32), 0
+
+        claves = [self.clave(texto) for texto in textos]
+        encontrados = self.obtener(modelo_nombre, claves)
+
+        # Textos distintos que faltan (los repetidos se codifican una sola vez)
+        pendientes: Dict[str, str] = {}
+        for clave, texto in zip(claves, textos):
+            if clave not in encontrados and clave not in pendientes:
+                pendientes[clave] = texto
+
+        if pendientes:
+            if codificador is not None:
+                nuevos = np.asarray(codificador(list(pendientes.values())), dtype=np.float32)
+            else:
+                nuevos = codificar_por_longitud(modelo, list(pendientes.values()), **encode_kwargs)
+            self.guardar(modelo_nombre, list(pendientes), nuevos)
+            encontrados.update(zip(pendientes, nuevos))
+
+        self.aciertos += len(textos) - len(pendientes)
+        self.fallos += len(pendientes)
+        return np.vstack([encontrados[clave] for clave in claves]), len(pendientes)
+
+    def estadisticas(self) -> Tuple[int, int]:
+        """(aciertos, fallos) acumulados desde que se creó la caché"""
+        return self.aciertos, self.fallos
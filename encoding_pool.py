@@ -0,0 +1,163 @@
+"""
+Pool multiproceso para codificar embeddings
+
+Para indexaciones grandes (decenas de miles de chunks) un solo proceso con los hilos
+intra-op de PyTorch escala mal con muchos núcleos. El pool reparte los textos entre
+procesos trabajadores, cada uno con su propia copia del modelo y un número fijo de
+hilos, y devuelve los embeddings en el orden original.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+SHARDS_POR_PROCESO = 4  # trozos por proceso para repartir la carga aunque varíe la longitud
+
+_modelo_proceso: Any = None
+
+
+def _iniciar_proceso(nombre: str, backend: str, hilos: int) -> None:
+    """Inicializador de cada proceso trabajador: fija los hilos y carga el modelo"""
+    global _modelo_proceso
+    try:
+        import torch
+        torch.set_num_threads(hilos)
+    except ImportError:
+        pass
+    from embedding_backend import cargar_modelo
+    _modelo_proceso = cargar_modelo(nombre, backend)
+
+
+def _codificar_shard(textos: List[str]) -> np.ndarray:
+    """Codifica un trozo de textos en el proceso trabajador"""
+    from embedding_cache import codificar_por_longitud
+    return codificar_por_longitud(_modelo_proceso, textos)
+
+
+class EncodingPool:
+    """Pool de procesos con una copia del modelo de embeddings en cada uno"""
+
+    def __init__(self, nombre: str, backend: str = "torch", procesos: Optional[int] = None,
+                 hilos_por_proceso: Optional[int] = None):
+        """
+        Crea el pool (los procesos arrancan y cargan el modelo en el primer uso)
+
+        Args:
+            nombre: Modelo de sentence-transformers
+            backend: Backend de inferencia (ver embedding_backend)
+            procesos: Número de procesos (por defecto, la mitad de los núcleos)
+            hilos_por_proceso: Hilos de PyTorch por proceso (por defecto núcleos / procesos)
+        """
+        nucleos = os.cpu_count() or 1
+        self.nombre = nombre
+        self.backend = backend
+        self.procesos = max(1, procesos or nucleos // 2)
+        self.hilos_por_proceso = max(1, hilos_por_proceso or nucleos // self.procesos)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: los procesos no heredan el estado de torch/Streamlit del proceso principal
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.procesos,
+                mp_context=get_context("spawn"),
+                initializer=_iniciar_proceso,
+                initargs=(self.nombre, self.backend, self.hilos_por_proceso),
+            )
+        return self._executor
+
+    def codificar(self, textos: List[str]) -> np.ndarray:
+        """
+        Codifica los textos repartidos entre los procesos
+
+        Los textos se ordenan por longitud y se reparten intercalados, de modo que cada
+        trozo tiene una mezcla parecida de textos cortos y largos.
+
+        Returns:
+            np.ndarray float32 de forma (len(textos), dimensión)
+        """
+        if not textos:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        orden = sorted(range(len(textos)), key=lambda i: len(textos[i]))
+        n_shards = min(len(textos), self.procesos * SHARDS_POR_PROCESO)
+        shards = [orden[i::n_shards] for i in range(n_shards)]
+
+        futuros = [self._pool().submit(_codificar_shard, [textos[i] for i in shard]) for shard in shards]
+        resultado: Optional[np.ndarray] = None
+        for shard, futuro in zip(shards, futuros):
+            vectores = futuro.result()
+            if resultado is None:
+                resultado = np.empty((len(textos), vectores.shape[1]), dtype=np.float32)
+            resultado[shard] = vectores
+        return resultado
+
+    def calentar(self) -> None:
+        """Arranca todos los procesos y carga el modelo en cada uno"""
+        list(self._pool().map(_codificar_shard, [["calentamiento"]] * self.procesos))
+
+    def cerrar(self) -> None:
+        """Detiene los procesos trabajadores"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def textos_distintos(muestra: List[str], n: int) -> List[str]:
+    """
+    n textos distintos generados a partir de los de muestra, para medir rendimiento: la
+    codificación descarta duplicados, así que repetir la muestra mediría la deduplicación
+    """
+    return [f"{muestra[i % len(muestra)]} (caso {i // len(muestra) + 1})" for i in range(n)]
+
+
+def medir_escalado(nombre: str, textos: List[str], procesos: Optional[List[int]] = None,
+                   backend: str = "torch") -> List[Dict[str, Any]]:
+    """
+    Rendimiento (textos/s) codificando los mismos textos con distinto número de procesos
+
+    Args:
+        nombre: Modelo de sentence-transformers
+        textos: Textos de prueba (cuantos más, más fiable la medida); si hay repetidos se
+            sustituyen por textos_distintos, para que se codifiquen todos
+        procesos: Números de procesos a probar (por defecto 1, 2, 4... hasta los núcleos)
+        backend: Backend de inferencia
+
+    Returns:
+        Lista de dict por configuración con textos_por_s y aceleración frente a 1 proceso
+    """
+    if len(set(textos)) < len(textos):
+        textos = textos_distintos(list(dict.fromkeys(textos)), len(textos))
+
+    nucleos = os.cpu_count() or 1
+    if procesos is None:
+        procesos = []
+        n = 1
+        while n <= nucleos:
+            procesos.append(n)
+            n *= 2
+
+    filas = []
+    base = None
+    for n in procesos:
+        pool = EncodingPool(nombre, backend, procesos=n)
+        try:
+            pool.calentar()
+            inicio = time.perf_counter()
+            pool.codificar(textos)
+            velocidad = len(textos) / (time.perf_counter() - inicio)
+        finally:
+            pool.cerrar()
+        base = base or velocidad
+        filas.append({
+            "procesos": n,
+            "hilos_por_proceso": pool.hilos_por_proceso,
+            "textos_por_s": round(velocidad, 1),
+            "aceleracion": round(velocidad / base, 2),
+        })
+    return filas
@@ -0,0 +1,208 @@
+"""
+Indexación de embeddings en segundo plano
+
+Los trabajos de indexación se ejecutan en hilos del proceso (no de la sesión), de modo
+que siguen avanzando entre reruns de Streamlit y aunque se recargue el navegador:
+- Los textos pendientes se codifican por lotes y cada lote se escribe en la matriz del
+  índice (y opcionalmente en un almacén persistente) en cuanto termina
+- instantanea() devuelve en cualquier momento la matriz con las filas ya listas, para
+  consultar el índice parcial mientras se completa
+- progreso() da el avance, la velocidad y el tiempo estimado restante
+- Opcionalmente alimenta a la vez el índice léxico (BM25) del corpus
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class IndexingJob:
+    """Trabajo de indexación de un corpus en un hilo en segundo plano"""
+
+    def __init__(self, clave: str, textos: List[str], codificar: Callable[[List[str]], np.ndarray],
+                 matriz: Optional[np.ndarray] = None, pendientes: Optional[List[int]] = None,
+                 al_guardar: Optional[Callable[[List[int], np.ndarray], None]] = None,
+                 tamano_lote: int = 256, firma: str = "", lexico: Any = None):
+        """
+        Prepara el trabajo (no lo arranca)
+
+        Args:
+            clave: Identificador del trabajo (ej: "devops:org/proyecto")
+            textos: Texto de cada fila del índice
+            codificar: Función lista de textos -> matriz de embeddings
+            matriz: Embeddings ya conocidos (filas no pendientes), o None
+            pendientes: Filas a codificar (por defecto todas)
+            al_guardar: Callback (filas, vectores) tras cada lote, para persistirlo
+            tamano_lote: Textos por lote
+            firma: Huella del contenido indexado (para reutilizar el trabajo)
+            lexico: Índice léxico (BM25Index) que se construye junto a los embeddings; las
+                filas que ya contiene (reutilizadas de un índice anterior) no se reindexan
+        """
+        self.clave = clave
+        self.firma = firma
+        self.textos = textos
+        self.total_filas = len(textos)
+        self.pendientes = list(range(len(textos))) if pendientes is None else list(pendientes)
+        self._codificar = codificar
+        self._al_guardar = al_guardar
+        self.tamano_lote = tamano_lote
+        self.lexico = lexico
+
+        self._lock = threading.Lock()
+        self._matriz = matriz
+        self._listas = np.ones(len(textos), dtype=bool)
+        self._listas[self.pendientes] = False
+        self.version = 0  # cambia cada vez que se completa un lote
+
+        self.estado = "pendiente"
+        self.error: Optional[str] = None
+        self.hechos = 0
+        self.inicio: Optional[float] = None
+        self.fin: Optional[float] = None
+        self._cancelado = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        """Arranca el hilo de indexación"""
+        self.estado = "en_curso"
+        self.inicio = time.monotonic()
+        self._hilo = threading.Thread(target=self._ejecutar, name=f"indexacion-{self.clave}", daemon=True)
+        self._hilo.start()
+
+    def cancelar(self) -> None:
+        """Detiene el trabajo al terminar el lote en curso"""
+        self._cancelado.set()
+
+    @property
+    def activo(self) -> bool:
+        return self.estado in ("pendiente", "en_curso")
+
+    def _ejecutar(self) -> None:
+        try:
+            if self.lexico is not None:
+                # Las filas con embeddings ya conocidos solo necesitan el índice léxico
+                conocidas = [f for f in np.flatnonzero(self._listas).tolist() if f not in self.lexico]
+                for i in range(0, len(conocidas), 2048):
+                    if self._cancelado.is_set():
+                        self.estado = "cancelado"
+                        return
+                    filas = conocidas[i:i + 2048]
+                    self.lexico.agregar([self.textos[f] for f in filas], filas)
+
+            for i in range(0, len(self.pendientes), self.tamano_lote):
+                if self._cancelado.is_set():
+                    self.estado = "cancelado"
+                    return
+                filas = self.pendientes[i:i + self.tamano_lote]
+                vectores = np.asarray(self._codificar([self.textos[f] for f in filas]), dtype=np.float32)
+
+                with self._lock:
+                    if self._matriz is None:
+                        self._matriz = np.zeros((self.total_filas, vectores.shape[1]), dtype=np.float32)
+                    self._matriz[filas] = vectores
+                    self._listas[filas] = True
+                    self.hechos += len(filas)
+                    self.version += 1
+
+                if self.lexico is not None:
+                    nuevas = [f for f in filas if f not in self.lexico]
+                    self.lexico.agregar([self.textos[f] for f in nuevas], nuevas)
+                if self._al_guardar:
+                    self._al_guardar(filas, vectores)
+            self.estado = "completado"
+        except Exception as e:
+            self.error = str(e)
+            self.estado = "error"
+        finally:
+            self.fin = time.monotonic()
+
+    def instantanea(self) -> Tuple[Optional[np.ndarray], np.ndarray, int]:
+        """
+        Copia del estado actual del índice
+
+        Returns:
+            tuple (matriz, listas, version): matriz completa (filas sin calcular a cero,
+            None si aún no hay ninguna), máscara de filas listas y versión
+        """
+        with self._lock:
+            matriz = None if self._matriz is None else self._matriz.copy()
+            return matriz, self._listas.copy(), self.version
+
+    def progreso(self) -> Dict[str, Any]:
+        """Avance del trabajo: filas hechas, porcentaje, velocidad y segundos restantes estimados"""
+        total = len(self.pendientes)
+        transcurrido = ((self.fin or time.monotonic()) - self.inicio) if self.inicio else 0.0
+        velocidad = self.hechos / transcurrido if transcurrido > 0 and self.hechos else 0.0
+        restantes = total - self.hechos
+        return {
+            "clave": self.clave,
+            "estado": self.estado,
+            "hechos": self.hechos,
+            "total": total,
+            "porcentaje": round(100 * self.hechos / total, 1) if total else 100.0,
+            "textos_por_s": round(velocidad, 1),
+            "transcurrido_s": round(transcurrido, 1),
+            "eta_s": round(restantes / velocidad, 1) if velocidad and self.activo else None,
+            "error": self.error,
+        }
+
+
+class IndexingWorker:
+    """
+    Registro de trabajos de indexación del proceso (uno activo por clave)
+
+    La clave debe identificar el contenido (ej: incluir la firma): dos sesiones que
+    indexan corpus distintos del mismo proyecto tienen trabajos distintos y no se
+    cancelan entre sí; las que indexan el mismo corpus comparten el trabajo.
+    """
+
+    def __init__(self, max_terminados: int = 8):
+        """
+        Args:
+            max_terminados: Trabajos terminados (completados, cancelados o con error) que
+                se conservan; al superarse se olvidan los que terminaron antes
+        """
+        self._lock = threading.Lock()
+        self._trabajos: Dict[str, IndexingJob] = {}
+        self.max_terminados = max_terminados
+
+    def lanzar(self, trabajo: IndexingJob) -> IndexingJob:
+        """
+        Arranca un trabajo, salvo que ya exista uno con la misma clave y firma (en curso
+        o completado), que se reutiliza; si la firma cambia, el anterior se cancela
+
+        Returns:
+            El trabajo que queda registrado para esa clave
+        """
+        with self._lock:
+            actual = self._trabajos.get(trabajo.clave)
+            if actual is not None and actual.firma == trabajo.firma and actual.estado in ("en_curso", "completado"):
+                return actual
+            if actual is not None:
+                actual.cancelar()
+            self._trabajos[trabajo.clave] = trabajo
+            self._olvidar_terminados()
+        trabajo.iniciar()
+        return trabajo
+
+    def _olvidar_terminados(self) -> None:
+        """Descarta los trabajos terminados más antiguos por encima de max_terminados (con el lock tomado)"""
+        terminados = sorted(
+            (t for t in self._trabajos.values() if not t.activo),
+            key=lambda t: t.fin or 0.0
+        )
+        for trabajo in terminados[:max(0, len(terminados) - self.max_terminados)]:
+            del self._trabajos[trabajo.clave]
+
+    def trabajo(self, clave: str) -> Optional[IndexingJob]:
+        """Trabajo registrado para una clave, o None"""
+        with self._lock:
+            return self._trabajos.get(clave)
+
+    def progresos(self) -> List[Dict[str, Any]]:
+        """Progreso de todos los trabajos registrados"""
+        with self._lock:
+            trabajos = list(self._trabajos.values())
+        return [trabajo.progreso() for trabajo in trabajos]
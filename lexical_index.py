@@ -0,0 +1,232 @@
+"""
+Índice léxico BM25 y búsqueda híbrida
+
+Complementa al índice vectorial con coincidencias exactas de términos (códigos de
+error, nombres de componentes, tags...) que MiniLM no distingue bien:
+- BM25Index: índice invertido en memoria, construible de forma incremental; renumerado
+  reutiliza los documentos de un índice anterior en otras filas sin volver a tokenizarlos
+- fusionar_rrf: fusión de rankings por reciprocal rank fusion
+- busqueda_hibrida: búsqueda vectorial + BM25 fusionadas, con la similitud coseno de
+  cada resultado para mostrarla como hasta ahora
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Palabras (con guiones, puntos o barras bajas internos: ERR-1234, System.IO, user_id)
+PATRON_TOKEN = re.compile(r"[a-z0-9]+(?:[._\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a al algo como con de del el en es esta este esto la las lo los no o para pero por que se
+si sin su sus un una uno y the and or of to in on for is are be with this that it as at by
+""".split())
+
+CANDIDATOS_HIBRIDOS = 4  # cada ranking aporta top_k * factor candidatos a la fusión
+RRF_K = 60
+
+
+def tokenizar(texto: str) -> List[str]:
+    """
+    Tokeniza un texto para BM25: minúsculas, sin acentos, sin stopwords; los tokens
+    compuestos (ERR-1234) se indexan enteros y también por partes
+    """
+    texto = (texto or "").lower()
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    tokens = []
+    for token in PATRON_TOKEN.findall(texto):
+        if token not in STOPWORDS:
+            tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(parte for parte in re.split(r"[._\-]", token) if parte and parte not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Índice invertido BM25 en memoria; los documentos se identifican por su fila"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._longitudes: Dict[int, int] = {}
+        self._terminos_doc: Dict[int, List[str]] = {}
+        self._total_tokens = 0
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._longitudes)
+
+    def __contains__(self, fila: int) -> bool:
+        return fila in self._longitudes
+
+    def renumerado(self, filas: Dict[int, int]) -> "BM25Index":
+        """
+        Índice nuevo con los documentos indicados movidos a otras filas (sin volver a
+        tokenizarlos); el resto no pasa al índice nuevo y este no se modifica
+
+        Args:
+            filas: Fila nueva de cada fila que se conserva
+        """
+        nuevo = BM25Index(self.k1, self.b)
+        with self._lock:
+            for termino, docs in self._postings.items():
+                movidos = {filas[fila]: tf for fila, tf in docs.items() if fila in filas}
+                if movidos:
+                    nuevo._postings[termino] = movidos
+            for fila, destino in filas.items():
+                if fila in self._longitudes:
+                    nuevo._longitudes[destino] = self._longitudes[fila]
+                    nuevo._terminos_doc[destino] = self._terminos_doc[fila]
+        nuevo._total_tokens = sum(nuevo._longitudes.values())
+        return nuevo
+
+    def agregar(self, textos: Sequence[str], filas: Optional[Iterable[int]] = None) -> None:
+        """
+        Añade (o sustituye) documentos
+
+        Args:
+            textos: Texto de cada documento
+            filas: Fila de cada documento (por defecto, a continuación de las existentes)
+        """
+        with self._lock:
+            if filas is None:
+                inicio = max(self._longitudes, default=-1) + 1
+                filas = range(inicio, inicio + len(textos))
+            for fila, texto in zip(filas, textos):
+                if fila in self._longitudes:
+                    self._eliminar(fila)
+                frecuencias = Counter(tokenizar(texto))
+                postings = self._postings
+                for termino, tf in frecuencias.items():
+                    docs = postings.get(termino)
+                    if docs is None:
+                        postings[termino] = {fila: tf}
+                    else:
+                        docs[fila] = tf
+                longitud = sum(frecuencias.values())
+                self._longitudes[fila] = longitud
+                self._terminos_doc[fila] = list(frecuencias)
+                self._total_tokens += longitud
+            # Los arrays cacheados de los términos tocados ya no valen
+            if self._arrays:
+                self._arrays.clear()
+
+    def _eliminar(self, fila: int) -> None:
+        """Quita un documento (con el lock tomado)"""
+        for termino in self._terminos_doc.pop(fila):
+            del self._postings[termino][fila]
+            self._arrays.pop(termino, None)
+        self._total_tokens -= self._longitudes.pop(fila)
+
+    def _posting(self, termino: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(filas, frecuencias) de un término como arrays (se cachean hasta que cambie)"""
+        if termino not in self._arrays:
+            docs = self._postings.get(termino, {})
+            self._arrays[termino] = (
+                np.fromiter(docs.keys(), dtype=np.int64, count=len(docs)),
+                np.fromiter(docs.values(), dtype=np.float32, count=len(docs)),
+            )
+        return self._arrays[termino]
+
+    def buscar(self, query: str, top_k: int = 10, mascara: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Documentos con mayor puntuación BM25 para la query
+
+        Args:
+            query: Texto de la consulta
+            top_k: Número de resultados
+            mascara: Máscara booleana de filas permitidas (ver VectorIndex.mascara)
+
+        Returns:
+            Lista de (fila, puntuación) de mayor a menor, solo con puntuación > 0
+        """
+        terminos = set(tokenizar(query))
+        with self._lock:
+            n = len(self._longitudes)
+            if not n or not terminos or top_k <= 0:
+                return []
+            media = max(self._total_tokens / n, 1.0)
+            acumulado = None
+            filas_vistas = []
+            for termino in terminos:
+                if termino not in self._postings or not self._postings[termino]:
+                    continue
+                filas, tf = self._posting(termino)
+                idf = math.log(1 + (n - len(filas) + 0.5) / (len(filas) + 0.5))
+                longitudes = np.fromiter((self._longitudes[f] for f in filas), dtype=np.float32, count=len(filas))
+                valores = idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * longitudes / media))
+                filas_vistas.append(filas)
+                acumulado = valores if acumulado is None else np.concatenate([acumulado, valores])
+
+        if acumulado is None:
+            return []
+        filas = np.concatenate(filas_vistas)
+        unicas, inversa = np.unique(filas, return_inverse=True)
+        totales = np.bincount(inversa, weights=acumulado)
+        if mascara is not None:
+            permitidas = unicas < len(mascara)
+            permitidas[permitidas] = mascara[unicas[permitidas]]
+            unicas, totales = unicas[permitidas], totales[permitidas]
+        if not len(unicas):
+            return []
+
+        k = min(top_k, len(totales))
+        mejores = np.argpartition(-totales, k - 1)[:k] if k < len(totales) else np.arange(len(totales))
+        mejores = mejores[np.argsort(-totales[mejores])]
+        return [(int(unicas[i]), float(totales[i])) for i in mejores]
+
+
+def fusionar_rrf(rankings: List[List[Tuple[int, float]]], top_k: int, k: int = RRF_K) -> List[Tuple[int, float]]:
+    """
+    Reciprocal rank fusion: cada documento suma 1 / (k + posición) en cada ranking
+
+    Returns:
+        Lista de (fila, puntuación RRF) de mayor a menor
+    """
+    puntuaciones: Dict[int, float] = {}
+    for ranking in rankings:
+        for posicion, (fila, _) in enumerate(ranking, 1):
+            puntuaciones[fila] = puntuaciones.get(fila, 0.0) + 1.0 / (k + posicion)
+    return sorted(puntuaciones.items(), key=lambda x: x[1], reverse=True)[:top_k]
+
+
+def busqueda_hibrida(indice: Any, lexico: Optional[BM25Index], query: str, query_embedding: Any,
+                     top_k: int = 5, filtro: Any = None) -> List[Tuple[int, float]]:
+    """
+    Búsqueda vectorial + BM25 fusionadas con RRF
+
+    Args:
+        indice: VectorIndex del corpus
+        lexico: BM25Index alineado por filas con el índice (None = solo vectorial)
+        query: Texto de la consulta
+        query_embedding: Embedding de la consulta
+        top_k: Número de resultados
+        filtro: Filtro por metadatos (se aplica a ambos rankings)
+
+    Returns:
+        Lista de (fila, similitud coseno) en el orden de la fusión
+    """
+    if lexico is None or not len(lexico):
+        return indice.buscar(query_embedding, top_k=top_k, filtro=filtro)
+
+    candidatos = top_k * CANDIDATOS_HIBRIDOS
+    vectoriales = indice.buscar(query_embedding, top_k=candidatos, filtro=filtro)
+    lexicos = lexico.buscar(query, top_k=candidatos, mascara=indice.mascara(filtro))
+    if not lexicos:
+        return vectoriales[:top_k]
+
+    fusion = fusionar_rrf([vectoriales, lexicos], top_k)
+    similitudes = dict(vectoriales)
+    sin_similitud = np.array([fila for fila, _ in fusion if fila not in similitudes], dtype=np.int64)
+    if len(sin_similitud):
+        similitudes.update(zip(sin_similitud.tolist(), indice.puntuar(query_embedding, sin_similitud).tolist()))
+    return [(fila, float(similitudes[fila])) for fila, _ in fusion]
@@ -0,0 +1,234 @@
+"""
+Extracción de texto de PDF en paralelo por páginas
+
+- Los rangos de páginas se reparten entre los procesos de un pool persistente; el PDF
+  se pasa una vez por documento a través de un fichero temporal
+- Backend de extracción enchufable (BACKENDS_PDF o cualquier clase con la misma interfaz)
+- Timeout por página: una página patológica se queda sin texto en lugar de bloquear
+  la subida entera; si un proceso se queda atascado, su pool se retira (las nuevas
+  extracciones usan otro) y se detiene cuando terminan las extracciones que lo usaban
+- iterar_paginas es un generador que entrega las páginas en orden según se completan,
+  para poder empezar a trocear e indexar antes de que termine la última
+"""
+
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+
+VERSION = "1"  # cambiarla si cambia el texto extraído (invalida la caché de documentos)
+PAGINAS_POR_RANGO = 8  # páginas por tarea del pool
+MARGEN_TIMEOUT_RANGO = 5.0  # segundos extra de espera por rango en el proceso principal
+
+
+class TiempoAgotado(Exception):
+    """La extracción de una página superó su timeout"""
+
+
+class BackendPyPDF2:
+    """Extracción con PyPDF2 (el backend de siempre)"""
+
+    def __init__(self, datos: bytes):
+        import PyPDF2
+        self._reader = PyPDF2.PdfReader(BytesIO(datos))
+
+    def __len__(self) -> int:
+        return len(self._reader.pages)
+
+    def extraer(self, pagina: int) -> str:
+        return self._reader.pages[pagina].extract_text() or ""
+
+
+class BackendPyPDF(BackendPyPDF2):
+    """Extracción con pypdf (sucesor de PyPDF2, más rápido y tolerante)"""
+
+    def __init__(self, datos: bytes):
+        import pypdf
+        self._reader = pypdf.PdfReader(BytesIO(datos))
+
+
+BACKENDS_PDF: Dict[str, Type[Any]] = {"pypdf2": BackendPyPDF2, "pypdf": BackendPyPDF}
+
+Backend = Union[str, Type[Any]]
+
+
+def resolver_backend(backend: Backend) -> Type[Any]:
+    """
+    Clase del backend a partir de su nombre (o la propia clase, que debe estar definida
+    a nivel de módulo para poder usarse desde los procesos del pool)
+
+    Raises:
+        ValueError: Si el nombre no existe
+    """
+    if isinstance(backend, str):
+        if backend not in BACKENDS_PDF:
+            raise ValueError(f"Backend de PDF no soportado: {backend} (usar uno de {', '.join(BACKENDS_PDF)})")
+        return BACKENDS_PDF[backend]
+    return backend
+
+
+# Documento abierto en cada proceso trabajador (solo el último, para acotar memoria)
+_documento_proceso: Optional[Tuple[str, Type[Any], Any]] = None
+
+
+@contextmanager
+def _limite_tiempo(segundos: Optional[float]):
+    """Lanza TiempoAgotado si el bloque tarda más de segundos (solo en el hilo principal en Unix)"""
+    if not segundos or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def agotado(signum, frame):
+        raise TiempoAgotado(f"más de {segundos:g}s")
+
+    anterior = signal.signal(signal.SIGALRM, agotado)
+    signal.setitimer(signal.ITIMER_REAL, segundos)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, anterior)
+
+
+def _extraer_rango(ruta: str, backend: Type[Any], inicio: int, fin: int,
+                   timeout_pagina: Optional[float]) -> List[Tuple[str, Optional[str]]]:
+    """
+    Extrae un rango de páginas en el proceso trabajador
+
+    Returns:
+        Lista de (texto, error) por página; error es None si la página se extrajo bien
+    """
+    global _documento_proceso
+    if _documento_proceso is None or _documento_proceso[:2] != (ruta, backend):
+        with open(ruta, "rb") as f:
+            _documento_proceso = (ruta, backend, backend(f.read()))
+    documento = _documento_proceso[2]
+
+    paginas = []
+    for pagina in range(inicio, fin):
+        try:
+            with _limite_tiempo(timeout_pagina):
+                paginas.append((documento.extraer(pagina), None))
+        except Exception as e:
+            paginas.append(("", f"{type(e).__name__}: {e}"))
+    return paginas
+
+
+class PDFExtractor:
+    """Extractor de texto de PDF con un pool de procesos persistente"""
+
+    def __init__(self, backend: Backend = "pypdf2", procesos: Optional[int] = None,
+                 paginas_por_rango: int = PAGINAS_POR_RANGO, timeout_pagina: Optional[float] = 30.0):
+        """
+        Configura el extractor (los procesos arrancan en el primer uso)
+
+        Args:
+            backend: Nombre en BACKENDS_PDF o clase con __init__(bytes), __len__ y extraer(pagina)
+            procesos: Número de procesos (por defecto, los núcleos hasta 4); 0 = extraer en
+                el propio proceso, sin timeout por página
+            paginas_por_rango: Páginas por tarea del pool
+            timeout_pagina: Segundos máximos por página (None = sin límite)
+        """
+        self.backend = resolver_backend(backend)
+        self.procesos = min(os.cpu_count() or 1, 4) if procesos is None else max(0, procesos)
+        self.paginas_por_rango = max(1, paginas_por_rango)
+        self.timeout_pagina = timeout_pagina
+        self._lock = threading.Lock()
+        self._pool_procesos = None
+        # Extracciones en curso por pool (el actual y los retirados que aún se usan)
+        self._usos: Dict[Any, int] = {}
+
+    def _tomar_pool(self):
+        """Pool actual para una extracción (devolverlo con _soltar_pool)"""
+        with self._lock:
+            if self._pool_procesos is None:
+                # spawn: los procesos no heredan el estado de torch/Streamlit del proceso principal
+                self._pool_procesos = multiprocessing.get_context("spawn").Pool(self.procesos)
+            pool = self._pool_procesos
+            self._usos[pool] = self._usos.get(pool, 0) + 1
+            return pool
+
+    def _soltar_pool(self, pool, atascado: bool) -> None:
+        """
+        Fin de una extracción. Si algún proceso se quedó atascado, el pool se retira: las
+        extracciones nuevas arrancan otro y este se detiene (con el proceso atascado) en
+        cuanto terminan las demás extracciones que lo estaban usando, sin cortarlas.
+        """
+        with self._lock:
+            self._usos[pool] -= 1
+            if atascado and pool is self._pool_procesos:
+                self._pool_procesos = None
+                pool.close()
+            if pool is not self._pool_procesos and not self._usos[pool]:
+                del self._usos[pool]
+                pool.terminate()
+
+    def cerrar(self) -> None:
+        """Detiene todos los procesos (también los que sigan atascados en una página)"""
+        with self._lock:
+            for pool in set(self._usos) | ({self._pool_procesos} - {None}):
+                pool.terminate()
+            self._usos.clear()
+            self._pool_procesos = None
+
+    def iterar_paginas(self, file_bytes: bytes) -> Iterator[Dict[str, Any]]:
+        """
+        Extrae el texto página a página
+
+        Args:
+            file_bytes: Bytes del PDF
+
+        Yields:
+            dict por página, en orden: pagina (desde 1), total, texto y error (None si se
+            extrajo bien; si no, la página va sin texto)
+
+        Raises:
+            Las excepciones del backend si el PDF no se puede abrir
+        """
+        if not self.procesos:
+            documento = self.backend(file_bytes)
+            total = len(documento)
+            for pagina in range(total):
+                try:
+                    texto, error = documento.extraer(pagina), None
+                except Exception as e:
+                    texto, error = "", f"{type(e).__name__}: {e}"
+                yield {"pagina": pagina + 1, "total": total, "texto": texto, "error": error}
+            return
+
+        total = len(self.backend(file_bytes))
+        descriptor, ruta = tempfile.mkstemp(suffix=".pdf")
+        atascado = False
+        pool = None
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(file_bytes)
+
+            rangos = [(i, min(i + self.paginas_por_rango, total)) for i in range(0, total, self.paginas_por_rango)]
+            pool = self._tomar_pool()
+            tareas = [
+                pool.apply_async(_extraer_rango, (ruta, self.backend, inicio, fin, self.timeout_pagina))
+                for inicio, fin in rangos
+            ]
+            for (inicio, fin), tarea in zip(rangos, tareas):
+                try:
+                    espera = self.timeout_pagina * (fin - inicio) + MARGEN_TIMEOUT_RANGO if self.timeout_pagina else None
+                    paginas = tarea.get(timeout=espera)
+                except multiprocessing.TimeoutError:
+                    # El proceso no responde (atascado fuera de Python): su pool se retira al terminar
+                    atascado = True
+                    paginas = [("", "TiempoAgotado: el proceso no respondió")] * (fin - inicio)
+                for pagina, (texto, error) in enumerate(paginas, inicio + 1):
+                    yield {"pagina": pagina, "total": total, "texto": texto, "error": error}
+        finally:
+            if pool is not None:
+                self._soltar_pool(pool, atascado)
+            try:
+                os.unlink(ruta)
+            except OSError:
+                pass
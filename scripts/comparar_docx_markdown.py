@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Regresión del conversor DOCX -> Markdown
+
+Convierte cada documento con el conversor en streaming (docx_markdown) y con la
+implementación anterior basada en python-docx, y comprueba que el Markdown y las
+imágenes extraídas (nombre, posición y bytes) son idénticos. Muestra además el
+tiempo de cada conversión.
+
+Uso:
+    python scripts/comparar_docx_markdown.py documento.docx carpeta_con_docx/ ...
+
+Sale con código 1 si algún documento difiere.
+"""
+
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx_markdown import docx_a_markdown  # noqa: E402
+
+
+def docx_a_markdown_python_docx(file_bytes, extraer_imagenes=False):
+    """Conversión de referencia con python-docx (la de leer_docx_desde_bytes hasta ahora)"""
+    import docx
+    from docx.text.paragraph import Paragraph as DocxParagraph
+    from docx.table import Table as DocxTable
+
+    doc = docx.Document(BytesIO(file_bytes))
+
+    HEADING_MAP = {
+        'Heading 1': '#', 'Heading 2': '##', 'Heading 3': '###',
+        'Heading 4': '####', 'Title': '#', 'Subtitle': '##',
+    }
+
+    def runs_to_md(para):
+        parts = []
+        for run in para.runs:
+            t = run.text
+            if not t:
+                continue
+            if run.bold and run.italic:
+                t = f'***{t}***'
+            elif run.bold:
+                t = f'**{t}**'
+            elif run.italic:
+                t = f'*{t}*'
+            parts.append(t)
+        return ''.join(parts)
+
+    def para_to_md(para):
+        text = runs_to_md(para)
+        if not text.strip():
+            return None
+        style = para.style.name if para.style else ''
+        for key, prefix in HEADING_MAP.items():
+            if style.startswith(key):
+                return f'{prefix} {text.strip()}'
+        if 'List Bullet' in style:
+            return f'- {text.strip()}'
+        if 'List Number' in style:
+            return f'1. {text.strip()}'
+        return text.strip()
+
+    def table_to_md(tbl):
+        rows_md = []
+        for i, row in enumerate(tbl.rows):
+            cells = [c.text.strip().replace('\n', ' ') for c in row.cells]
+            rows_md.append('| ' + ' | '.join(cells) + ' |')
+            if i == 0:
+                rows_md.append('| ' + ' | '.join(['---'] * len(cells)) + ' |')
+        return '\n'.join(rows_md)
+
+    lineas = []
+    imagenes = []
+    imagen_counter = 0
+    for child in doc.element.body:
+        tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
+        if tag == 'p':
+            para = DocxParagraph(child, doc)
+            if extraer_imagenes:
+                for run in para.runs:
+                    for drawing in run.element.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}drawing'):
+                        for blip in drawing.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/main}blip'):
+                            embed_id = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
+                            if embed_id:
+                                try:
+                                    image_part = doc.part.related_parts[embed_id]
+                                    content_type = image_part.content_type
+                                    if 'png' in content_type:
+                                        ext = 'png'
+                                    elif 'jpeg' in content_type or 'jpg' in content_type:
+                                        ext = 'jpg'
+                                    elif 'gif' in content_type:
+                                        ext = 'gif'
+                                    else:
+                                        ext = 'png'
+                                    imagen_counter += 1
+                                    imagenes.append({
+                                        'data': image_part.blob,
+                                        'name': f"imagen_{imagen_counter}.{ext}",
+                                        'position': len(lineas),
+                                        'ext': ext
+                                    })
+                                    lineas.append(f"{{{{IMAGE_PLACEHOLDER_{imagen_counter}}}}}")
+                                except Exception:
+                                    pass
+            md = para_to_md(para)
+            if md:
+                lineas.append(md)
+        elif tag == 'tbl':
+            tbl = DocxTable(child, doc)
+            lineas.append('')
+            lineas.append(table_to_md(tbl))
+            lineas.append('')
+
+    markdown_final = '\n\n'.join(l for l in lineas if l is not None)
+    return (markdown_final, imagenes) if extraer_imagenes else markdown_final
+
+
+def rutas_docx(argumentos):
+    """Ficheros .docx indicados directamente o dentro de las carpetas indicadas"""
+    for ruta in argumentos:
+        if os.path.isdir(ruta):
+            for raiz, _, ficheros in os.walk(ruta):
+                for fichero in sorted(ficheros):
+                    if fichero.lower().endswith(".docx") and not fichero.startswith("~$"):
+                        yield os.path.join(raiz, fichero)
+        else:
+            yield ruta
+
+
+def comparar(ruta):
+    """
+    Compara ambas conversiones de un documento
+
+    Returns:
+        tuple (iguales, segundos_referencia, segundos_streaming)
+    """
+    with open(ruta, "rb") as f:
+        file_bytes = f.read()
+
+    inicio = time.perf_counter()
+    esperado, imagenes_esperadas = docx_a_markdown_python_docx(file_bytes, extraer_imagenes=True)
+    segundos_referencia = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtenido, imagenes_obtenidas = docx_a_markdown(file_bytes, extraer_imagenes=True)
+    segundos_streaming = time.perf_counter() - inicio
+
+    iguales = esperado == obtenido and imagenes_esperadas == imagenes_obtenidas
+    if esperado != obtenido:
+        for n, (a, b) in enumerate(zip(esperado.split("\n"), obtenido.split("\n")), 1):
+            if a != b:
+                print(f"  línea {n}:\n    python-docx: {a!r}\n    streaming:   {b!r}")
+                break
+        else:
+            print(f"  longitud distinta: {len(esperado)} frente a {len(obtenido)} caracteres")
+    elif not iguales:
+        print(f"  imágenes distintas: {len(imagenes_esperadas)} frente a {len(imagenes_obtenidas)}")
+    return iguales, segundos_referencia, segundos_streaming
+
+
+def main():
+    rutas = list(rutas_docx(sys.argv[1:]))
+    if not rutas:
+        print(__doc__)
+        sys.exit(2)
+
+    diferentes = 0
+    total_referencia = total_streaming = 0.0
+    for ruta in rutas:
+        iguales, referencia, streaming = comparar(ruta)
+        total_referencia += referencia
+        total_streaming += streaming
+        diferentes += not iguales
+        estado = "OK" if iguales else "DIFERENTE"
+        print(f"[{estado}] {ruta}: python-docx {referencia:.2f}s, streaming {streaming:.2f}s")
+
+    print(
+        f"\n{len(rutas) - diferentes}/{len(rutas)} documentos idénticos; "
+        f"python-docx {total_referencia:.2f}s, streaming {total_streaming:.2f}s "
+        f"(x{total_referencia / max(total_streaming, 1e-9):.1f})"
+    )
+    sys.exit(1 if diferentes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunker import Chunker  # noqa: E402
+
+# Valores por defecto de app.py (CHUNK_TOKENS y CHUNK_SOLAPE_TOKENS)
+CHUNK_TOKENS = 200
+CHUNK_SOLAPE_TOKENS = 32
+
+PALABRAS = "sistema usuario error pedido factura servidor cliente informe proceso datos validación".split()
+
+
+def texto_parrafos(semilla, parrafos=30):
+    """Párrafos de 2 a 12 frases (de ~20 a ~150 tokens), como un documento funcional"""
+    azar = random.Random(semilla)
+
+    def frase():
+        return " ".join(azar.choice(PALABRAS) for _ in range(azar.randint(6, 14))).capitalize() + "."
+    return "\n\n".join(" ".join(frase() for _ in range(azar.randint(2, 12))) for _ in range(parrafos))
+
+
+def test_chunks_consecutivos_solapan_con_valores_por_defecto():
+    for semilla in range(5):
+        texto = texto_parrafos(semilla)
+        chunks = Chunker(CHUNK_TOKENS, CHUNK_SOLAPE_TOKENS).trocear(texto)
+        assert len(chunks) > 1
+        for anterior, siguiente in zip(chunks, chunks[1:]):
+            assert siguiente["inicio"] < anterior["fin"]
+            assert texto[siguiente["inicio"]:anterior["fin"]].strip()
+
+
+def test_solape_en_frase_cortada_por_palabras():
+    texto = "palabra " * 3000
+    chunks = Chunker(50, 10).trocear(texto)
+    assert len(chunks) > 1
+    assert all(siguiente["inicio"] < anterior["fin"] for anterior, siguiente in zip(chunks, chunks[1:]))
+
+
+def test_ningun_chunk_supera_el_maximo():
+    texto = texto_parrafos(7) + "\n\n" + "x" * 5000 + " fin."
+    chunks = Chunker(CHUNK_TOKENS, CHUNK_SOLAPE_TOKENS).trocear(texto)
+    assert all(chunk["tokens"] <= CHUNK_TOKENS for chunk in chunks)
+
+
+def test_posiciones_apuntan_al_texto_original():
+    texto = "Primer párrafo.\n\n\n  Segundo párrafo con más texto.\n\nTercero."
+    for chunk in Chunker(5, 0).trocear(texto):
+        assert texto[chunk["inicio"]:chunk["fin"]].split() == chunk["texto"].split()
+
+
+def test_sin_solape_no_repite_texto():
+    chunks = Chunker(CHUNK_TOKENS, 0).trocear(texto_parrafos(3))
+    assert all(siguiente["inicio"] >= anterior["fin"] for anterior, siguiente in zip(chunks, chunks[1:]))
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexical_index import BM25Index, busqueda_hibrida, fusionar_rrf, tokenizar  # noqa: E402
+from vector_index import VectorIndex  # noqa: E402
+
+TEXTOS = [
+    "Error ERR-1234 al validar el pedido en el servidor",
+    "El informe de facturación tarda mucho en generarse",
+    "Fallo de conexión con el servidor de base de datos",
+    "Validación del pedido: campo cliente vacío",
+    "Migración de System.IO a la nueva versión",
+]
+
+
+def filas(resultados):
+    return [fila for fila, _ in resultados]
+
+
+def test_tokenizar_normaliza_y_parte_compuestos():
+    assert tokenizar("Validación del ERR-1234") == ["validacion", "err-1234", "err", "1234"]
+    assert tokenizar("System.IO") == ["system.io", "system", "io"]
+
+
+def test_bm25_ordena_por_coincidencias():
+    lexico = BM25Index()
+    lexico.agregar(TEXTOS)
+    assert filas(lexico.buscar("ERR-1234"))[0] == 0
+    assert set(filas(lexico.buscar("pedido"))) == {0, 3}
+    assert filas(lexico.buscar("servidor base de datos"))[0] == 2
+    assert lexico.buscar("inexistente") == []
+
+
+def test_bm25_mascara():
+    lexico = BM25Index()
+    lexico.agregar(TEXTOS)
+    mascara = np.array([False, True, True, True, True])
+    assert filas(lexico.buscar("pedido", mascara=mascara)) == [3]
+
+
+def test_bm25_agregar_sustituir_y_renumerar_equivale_a_reconstruir():
+    lexico = BM25Index()
+    lexico.agregar(TEXTOS)
+    # Sustituir una fila y mover el resto (sin la fila 1) a otras posiciones
+    lexico.agregar(["Pedido duplicado en el informe"], [4])
+    movido = lexico.renumerado({0: 2, 2: 0, 3: 1, 4: 3})
+    movido.agregar(["Nuevo error ERR-1234 en el informe"], [4])
+
+    reconstruido = BM25Index()
+    reconstruido.agregar([TEXTOS[2], TEXTOS[3], TEXTOS[0], "Pedido duplicado en el informe",
+                          "Nuevo error ERR-1234 en el informe"])
+    assert len(movido) == len(reconstruido) == 5
+    assert 4 in movido and 5 not in movido
+    for query in ("pedido", "informe", "ERR-1234 servidor", "system.io"):
+        assert movido.buscar(query) == reconstruido.buscar(query)
+    # El índice original no cambia
+    assert len(lexico) == 5 and filas(lexico.buscar("facturacion")) == [1]
+
+
+def test_fusionar_rrf_ejemplo_a_mano():
+    vectorial = [(1, 0.9), (2, 0.8), (3, 0.7)]
+    lexico = [(3, 12.0), (4, 8.0), (1, 5.0)]
+    # 1: 1/61 + 1/63, 3: 1/63 + 1/61 (empate, gana el primero visto), 2: 1/62, 4: 1/62
+    fusion = fusionar_rrf([vectorial, lexico], top_k=4)
+    assert filas(fusion) == [1, 3, 2, 4]
+    assert np.isclose(fusion[0][1], 1 / 61 + 1 / 63)
+    assert np.isclose(fusion[2][1], 1 / 62)
+    assert len(fusionar_rrf([vectorial, lexico], top_k=2)) == 2
+
+
+def test_busqueda_hibrida_sube_coincidencias_exactas():
+    # Vectores: la query se parece a la fila 0; la fila 3 solo coincide por el código de error
+    embeddings = np.eye(4, dtype=np.float32)
+    embeddings[3] = [0.1, 0.0, 0.0, 1.0]
+    indice = VectorIndex(embeddings)
+    lexico = BM25Index()
+    lexico.agregar(["pantalla en blanco", "login lento", "exportar informe", "error ERR-77 al guardar"])
+    query_embedding = np.array([1.0, 0.2, 0.1, 0.0], dtype=np.float32)
+
+    solo_vectorial = filas(indice.buscar(query_embedding, top_k=2))
+    hibrida = busqueda_hibrida(indice, lexico, "ERR-77", query_embedding, top_k=2)
+    assert 3 not in solo_vectorial
+    # La fila 3 es la última del ranking vectorial (1/64) y la primera del BM25 (1/61):
+    # suma más que la fila 0, que solo está en el vectorial (1/61)
+    assert filas(hibrida) == [3, 0]
+    # Cada resultado lleva su similitud coseno (no la puntuación RRF)
+    assert np.isclose(dict(hibrida)[3], indice.puntuar(query_embedding, np.array([3]))[0])
+    # Sin índice léxico es la búsqueda vectorial
+    assert busqueda_hibrida(indice, None, "ERR-77", query_embedding, top_k=2) == indice.buscar(query_embedding, top_k=2)
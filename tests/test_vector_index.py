@@ -0,0 +1,167 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import HNSWIndex, IVFIndex, VectorIndex, evaluar_indice, recortar_carpeta_indices  # noqa: E402
+
+DIMENSION = 32
+
+
+def corpus(n=500, semilla=0):
+    """Embeddings aleatorios (sin normalizar) y consultas, deterministas"""
+    rng = np.random.default_rng(semilla)
+    return rng.normal(size=(n, DIMENSION)).astype(np.float32), rng.normal(size=(20, DIMENSION)).astype(np.float32)
+
+
+def ranking_exacto(embeddings, query, top_k, filas=None):
+    """Top-k por similitud coseno en float32, calculado a mano"""
+    matriz = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similitudes = matriz @ (query / np.linalg.norm(query))
+    filas = np.arange(len(matriz)) if filas is None else np.asarray(filas)
+    orden = filas[np.argsort(-similitudes[filas], kind="stable")][:top_k]
+    return orden.tolist(), similitudes
+
+
+def test_busqueda_exacta_coincide_con_float32():
+    embeddings, consultas = corpus()
+    indice = VectorIndex(embeddings)
+    for query in consultas:
+        esperado, similitudes = ranking_exacto(embeddings, query, 10)
+        resultado = indice.buscar(query, top_k=10)
+        assert [fila for fila, _ in resultado] == esperado
+        assert np.allclose([s for _, s in resultado], similitudes[esperado], atol=1e-5)
+
+
+def test_top_k_mayor_que_el_corpus_y_corpus_vacio():
+    embeddings, consultas = corpus(n=3)
+    assert len(VectorIndex(embeddings).buscar(consultas[0], top_k=10)) == 3
+    assert VectorIndex(np.zeros((0, DIMENSION))).buscar(consultas[0]) == []
+
+
+def test_filas_inactivas_no_aparecen():
+    embeddings, consultas = corpus()
+    activas = np.zeros(len(embeddings), dtype=bool)
+    activas[::3] = True
+    indice = VectorIndex(embeddings, activas=activas)
+    for query in consultas:
+        esperado, _ = ranking_exacto(embeddings, query, 5, filas=np.flatnonzero(activas))
+        assert [fila for fila, _ in indice.buscar(query, top_k=5)] == esperado
+
+
+def test_filtros_por_metadatos():
+    embeddings, consultas = corpus()
+    metadatos = [{"tipo": ("Bug", "Task", "Epic")[i % 3], "estado": "Closed" if i % 2 else "Active"}
+                 for i in range(len(embeddings))]
+    indice = VectorIndex(embeddings, metadatos)
+    permitidas = [i for i, m in enumerate(metadatos) if m["tipo"] in ("Bug", "Epic") and m["estado"] == "Active"]
+
+    for filtro in ({"tipo": ["Bug", "Epic"], "estado": "Active"},
+                   lambda m: m["tipo"] != "Task" and m["estado"] == "Active"):
+        for query in consultas[:5]:
+            esperado, _ = ranking_exacto(embeddings, query, 5, filas=permitidas)
+            assert [fila for fila, _ in indice.buscar(query, top_k=5, filtro=filtro)] == esperado
+
+
+def test_filtro_sin_coincidencias_y_combinado_con_activas():
+    embeddings, consultas = corpus()
+    metadatos = [{"tipo": "Bug" if i < 100 else "Task"} for i in range(len(embeddings))]
+    activas = np.arange(len(embeddings)) >= 50
+    indice = VectorIndex(embeddings, metadatos, activas=activas)
+
+    assert indice.buscar(consultas[0], filtro={"tipo": "Feature"}) == []
+    filas = [fila for fila, _ in indice.buscar(consultas[0], top_k=100, filtro={"tipo": "Bug"})]
+    assert sorted(filas) == list(range(50, 100))
+
+
+def test_puntuacion_cuantizada_aproxima_float32():
+    embeddings, consultas = corpus()
+    for precision, tolerancia in (("float16", 1e-3), ("int8", 2e-2)):
+        indice = VectorIndex(embeddings, precision=precision)
+        assert indice.bytes_memoria < VectorIndex(embeddings).bytes_memoria
+        for query in consultas:
+            _, similitudes = ranking_exacto(embeddings, query, 10)
+            assert np.abs(indice.puntuar(query) - similitudes).max() < tolerancia
+
+
+def test_reordenacion_float32_recupera_el_ranking_exacto(tmp_path):
+    embeddings, consultas = corpus()
+    for ruta_respaldo in (None, tmp_path / "respaldo-f32.npy"):
+        indice = VectorIndex(embeddings, precision="int8", reordenar=True, ruta_respaldo=ruta_respaldo)
+        for query in consultas:
+            esperado, similitudes = ranking_exacto(embeddings, query, 10)
+            resultado = indice.buscar(query, top_k=10)
+            assert [fila for fila, _ in resultado] == esperado
+            assert np.allclose([s for _, s in resultado], similitudes[esperado], atol=1e-5)
+    assert (tmp_path / "respaldo-f32.npy").exists()
+
+
+def crear_fichero(carpeta, nombre, tamano, antiguedad):
+    ruta = carpeta / nombre
+    ruta.write_bytes(b"x" * tamano)
+    os.utime(ruta, (1_000_000 - antiguedad, 1_000_000 - antiguedad))
+    return ruta
+
+
+def test_recortar_carpeta_borra_primero_los_indices_mas_antiguos(tmp_path):
+    antiguo = [crear_fichero(tmp_path, "a.npz", 100, 300), crear_fichero(tmp_path, "a.hnsw", 100, 300)]
+    medio = crear_fichero(tmp_path, "b-f32.npy", 100, 200)
+    reciente = crear_fichero(tmp_path, "c.npz", 100, 100)
+
+    # 400 bytes con límite de 150: caen el índice "a" (sus dos ficheros) y después "b"
+    assert recortar_carpeta_indices(tmp_path, 150) == 300
+    assert not any(ruta.exists() for ruta in antiguo + [medio])
+    assert reciente.exists()
+
+    # Dentro del límite no se borra nada
+    assert recortar_carpeta_indices(tmp_path, 150) == 0
+
+
+def test_recortar_carpeta_conserva_el_indice_en_uso(tmp_path):
+    en_uso = crear_fichero(tmp_path, "huella1.npz", 100, 300)
+    otro = crear_fichero(tmp_path, "huella2.npz", 100, 100)
+
+    assert recortar_carpeta_indices(tmp_path, 100, conservar="huella1") == 100
+    assert en_uso.exists() and not otro.exists()
+    assert recortar_carpeta_indices(tmp_path / "no-existe", 0) == 0
+
+
+def corpus_agrupado(n=4000, grupos=40, semilla=0):
+    """Embeddings alrededor de unos centros (como temas de un corpus real) y consultas cercanas"""
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(size=(grupos, DIMENSION))
+    embeddings = centros[rng.integers(grupos, size=n)] + 0.5 * rng.normal(size=(n, DIMENSION))
+    consultas = centros[rng.integers(grupos, size=30)] + 0.5 * rng.normal(size=(30, DIMENSION))
+    return embeddings.astype(np.float32), consultas.astype(np.float32)
+
+
+def test_ivf_recall_frente_a_busqueda_exacta():
+    embeddings, consultas = corpus_agrupado()
+    exacto = VectorIndex(embeddings)
+    assert evaluar_indice(exacto, IVFIndex(embeddings, n_sondas=8), consultas)["recall"] >= 0.9
+    # Sondeando todas las listas el resultado es el exacto
+    assert evaluar_indice(exacto, IVFIndex(embeddings, n_listas=16, n_sondas=16), consultas)["recall"] == 1.0
+
+
+def test_ivf_int8_con_reordenacion_y_filtro():
+    embeddings, consultas = corpus_agrupado()
+    metadatos = [{"tipo": "Bug" if i % 4 == 0 else "Task"} for i in range(len(embeddings))]
+    indice = IVFIndex(embeddings, metadatos, n_listas=16, n_sondas=16, precision="int8", reordenar=True)
+    permitidas = np.flatnonzero(np.arange(len(embeddings)) % 4 == 0)
+    for query in consultas[:10]:
+        esperado, similitudes = ranking_exacto(embeddings, query, 10, filas=permitidas)
+        resultado = indice.buscar(query, top_k=10, filtro={"tipo": "Bug"})
+        assert [fila for fila, _ in resultado] == esperado
+        assert np.allclose([s for _, s in resultado], similitudes[esperado], atol=1e-5)
+
+
+def test_hnsw_cuenta_la_copia_float32_del_grafo():
+    pytest.importorskip("hnswlib")
+    embeddings, consultas = corpus_agrupado(n=1000)
+    indice = HNSWIndex(embeddings, precision="int8", reordenar=True)
+    assert indice.bytes_grafo >= embeddings.nbytes
+    assert indice.bytes_memoria > VectorIndex(embeddings).bytes_memoria
+    assert evaluar_indice(VectorIndex(embeddings), indice, consultas)["recall"] >= 0.9
@@ -0,0 +1,588 @@
+"""
+Motor de recuperación vectorial
+
+Índice único para todos los corpus de la app (work items, documentos, wiki y Tilena):
+- Las filas se normalizan (L2) una sola vez, al indexar, y se guardan en float32,
+  float16 o int8 con escala por fila (reordenación exacta opcional del top-k)
+- Cada consulta se puntúa con un único producto matriz-vector (similitud coseno)
+- El top-k se selecciona con argpartition, sin ordenar todo el corpus
+- Filtros previos por metadatos (ej: tipo o estado del work item)
+- Documentos multi-vector: varias filas (chunks) por documento, agrupadas al buscar
+  con agrupar_por_padre
+
+Para corpus grandes hay índices aproximados opcionales (IVF en NumPy y HNSW si está
+instalado hnswlib) con la misma interfaz, persistibles en disco. recortar_carpeta_indices
+acota lo que ocupan en disco esos ficheros y los float32 de reordenación.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # backend opcional
+    hnswlib = None
+
+
+Filtro = Union[Dict[str, Any], Callable[[Dict[str, Any]], bool], np.ndarray, None]
+
+
+PRECISIONES = ("float32", "float16", "int8")
+BLOQUE_PUNTUACION = 1024  # filas que se descuantizan a la vez al puntuar (caben en caché)
+FACTOR_REORDENACION = 4  # candidatos extra (top_k * factor) que se reordenan con float32
+AGREGACIONES = ("max", "sum")
+
+
+def recortar_carpeta_indices(carpeta: Union[str, Path], max_bytes: int, conservar: str = "") -> int:
+    """
+    Borra los ficheros de índices de una carpeta usados hace más tiempo (fecha de
+    modificación) hasta que ocupen como mucho max_bytes
+
+    Los ficheros de un mismo índice (mismo nombre sin extensión, ej: .npz y .hnsw) se
+    borran juntos. Los que llevan conservar en el nombre (la huella del índice en uso)
+    se marcan como recién usados y no se borran.
+
+    Returns:
+        Bytes liberados
+    """
+    carpeta = Path(carpeta)
+    if not carpeta.is_dir():
+        return 0
+
+    grupos: Dict[str, List[Tuple[Path, os.stat_result]]] = {}
+    ahora = time.time()
+    for ruta in carpeta.iterdir():
+        if not ruta.is_file():
+            continue
+        if conservar and conservar in ruta.name:
+            os.utime(ruta, (ahora, ahora))
+        grupos.setdefault(ruta.stem, []).append((ruta, ruta.stat()))
+
+    total = sum(stat.st_size for ficheros in grupos.values() for _, stat in ficheros)
+    liberados = 0
+    for ficheros in sorted(grupos.values(), key=lambda f: max(stat.st_mtime for _, stat in f)):
+        if total - liberados <= max_bytes:
+            break
+        if conservar and any(conservar in ruta.name for ruta, _ in ficheros):
+            continue
+        for ruta, stat in ficheros:
+            try:
+                ruta.unlink()
+                liberados += stat.st_size
+            except OSError:
+                pass  # en uso (ej: memmap abierto en Windows): se intentará la próxima vez
+    return liberados
+
+
+def normalizar_filas(matriz: Any) -> np.ndarray:
+    """Convierte a float32 y normaliza cada fila a norma 1 (las filas nulas quedan a cero)"""
+    matriz = np.asarray(matriz, dtype=np.float32)
+    if matriz.ndim == 1:
+        matriz = matriz.reshape(1, -1)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+def cuantizar(matriz: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Pasa una matriz float32 a la precisión de almacenamiento
+
+    Args:
+        matriz: Filas normalizadas en float32
+        precision: "float32", "float16" o "int8" (escalar simétrica con una escala por fila)
+
+    Returns:
+        tuple (codigos, escalas): escalas solo para int8 (fila ≈ codigos * escala)
+    """
+    if precision not in PRECISIONES:
+        raise ValueError(f"Precisión no soportada: {precision} (usar una de {', '.join(PRECISIONES)})")
+    if precision == "float32":
+        return matriz, None
+    if precision == "float16":
+        return matriz.astype(np.float16), None
+
+    escalas = np.abs(matriz).max(axis=1) / 127.0
+    escalas[escalas == 0] = 1.0
+    codigos = np.rint(matriz / escalas[:, None]).astype(np.int8)
+    return codigos, escalas.astype(np.float32)
+
+
+class VectorIndex:
+    """Índice de embeddings normalizados con búsqueda exacta por similitud coseno"""
+
+    def __init__(self, embeddings: Any, metadatos: Optional[List[Dict[str, Any]]] = None,
+                 precision: str = "float32", reordenar: bool = False,
+                 ruta_respaldo: Optional[Union[str, Path]] = None, escalas: Optional[np.ndarray] = None,
+                 activas: Optional[np.ndarray] = None):
+        """
+        Crea el índice
+
+        Args:
+            embeddings: Matriz (n, dimensión) en cualquier formato convertible a numpy
+            metadatos: Dict opcional por fila, usado por los filtros
+            precision: Formato de almacenamiento de los vectores (ver cuantizar)
+            reordenar: Reordenar el top-k final con los vectores float32 originales
+            ruta_respaldo: .npy donde guardar los vectores float32 para reordenar; se leen
+                con memmap, así en memoria solo queda la forma compacta
+            escalas: Escalas int8 si embeddings ya son códigos cuantizados (al cargar de disco)
+            activas: Máscara de filas buscables (índice parcial mientras se indexa en
+                segundo plano); None = todas
+        """
+        self.precision = precision
+        if escalas is not None:
+            self.matriz, self.escalas = np.asarray(embeddings, dtype=np.int8), np.asarray(escalas, dtype=np.float32)
+            originales = None
+        else:
+            originales = normalizar_filas(embeddings) if len(embeddings) else np.zeros((0, 0), dtype=np.float32)
+            self.matriz, self.escalas = cuantizar(originales, precision)
+
+        self.respaldo: Optional[np.ndarray] = None
+        self.ruta_respaldo = Path(ruta_respaldo) if ruta_respaldo else None
+        if reordenar and precision != "float32":
+            if self.ruta_respaldo is None:
+                self.respaldo = originales if originales is not None else self.vectores()
+            else:
+                if not self.ruta_respaldo.exists():
+                    self.ruta_respaldo.parent.mkdir(parents=True, exist_ok=True)
+                    np.save(self.ruta_respaldo, originales if originales is not None else self.vectores())
+                self.respaldo = np.load(self.ruta_respaldo, mmap_mode="r")
+
+        if metadatos is not None and len(metadatos) != len(self.matriz):
+            raise ValueError(f"Hay {len(metadatos)} metadatos para {len(self.matriz)} embeddings")
+        self.metadatos = metadatos
+        self.activas = None if activas is None else np.asarray(activas, dtype=bool)
+        self._columnas: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.matriz)
+
+    @property
+    def dimension(self) -> int:
+        return self.matriz.shape[1]
+
+    @property
+    def bytes_memoria(self) -> int:
+        """Memoria ocupada por los vectores (y escalas) del índice"""
+        return self.matriz.nbytes + (self.escalas.nbytes if self.escalas is not None else 0)
+
+    def vectores(self, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        """Filas descuantizadas a float32 (todas o solo `indices`)"""
+        filas = self.matriz if indices is None else self.matriz[indices]
+        if self.escalas is None:
+            return filas.astype(np.float32, copy=False)
+        escalas = self.escalas if indices is None else self.escalas[indices]
+        return filas.astype(np.float32) * escalas[:, None]
+
+    def puntuar(self, query_embedding: Any, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Similitud coseno de la query con todas las filas (o solo con `indices`)
+
+        Con float16/int8 se puntúa sobre la forma compacta por bloques, sin descuantizar
+        la matriz entera; en int8 la escala de cada fila se aplica al resultado.
+        """
+        query = normalizar_filas(query_embedding)[0]
+        matriz = self.matriz if indices is None else self.matriz[indices]
+        if self.precision == "float32":
+            return matriz @ query
+
+        puntuaciones = np.empty(len(matriz), dtype=np.float32)
+        bloque = np.empty((min(BLOQUE_PUNTUACION, len(matriz)), matriz.shape[1]), dtype=np.float32)
+        for i in range(0, len(matriz), BLOQUE_PUNTUACION):
+            filas = bloque[:len(matriz[i:i + BLOQUE_PUNTUACION])]
+            filas[...] = matriz[i:i + BLOQUE_PUNTUACION]
+            np.dot(filas, query, out=puntuaciones[i:i + len(filas)])
+        if self.escalas is not None:
+            puntuaciones *= self.escalas if indices is None else self.escalas[indices]
+        return puntuaciones
+
+    def mascara(self, filtro: Filtro) -> Optional[np.ndarray]:
+        """
+        Convierte un filtro en una máscara booleana por fila
+
+        Args:
+            filtro: dict {campo: valor o lista de valores}, función sobre el dict de
+                metadatos de cada fila, o máscara booleana ya calculada
+
+        Returns:
+            Máscara booleana (combinada con las filas activas), o None si no hay filtro
+            ni filas inactivas
+        """
+        if filtro is None:
+            return self.activas
+        if isinstance(filtro, np.ndarray):
+            mascara = filtro.astype(bool)
+        elif self.metadatos is None:
+            raise ValueError("El índice no tiene metadatos para filtrar")
+        elif callable(filtro):
+            mascara = np.fromiter((bool(filtro(m)) for m in self.metadatos), dtype=bool, count=len(self.metadatos))
+        else:
+            mascara = np.ones(len(self.matriz), dtype=bool)
+            for campo, valores in filtro.items():
+                if valores is None:
+                    continue
+                if not isinstance(valores, (list, tuple, set)):
+                    valores = [valores]
+                mascara &= np.isin(self._columna(campo), list(valores))
+        return mascara if self.activas is None else mascara & self.activas
+
+    def _columna(self, campo: str) -> np.ndarray:
+        """Valores de un campo de metadatos para todas las filas (se calcula una vez)"""
+        if campo not in self._columnas:
+            self._columnas[campo] = np.array([m.get(campo) for m in self.metadatos], dtype=object)
+        return self._columnas[campo]
+
+    def _estado_guardado(self) -> Dict[str, Any]:
+        """Arrays para persistir los vectores en su forma compacta (np.savez)"""
+        return {
+            "matriz": self.matriz,
+            "escalas": self.escalas if self.escalas is not None else np.zeros(0, dtype=np.float32),
+            "precision": self.precision,
+            "ruta_respaldo": str(self.ruta_respaldo) if self.respaldo is not None and self.ruta_respaldo else "",
+        }
+
+    @staticmethod
+    def _opciones_guardadas(datos: Any) -> Dict[str, Any]:
+        """Argumentos del constructor a partir de un .npz guardado con _estado_guardado"""
+        precision = str(datos["precision"])
+        ruta_respaldo = str(datos["ruta_respaldo"]) or None
+        return {
+            "precision": precision,
+            "escalas": datos["escalas"] if precision == "int8" else None,
+            "reordenar": ruta_respaldo is not None and Path(ruta_respaldo).exists(),
+            "ruta_respaldo": ruta_respaldo,
+        }
+
+    def _k_busqueda(self, top_k: int) -> int:
+        """Candidatos a seleccionar antes de la reordenación exacta"""
+        return top_k * FACTOR_REORDENACION if self.respaldo is not None else top_k
+
+    def _seleccionar(self, query_embedding: Any, filas: np.ndarray, puntuaciones: np.ndarray,
+                     top_k: int) -> List[Tuple[int, float]]:
+        """
+        Top-k de unas filas candidatas ya puntuadas (argpartition + orden solo del top-k),
+        reordenando con los vectores float32 de respaldo si los hay
+        """
+        k = min(self._k_busqueda(top_k), len(puntuaciones))
+        if k < len(puntuaciones):
+            mejores = np.argpartition(-puntuaciones, k - 1)[:k]
+        else:
+            mejores = np.arange(len(puntuaciones))
+        filas, puntuaciones = filas[mejores], puntuaciones[mejores]
+
+        if self.respaldo is not None:
+            # Lectura ordenada de las filas del memmap y puntuación exacta
+            orden_lectura = np.argsort(filas)
+            filas = filas[orden_lectura]
+            puntuaciones = np.asarray(self.respaldo[filas], dtype=np.float32) @ normalizar_filas(query_embedding)[0]
+
+        orden = np.argsort(-puntuaciones)[:top_k]
+        return [(int(filas[i]), float(puntuaciones[i])) for i in orden]
+
+    def buscar(self, query_embedding: Any, top_k: int = 5, filtro: Filtro = None) -> List[Tuple[int, float]]:
+        """
+        Busca las filas más similares a la query
+
+        Args:
+            query_embedding: Vector de la query
+            top_k: Número de resultados
+            filtro: Filtro previo por metadatos (ver mascara)
+
+        Returns:
+            Lista de (índice de fila, similitud) ordenada de mayor a menor similitud
+        """
+        if len(self.matriz) == 0 or top_k <= 0:
+            return []
+
+        mascara = self.mascara(filtro)
+        if mascara is None:
+            candidatos = np.arange(len(self.matriz))
+            puntuaciones = self.puntuar(query_embedding)
+        else:
+            candidatos = np.flatnonzero(mascara)
+            if len(candidatos) == 0:
+                return []
+            puntuaciones = self.puntuar(query_embedding, candidatos)
+
+        return self._seleccionar(query_embedding, candidatos, puntuaciones, top_k)
+
+
+class IVFIndex(VectorIndex):
+    """
+    Índice aproximado IVF (inverted file) en NumPy puro
+
+    Las filas se reparten en listas por k-means esférico; cada consulta solo puntúa
+    las filas de las `n_sondas` listas cuyos centroides son más parecidos a la query.
+    """
+
+    tipo = "ivf"
+
+    def __init__(self, embeddings: Any, metadatos: Optional[List[Dict[str, Any]]] = None,
+                 n_listas: Optional[int] = None, n_sondas: int = 8, iteraciones: int = 10,
+                 semilla: int = 0, centroides: Optional[np.ndarray] = None,
+                 asignaciones: Optional[np.ndarray] = None, **opciones):
+        """
+        Crea el índice (entrena los centroides si no se pasan ya calculados)
+
+        Args:
+            embeddings: Matriz (n, dimensión)
+            metadatos: Dict opcional por fila, usado por los filtros
+            n_listas: Número de listas (por defecto ~4·sqrt(n))
+            n_sondas: Listas que se revisan por consulta (más = más recall y más latencia)
+            iteraciones: Iteraciones de k-means
+            semilla: Semilla del muestreo inicial
+            centroides, asignaciones: Estado ya entrenado (al cargar de disco)
+            **opciones: precision, reordenar, ruta_respaldo, escalas (ver VectorIndex)
+        """
+        super().__init__(embeddings, metadatos, **opciones)
+        self.n_sondas = n_sondas
+
+        if centroides is None or asignaciones is None:
+            n_listas = n_listas or max(1, int(4 * np.sqrt(len(self.matriz))))
+            centroides, asignaciones = self._entrenar(min(n_listas, max(1, len(self.matriz))), iteraciones, semilla)
+        self.centroides = np.asarray(centroides, dtype=np.float32)
+        self.asignaciones = np.asarray(asignaciones, dtype=np.int32)
+
+        # Filas agrupadas por lista: orden[inicios[l]:inicios[l + 1]] son las filas de la lista l
+        self._orden = np.argsort(self.asignaciones, kind="stable")
+        self._inicios = np.searchsorted(self.asignaciones[self._orden], np.arange(len(self.centroides) + 1))
+
+    def _entrenar(self, n_listas: int, iteraciones: int, semilla: int) -> Tuple[np.ndarray, np.ndarray]:
+        """k-means esférico sobre una muestra; devuelve (centroides, lista asignada a cada fila)"""
+        rng = np.random.default_rng(semilla)
+        if len(self.matriz) > 64 * n_listas:
+            muestra = self.vectores(np.sort(rng.choice(len(self.matriz), 64 * n_listas, replace=False)))
+        else:
+            muestra = self.vectores()
+
+        centroides = muestra[rng.choice(len(muestra), n_listas, replace=False)].copy()
+        for _ in range(iteraciones):
+            asignacion = np.argmax(muestra @ centroides.T, axis=1)
+            orden = np.argsort(asignacion, kind="stable")
+            tamanos = np.bincount(asignacion, minlength=n_listas)
+            vacias = tamanos == 0
+            sumas = np.zeros_like(centroides)
+            sumas[~vacias] = np.add.reduceat(muestra[orden], np.cumsum(tamanos)[~vacias] - tamanos[~vacias])
+            # Las listas vacías se reinician con filas al azar
+            sumas[vacias] = muestra[rng.choice(len(muestra), int(vacias.sum()))]
+            centroides = normalizar_filas(sumas)
+
+        asignaciones = np.concatenate([
+            np.argmax(self.vectores(np.arange(i, min(i + 8192, len(self.matriz)))) @ centroides.T, axis=1)
+            for i in range(0, len(self.matriz), 8192)
+        ])
+        return centroides, asignaciones
+
+    def candidatos(self, query_embedding: Any) -> np.ndarray:
+        """Filas de las listas más cercanas a la query"""
+        query = normalizar_filas(query_embedding)[0]
+        sondas = min(self.n_sondas, len(self.centroides))
+        listas = np.argpartition(-(self.centroides @ query), sondas - 1)[:sondas]
+        return np.concatenate([self._orden[self._inicios[l]:self._inicios[l + 1]] for l in listas])
+
+    def buscar(self, query_embedding: Any, top_k: int = 5, filtro: Filtro = None) -> List[Tuple[int, float]]:
+        """Igual que VectorIndex.buscar, pero puntuando solo las filas de las listas sondeadas"""
+        if len(self.matriz) == 0 or top_k <= 0:
+            return []
+
+        candidatos = self.candidatos(query_embedding)
+        mascara = self.mascara(filtro)
+        if mascara is not None:
+            candidatos = candidatos[mascara[candidatos]]
+        if len(candidatos) < top_k:
+            # Demasiado pocos candidatos (filtro muy selectivo): búsqueda exacta
+            return super().buscar(query_embedding, top_k, filtro)
+
+        puntuaciones = self.puntuar(query_embedding, candidatos)
+        return self._seleccionar(query_embedding, candidatos, puntuaciones, top_k)
+
+    def guardar(self, ruta: Union[str, Path]) -> None:
+        """Persiste vectores, centroides y asignaciones en un .npz (los metadatos los aporta la app)"""
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, "wb") as f:
+            np.savez(f, centroides=self.centroides, asignaciones=self.asignaciones,
+                     n_sondas=self.n_sondas, **self._estado_guardado())
+
+    @classmethod
+    def cargar(cls, ruta: Union[str, Path], metadatos: Optional[List[Dict[str, Any]]] = None) -> "IVFIndex":
+        """Carga un índice guardado con guardar"""
+        with np.load(ruta) as datos:
+            return cls(datos["matriz"], metadatos, n_sondas=int(datos["n_sondas"]),
+                       centroides=datos["centroides"], asignaciones=datos["asignaciones"],
+                       **cls._opciones_guardadas(datos))
+
+
+class HNSWIndex(VectorIndex):
+    """
+    Índice aproximado HNSW (requiere hnswlib, opcional)
+
+    Mantiene la matriz normalizada para los filtros y la búsqueda exacta de respaldo.
+    Como en IVF, con vectores float32 de respaldo el grafo aporta top_k *
+    FACTOR_REORDENACION candidatos que se reordenan con la puntuación exacta.
+
+    hnswlib guarda su propia copia float32 de todos los vectores (en memoria y en el
+    fichero .hnsw), así que con float16/int8 no ahorra memoria: bytes_memoria la incluye.
+    IVFIndex puntúa directamente sobre la matriz compacta.
+    """
+
+    tipo = "hnsw"
+
+    def __init__(self, embeddings: Any, metadatos: Optional[List[Dict[str, Any]]] = None,
+                 m: int = 16, ef_construccion: int = 200, ef_busqueda: int = 64, grafo: Any = None,
+                 **opciones):
+        """
+        Crea el índice
+
+        Args:
+            embeddings: Matriz (n, dimensión)
+            metadatos: Dict opcional por fila, usado por los filtros
+            m, ef_construccion: Parámetros de construcción del grafo
+            ef_busqueda: Tamaño de la lista de candidatos por consulta
+            grafo: hnswlib.Index ya construido (al cargar de disco)
+            **opciones: precision, reordenar, ruta_respaldo, escalas (ver VectorIndex)
+
+        Raises:
+            ImportError: Si hnswlib no está instalado
+        """
+        if hnswlib is None:
+            raise ImportError("hnswlib no está instalado (pip install hnswlib)")
+        super().__init__(embeddings, metadatos, **opciones)
+        if grafo is None:
+            grafo = hnswlib.Index(space="ip", dim=self.dimension)
+            grafo.init_index(max_elements=max(1, len(self.matriz)), ef_construction=ef_construccion, M=m)
+            if len(self.matriz):
+                grafo.add_items(self.vectores(), np.arange(len(self.matriz)))
+        grafo.set_ef(max(ef_busqueda, 1))
+        self.ef_busqueda = ef_busqueda
+        self.grafo = grafo
+
+    @property
+    def bytes_grafo(self) -> int:
+        """Memoria aproximada del grafo: copia float32 de los vectores y enlaces del nivel 0"""
+        return self.grafo.element_count * (self.dimension * 4 + 2 * self.grafo.M * 4)
+
+    @property
+    def bytes_memoria(self) -> int:
+        """Vectores (y escalas) del índice más el grafo de hnswlib"""
+        return super().bytes_memoria + self.bytes_grafo
+
+    def buscar(self, query_embedding: Any, top_k: int = 5, filtro: Filtro = None) -> List[Tuple[int, float]]:
+        """Igual que VectorIndex.buscar, recorriendo el grafo HNSW"""
+        if len(self.matriz) == 0 or top_k <= 0:
+            return []
+
+        mascara = self.mascara(filtro)
+        query = normalizar_filas(query_embedding)
+        # Con filtro se piden más vecinos y se descartan los que no lo cumplen
+        k = self._k_busqueda(top_k)
+        k = min(len(self.matriz), k if mascara is None else k * 10)
+        self.grafo.set_ef(max(self.ef_busqueda, k))
+        etiquetas, distancias = self.grafo.knn_query(query, k=k)
+
+        filas = etiquetas[0].astype(np.int64)
+        puntuaciones = (1.0 - distancias[0]).astype(np.float32)
+        if mascara is not None:
+            cumplen = mascara[filas]
+            filas, puntuaciones = filas[cumplen], puntuaciones[cumplen]
+            if len(filas) < top_k:
+                return super().buscar(query_embedding, top_k, filtro)
+        # Top-k de los candidatos del grafo, reordenado con float32 si hay respaldo
+        return self._seleccionar(query_embedding, filas, puntuaciones, top_k)
+
+    def guardar(self, ruta: Union[str, Path]) -> None:
+        """Persiste la matriz (.npz) y el grafo (fichero .hnsw junto a ella)"""
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, "wb") as f:
+            np.savez(f, ef_busqueda=self.ef_busqueda, **self._estado_guardado())
+        self.grafo.save_index(str(ruta.with_suffix(".hnsw")))
+
+    @classmethod
+    def cargar(cls, ruta: Union[str, Path], metadatos: Optional[List[Dict[str, Any]]] = None) -> "HNSWIndex":
+        """Carga un índice guardado con guardar"""
+        if hnswlib is None:
+            raise ImportError("hnswlib no está instalado (pip install hnswlib)")
+        ruta = Path(ruta)
+        with np.load(ruta) as datos:
+            matriz = datos["matriz"]
+            ef_busqueda = int(datos["ef_busqueda"])
+            opciones = cls._opciones_guardadas(datos)
+        grafo = hnswlib.Index(space="ip", dim=matriz.shape[1])
+        grafo.load_index(str(ruta.with_suffix(".hnsw")), max_elements=len(matriz))
+        return cls(matriz, metadatos, ef_busqueda=ef_busqueda, grafo=grafo, **opciones)
+
+
+INDICES_APROXIMADOS = {IVFIndex.tipo: IVFIndex, HNSWIndex.tipo: HNSWIndex}
+
+
+def evaluar_indice(exacto: VectorIndex, aproximado: VectorIndex, consultas: Any, top_k: int = 10) -> Dict[str, float]:
+    """
+    Compara un índice aproximado con la búsqueda exacta
+
+    Args:
+        exacto: Índice exacto sobre el mismo corpus
+        aproximado: Índice aproximado a evaluar
+        consultas: Matriz de queries de prueba
+        top_k: k para el recall@k
+
+    Returns:
+        dict con recall (fracción del top-k exacto recuperado) y latencias medias en ms
+    """
+    consultas = np.asarray(consultas, dtype=np.float32)
+    aciertos = 0
+    tiempo_exacto = tiempo_aproximado = 0.0
+    for query in consultas:
+        inicio = time.perf_counter()
+        esperados = {fila for fila, _ in exacto.buscar(query, top_k)}
+        tiempo_exacto += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        obtenidos = {fila for fila, _ in aproximado.buscar(query, top_k)}
+        tiempo_aproximado += time.perf_counter() - inicio
+
+        aciertos += len(esperados & obtenidos) / max(1, len(esperados))
+
+    n = max(1, len(consultas))
+    return {
+        "recall": round(aciertos / n, 4),
+        "latencia_exacta_ms": round(1000 * tiempo_exacto / n, 3),
+        "latencia_aproximada_ms": round(1000 * tiempo_aproximado / n, 3),
+    }
+
+
+def agrupar_por_padre(resultados: List[Tuple[int, float]], padres: Any, top_k: int = 5,
+                      agregacion: str = "max") -> List[Tuple[int, float]]:
+    """
+    Convierte resultados por chunk en resultados por documento (índices multi-vector)
+
+    Args:
+        resultados: Lista de (fila, similitud) en orden de relevancia
+        padres: Documento al que pertenece cada fila del índice
+        top_k: Número de documentos
+        agregacion: "max" (decide el mejor chunk de cada documento, en el orden de
+            entrada) o "sum" (suma de las similitudes de sus chunks encontrados: premia
+            los documentos con varios chunks relevantes)
+
+    Returns:
+        Lista de (documento, similitud de su mejor chunk) de mayor a menor relevancia
+
+    Raises:
+        ValueError: Si la agregación no existe
+    """
+    if agregacion not in AGREGACIONES:
+        raise ValueError(f"Agregación no soportada: {agregacion} (usar una de {', '.join(AGREGACIONES)})")
+
+    mejores: Dict[int, float] = {}
+    sumas: Dict[int, float] = {}
+    for fila, similitud in resultados:
+        padre = int(padres[fila])
+        mejores[padre] = max(similitud, mejores.get(padre, similitud))
+        sumas[padre] = sumas.get(padre, 0.0) + similitud
+
+    orden = list(mejores) if agregacion == "max" else sorted(sumas, key=sumas.get, reverse=True)
+    return [(padre, mejores[padre]) for padre in orden[:top_k]]
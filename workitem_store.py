@@ -0,0 +1,314 @@
+"""
+Almacén local (SQLite) de work items de Azure DevOps
+
+Persiste en disco, compartido por todas las sesiones y reinicios de la aplicación:
+- Work items sincronizados (por organización/proyecto/id, con su revisión)
+- Comentarios de cada work item (válidos mientras no cambie la revisión)
+- Estado de cada sincronización: marca de agua de System.ChangedDate y lista
+  ordenada de IDs que pertenecen a su conjunto de filtros
+
+Incluye además una caché en memoria con TTL para los comentarios que se cargan
+bajo demanda al consultar.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+
+class WorkItemStore:
+    """Persistencia en SQLite de work items, comentarios y sincronizaciones"""
+
+    def __init__(self, ruta_db: str):
+        """
+        Inicializa el almacén
+
+        Args:
+            ruta_db: Ruta del fichero SQLite (la carpeta se crea si no existe)
+        """
+        self.ruta_db = Path(ruta_db)
+        self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.ruta_db), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._crear_esquema()
+
+    def _crear_esquema(self) -> None:
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS workitems (
+                    organization TEXT NOT NULL,
+                    project TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    rev INTEGER NOT NULL,
+                    tipo TEXT,
+                    estado TEXT,
+                    changed_date TEXT,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (organization, project, id)
+                );
+                CREATE TABLE IF NOT EXISTS comments (
+                    organization TEXT NOT NULL,
+                    project TEXT NOT NULL,
+                    work_item_id INTEGER NOT NULL,
+                    rev INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (organization, project, work_item_id)
+                );
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    clave TEXT PRIMARY KEY,
+                    organization TEXT NOT NULL,
+                    project TEXT NOT NULL,
+                    watermark TEXT,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS sync_items (
+                    clave TEXT NOT NULL,
+                    posicion INTEGER NOT NULL,
+                    id INTEGER NOT NULL,
+                    PRIMARY KEY (clave, id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_sync_items_posicion ON sync_items (clave, posicion);
+            """)
+
+    # ------------------------------------------------------------------
+    # Sincronizaciones
+    # ------------------------------------------------------------------
+    def cargar(self, clave: str) -> Optional[Dict[str, Any]]:
+        """
+        Carga el snapshot de una sincronización
+
+        Args:
+            clave: Identificador del conjunto de filtros
+
+        Returns:
+            dict con 'watermark', 'organization', 'project' e 'items' (con sus comentarios),
+            o None si no existe
+        """
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT organization, project, watermark FROM sync_state WHERE clave = ?",
+                (clave,)
+            ).fetchone()
+        if not fila:
+            return None
+        organization, project, watermark = fila
+        return {
+            "clave": clave,
+            "organization": organization,
+            "project": project,
+            "watermark": watermark,
+            "items": self.items(clave),
+        }
+
+    def guardar(
+        self,
+        clave: str,
+        organization: str,
+        project: str,
+        watermark: Optional[str],
+        items: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Guarda una sincronización: actualiza los work items y sus comentarios y
+        sustituye la lista ordenada de IDs y la marca de agua del conjunto de filtros
+
+        Args:
+            clave: Identificador del conjunto de filtros
+            organization: Organización de Azure DevOps
+            project: Proyecto
+            watermark: System.ChangedDate más reciente de los items guardados
+            items: Work items sincronizados, en el orden de la query
+        """
+        filas_items = []
+        filas_comentarios = []
+        for item in items:
+            datos = {k: v for k, v in item.items() if k != "comentarios"}
+            rev = int(item.get("rev") or 0)
+            filas_items.append((
+                organization, project, item["id"], rev,
+                item.get("tipo", ""), item.get("estado", ""), item.get("fecha_cambio", ""),
+                json.dumps(datos, ensure_ascii=False)
+            ))
+            if item.get("comentarios") is not None:
+                filas_comentarios.append((
+                    organization, project, item["id"], rev,
+                    json.dumps(item["comentarios"], ensure_ascii=False)
+                ))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO workitems (organization, project, id, rev, tipo, estado, changed_date, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                filas_items
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO comments (organization, project, work_item_id, rev, data) VALUES (?, ?, ?, ?, ?)",
+                filas_comentarios
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (clave, organization, project, watermark, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (clave, organization, project, watermark, datetime.now().isoformat())
+            )
+            self._conn.execute("DELETE FROM sync_items WHERE clave = ?", (clave,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sync_items (clave, posicion, id) VALUES (?, ?, ?)",
+                [(clave, posicion, item["id"]) for posicion, item in enumerate(items)]
+            )
+
+    def eliminar(self, clave: str) -> None:
+        """Elimina el estado de una sincronización (la siguiente será completa)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sync_state WHERE clave = ?", (clave,))
+            self._conn.execute("DELETE FROM sync_items WHERE clave = ?", (clave,))
+
+    def ultima_clave(self, organization: str, project: str) -> Optional[str]:
+        """Devuelve la clave de la sincronización más reciente de un proyecto, o None"""
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT clave FROM sync_state WHERE organization = ? AND project = ? "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (organization, project)
+            ).fetchone()
+        return fila[0] if fila else None
+
+    # ------------------------------------------------------------------
+    # Work items
+    # ------------------------------------------------------------------
+    def items(self, clave: str, tipos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Devuelve los work items de una sincronización en el orden de la query
+
+        Args:
+            clave: Identificador del conjunto de filtros
+            tipos: Si se indica, solo los work items de esos tipos
+
+        Returns:
+            Lista de dicts de work item con su clave 'comentarios'
+            (None si los comentarios no están descargados para la revisión actual)
+        """
+        sql = (
+            "SELECT w.data, c.data, c.rev, w.rev FROM sync_items s "
+            "JOIN sync_state ss ON ss.clave = s.clave "
+            "JOIN workitems w ON w.organization = ss.organization AND w.project = ss.project AND w.id = s.id "
+            "LEFT JOIN comments c ON c.organization = w.organization AND c.project = w.project AND c.work_item_id = w.id "
+            "WHERE s.clave = ?"
+        )
+        parametros: List[Any] = [clave]
+        if tipos:
+            sql += f" AND w.tipo IN ({', '.join('?' for _ in tipos)})"
+            parametros.extend(tipos)
+        sql += " ORDER BY s.posicion"
+
+        with self._lock:
+            filas = self._conn.execute(sql, parametros).fetchall()
+
+        resultado = []
+        for datos, comentarios, rev_comentarios, rev in filas:
+            item = json.loads(datos)
+            item["comentarios"] = json.loads(comentarios) if comentarios is not None and rev_comentarios == rev else None
+            resultado.append(item)
+        return resultado
+
+    def estadisticas(self, clave: str) -> Dict[str, Dict[str, int]]:
+        """
+        Cuenta los work items de una sincronización por tipo y por estado
+
+        Returns:
+            dict {'tipos': {tipo: n}, 'estados': {estado: n}, 'total': n}
+        """
+        base = (
+            "FROM sync_items s JOIN sync_state ss ON ss.clave = s.clave "
+            "JOIN workitems w ON w.organization = ss.organization AND w.project = ss.project AND w.id = s.id "
+            "WHERE s.clave = ?"
+        )
+        with self._lock:
+            tipos = self._conn.execute(f"SELECT w.tipo, COUNT(*) {base} GROUP BY w.tipo", (clave,)).fetchall()
+            estados = self._conn.execute(f"SELECT w.estado, COUNT(*) {base} GROUP BY w.estado", (clave,)).fetchall()
+        return {
+            "tipos": dict(tipos),
+            "estados": dict(estados),
+            "total": sum(n for _, n in tipos),
+        }
+
+    # ------------------------------------------------------------------
+    # Comentarios
+    # ------------------------------------------------------------------
+    def comentarios_vigentes(self, organization: str, project: str, revisiones: Dict[int, int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Devuelve los comentarios guardados que siguen siendo válidos
+
+        Args:
+            revisiones: {work_item_id: rev actual en Azure DevOps}
+
+        Returns:
+            {work_item_id: comentarios} solo para los items cuya revisión guardada coincide
+        """
+        if not revisiones:
+            return {}
+        ids = list(revisiones)
+        vigentes = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                lote = ids[i:i + 500]
+                filas = self._conn.execute(
+                    f"SELECT work_item_id, rev, data FROM comments WHERE organization = ? AND project = ? "
+                    f"AND work_item_id IN ({', '.join('?' for _ in lote)})",
+                    [organization, project, *lote]
+                ).fetchall()
+                for work_item_id, rev, datos in filas:
+                    if rev == revisiones[work_item_id]:
+                        vigentes[work_item_id] = json.loads(datos)
+        return vigentes
+
+    def guardar_comentarios(self, organization: str, project: str, work_item_id: int, rev: int, comentarios: List[Dict[str, Any]]) -> None:
+        """Guarda los comentarios de un work item para su revisión actual"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO comments (organization, project, work_item_id, rev, data) VALUES (?, ?, ?, ?, ?)",
+                (organization, project, work_item_id, int(rev or 0), json.dumps(comentarios, ensure_ascii=False))
+            )
+
+
+class CacheComentarios:
+    """Caché en memoria con caducidad (TTL) de comentarios por work item y revisión"""
+
+    def __init__(self, ttl: float = 900, max_items: int = 5000):
+        """
+        Inicializa la caché
+
+        Args:
+            ttl: Segundos que un comentario cacheado se considera válido
+            max_items: Entradas máximas (se descartan las más antiguas)
+        """
+        self.ttl = ttl
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._datos: Dict[Tuple[str, str, int, int], Tuple[float, List[Dict[str, Any]]]] = {}
+
+    def obtener(self, organization: str, project: str, work_item_id: int, rev: int) -> Optional[List[Dict[str, Any]]]:
+        """Devuelve los comentarios cacheados de esa revisión, o None si no están o han caducado"""
+        clave = (organization, project, work_item_id, int(rev or 0))
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            momento, comentarios = entrada
+            if time.monotonic() - momento > self.ttl:
+                del self._datos[clave]
+                return None
+            return comentarios
+
+    def guardar(self, organization: str, project: str, work_item_id: int, rev: int, comentarios: List[Dict[str, Any]]) -> None:
+        """Cachea los comentarios de una revisión de un work item"""
+        with self._lock:
+            if len(self._datos) >= self.max_items:
+                # Descartar la entrada más antigua
+                mas_antigua = min(self._datos, key=lambda k: self._datos[k][0])
+                del self._datos[mas_antigua]
+            self._datos[(organization, project, work_item_id, int(rev or 0))] = (time.monotonic(), comentarios)